@@ -1,5 +1,9 @@
-# Pydantic AI agents
-from .study_agent import study_agent, StudyContext
-from .quiz_agent import quiz_agent, QuizContext, QuizData
+# Pydantic AI agents, built on first use (see get_*_agent)
+from .study_agent import get_study_agent, StudyContext, build_message_history, CHAT_BUDGET, STUDY_PLAN_BUDGET
+from .quiz_agent import get_quiz_agent, QuizContext, QuizData, QuizQuestionData, QUIZ_BUDGET
+from .summary_agent import get_summary_agent, build_summary_prompt, SUMMARY_BUDGET
+from .llm_client import get_chat_model, get_router
 
-__all__ = ['study_agent', 'StudyContext', 'quiz_agent', 'QuizContext', 'QuizData']
+__all__ = ['get_study_agent', 'StudyContext', 'build_message_history', 'CHAT_BUDGET', 'STUDY_PLAN_BUDGET',
+           'get_quiz_agent', 'QuizContext', 'QuizData', 'QuizQuestionData', 'QUIZ_BUDGET', 'get_summary_agent',
+           'build_summary_prompt', 'SUMMARY_BUDGET', 'get_chat_model', 'get_router']
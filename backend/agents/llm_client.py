@@ -0,0 +1,85 @@
+"""
+Shared async OpenRouter client, models and routers for all agents
+One pooled, keep-alive HTTP transport per process
+
+openai and pydantic_ai are imported when the client and models are first
+built, not at import time, so the app starts without paying for them.
+"""
+from __future__ import annotations
+
+import os
+from typing import TYPE_CHECKING
+
+import httpx
+
+from services.model_router import ModelRouter, models_for
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+
+# Lazy initialization
+_client = None
+_chat_models = {}
+_routers = {}
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Build the pooled HTTP transport used by the OpenAI client
+    """
+    limits = httpx.Limits(
+        max_connections=int(os.getenv("LLM_MAX_CONNECTIONS", "100")),
+        max_keepalive_connections=int(os.getenv("LLM_MAX_KEEPALIVE", "20")),
+        keepalive_expiry=float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30")),
+    )
+    timeout = httpx.Timeout(
+        float(os.getenv("LLM_TIMEOUT", "120")),
+        connect=float(os.getenv("LLM_CONNECT_TIMEOUT", "10")),
+    )
+    return httpx.AsyncClient(limits=limits, timeout=timeout)
+
+
+def get_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+
+        api_key = os.getenv("OPENROUTER_API_KEY")
+        if not api_key:
+            raise ValueError("OPENROUTER_API_KEY environment variable is not set")
+        _client = AsyncOpenAI(
+            base_url=os.getenv("OPENROUTER_BASE_URL", DEFAULT_BASE_URL),
+            api_key=api_key,
+            http_client=get_http_client(),
+        )
+    return _client
+
+
+def get_model_name():
+    return os.getenv("AI_MODEL", "tngtech/deepseek-r1t2-chimera:free")
+
+
+def get_chat_model(model_name: str):
+    """
+    Pydantic AI model for a model name, sharing the pooled client
+    """
+    if model_name not in _chat_models:
+        from pydantic_ai.models.openai import OpenAIChatModel
+        from pydantic_ai.providers.openai import OpenAIProvider
+
+        _chat_models[model_name] = OpenAIChatModel(
+            model_name,
+            provider=OpenAIProvider(openai_client=get_client()),
+        )
+    return _chat_models[model_name]
+
+
+def get_router(agent_prefix: str) -> ModelRouter:
+    """
+    Model router for an agent: <PREFIX>_MODELS, then AI_MODELS, then AI_MODEL
+    """
+    if agent_prefix not in _routers:
+        _routers[agent_prefix] = ModelRouter(models_for(agent_prefix, get_model_name()))
+    return _routers[agent_prefix]
@@ -2,12 +2,17 @@
 Quiz Agent - Powered by Pydantic AI
 Generates quizzes and practice questions
 """
-import os
+from __future__ import annotations
+
 import json
+from typing import TYPE_CHECKING
+
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent, RunContext
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
+
+from services.token_budget import TokenBudget
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent, RunContext
 
 
 # Context for quiz generation
@@ -34,28 +39,7 @@ class QuizData(BaseModel):
     questions: list[QuizQuestionData]
 
 
-# Configure the AI model
-api_key = os.getenv("OPENROUTER_API_KEY")
-model_name = os.getenv("AI_MODEL", "tngtech/deepseek-r1t2-chimera:free")
-
-# Create OpenAI-compatible provider for OpenRouter
-provider = OpenAIProvider(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=api_key,
-)
-
-# Create the model
-model = OpenAIChatModel(
-    model_name,
-    provider=provider,
-)
-
-# Initialize the quiz agent
-quiz_agent = Agent(
-    model,
-    deps_type=QuizContext,
-    output_type=QuizData,
-    system_prompt="""You are a quiz generation expert for StudyBuddy AI.
+QUIZ_SYSTEM_PROMPT = """You are a quiz generation expert for StudyBuddy AI.
 
 Your role is to:
 1. Create high-quality, educational quiz questions
@@ -73,9 +57,31 @@ Question Guidelines:
 - Match the difficulty level (beginner, intermediate, advanced)
 
 Always return questions in valid JSON format matching the QuizData model.
-""",
+"""
+
+# A question with four options and an explanation is about 130 tokens of JSON
+QUIZ_BUDGET = TokenBudget(
+    "quiz", item_tokens=130, base_tokens=30, max_tokens=4096, request_tokens=13000,
+    max_input_tokens=200, unit="questions"
 )
 
+# Built on first use; every run passes the model picked by the QUIZ router
+_quiz_agent = None
+
+
+def get_quiz_agent() -> Agent:
+    """The quiz agent (imports pydantic_ai on first call)"""
+    global _quiz_agent
+    if _quiz_agent is None:
+        from pydantic_ai import Agent
+
+        _quiz_agent = Agent(
+            deps_type=QuizContext,
+            output_type=QuizData,
+            system_prompt=QUIZ_SYSTEM_PROMPT,
+        )
+    return _quiz_agent
+
 
 # Tools are commented out as the free model doesn't support tool calling
 # Uncomment if using a model that supports tools (e.g., gpt-4, claude-3)
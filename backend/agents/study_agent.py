@@ -2,11 +2,17 @@
 Study Agent - Powered by Pydantic AI
 Helps students with explanations, concepts, and study guidance
 """
-import os
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
 from pydantic import BaseModel, Field
-from pydantic_ai import Agent, RunContext
-from pydantic_ai.models.openai import OpenAIChatModel
-from pydantic_ai.providers.openai import OpenAIProvider
+
+from services.token_budget import TokenBudget
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent, RunContext
+    from pydantic_ai.messages import ModelMessage
 
 
 # Context for the study agent
@@ -16,28 +22,8 @@ class StudyContext(BaseModel):
     difficulty: str = "intermediate"
 
 
-# Configure the AI model (using OpenRouter)
-api_key = os.getenv("OPENROUTER_API_KEY")
-model_name = os.getenv("AI_MODEL", "tngtech/deepseek-r1t2-chimera:free")
-
-# Create OpenAI-compatible provider for OpenRouter
-provider = OpenAIProvider(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=api_key,
-)
-
-# Create the model
-model = OpenAIChatModel(
-    model_name,
-    provider=provider,
-)
-
-# Initialize the study agent
-study_agent = Agent(
-    model,
-    deps_type=StudyContext,
-    output_type=str,
-    system_prompt="""You are StudyBuddy, an expert AI tutor and study assistant.
+# Kept identical across requests and sessions so providers can cache the prompt prefix
+STUDY_SYSTEM_PROMPT = """You are StudyBuddy, an expert AI tutor and study assistant.
 
 Your role is to:
 1. Explain complex concepts in clear, understandable ways
@@ -56,9 +42,61 @@ Guidelines:
 - Suggest related topics to explore
 
 Format your responses in a clear, structured way using markdown when helpful.
-""",
+"""
+
+# Chat answers are a few paragraphs; the message itself may be a pasted passage
+CHAT_BUDGET = TokenBudget("chat", base_tokens=1200, max_tokens=2048, max_input_tokens=4000)
+
+# An overview plus about 150 tokens per week, all in one answer
+STUDY_PLAN_BUDGET = TokenBudget(
+    "study_plan", item_tokens=150, base_tokens=400, max_tokens=6144, max_input_tokens=500,
+    chunked=False, unit="weeks"
 )
 
+# Built on first use; every run passes the model picked by the STUDY router
+_study_agent = None
+
+
+def get_study_agent() -> Agent:
+    """The study agent (imports pydantic_ai on first call)"""
+    global _study_agent
+    if _study_agent is None:
+        from pydantic_ai import Agent
+
+        _study_agent = Agent(
+            deps_type=StudyContext,
+            output_type=str,
+            system_prompt=STUDY_SYSTEM_PROMPT,
+        )
+    return _study_agent
+
+
+def build_message_history(summary: str, turns: list[tuple[str, str]]) -> list[ModelMessage]:
+    """
+    Message history for a chat session: the system prompt, the summary of
+    earlier turns (if any), then the recent turns verbatim.
+
+    Pydantic AI only adds the system prompt to an empty history, so it is
+    included here, always first and always the same.
+    """
+    if not summary and not turns:
+        return []
+
+    from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+    parts = [SystemPromptPart(STUDY_SYSTEM_PROMPT)]
+    if summary:
+        parts.append(SystemPromptPart(f"Summary of the conversation so far:\n{summary}"))
+    if not turns:
+        return [ModelRequest(parts=parts)]
+
+    messages: list[ModelMessage] = []
+    for user, answer in turns:
+        messages.append(ModelRequest(parts=[*parts, UserPromptPart(user)]))
+        messages.append(ModelResponse(parts=[TextPart(answer)]))
+        parts = []
+    return messages
+
 
 # Tools are commented out as the free model doesn't support tool calling
 # Uncomment if using a model that supports tools (e.g., gpt-4, claude-3)
@@ -0,0 +1,51 @@
+"""
+Summary Agent - Powered by Pydantic AI
+Compresses older chat turns into a running conversation summary
+"""
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from services.token_budget import TokenBudget
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+
+SUMMARY_SYSTEM_PROMPT = """You maintain the running summary of a tutoring conversation for StudyBuddy AI.
+
+Merge the previous summary with the new conversation turns into one updated summary.
+
+Guidelines:
+- Keep what the student is studying, their level, goals and open questions
+- Keep facts, definitions and worked results the tutor already gave, briefly
+- Note misconceptions the student had and whether they were resolved
+- Drop greetings, filler and repeated explanations
+- Write plain prose or short bullet points, at most 200 words
+- Return only the summary
+"""
+
+# At most 200 words; the input is bounded by CHAT_HISTORY_TOKEN_BUDGET
+SUMMARY_BUDGET = TokenBudget("summary", base_tokens=350, max_tokens=1024)
+
+# Built on first use; no default model: every run passes the model picked by the SUMMARY router
+_summary_agent = None
+
+
+def get_summary_agent() -> Agent:
+    """The summary agent (imports pydantic_ai on first call)"""
+    global _summary_agent
+    if _summary_agent is None:
+        from pydantic_ai import Agent
+
+        _summary_agent = Agent(output_type=str, system_prompt=SUMMARY_SYSTEM_PROMPT)
+    return _summary_agent
+
+
+def build_summary_prompt(summary: str, turns: list[tuple[str, str]]) -> str:
+    """Summarization prompt for the previous summary and the turns being folded into it"""
+    lines = [f"Previous summary:\n{summary or '(none)'}", "", "New conversation turns:"]
+    for user, answer in turns:
+        lines.append(f"Student: {user}")
+        lines.append(f"Tutor: {answer}")
+    return "\n".join(lines)
@@ -0,0 +1,108 @@
+"""
+Benchmark: blocking vs async OpenRouter client under concurrency
+
+Starts a local OpenAI-compatible stub that answers after a fixed delay,
+then fires N concurrent generations through:
+  - the old pattern (sync OpenAI client called inside an async def)
+  - the shared pooled AsyncOpenAI client (agents.llm_client.get_client)
+    that every agent served by main.py calls through
+
+Usage (from backend/):
+    python benchmarks/bench_async_client.py --concurrency 20 --latency 0.5
+"""
+import argparse
+import asyncio
+import os
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import uvicorn
+from fastapi import FastAPI
+from openai import OpenAI
+
+
+def build_stub_app(latency: float) -> FastAPI:
+    stub = FastAPI()
+
+    @stub.post("/chat/completions")
+    async def chat_completions(body: dict):
+        await asyncio.sleep(latency)
+        return {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": "ok"},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    return stub
+
+
+def start_stub(latency: float) -> str:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    config = uvicorn.Config(build_stub_app(latency), host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+async def blocking_call(client: OpenAI):
+    # The pre-async pattern: a sync client inside a coroutine
+    response = client.chat.completions.create(
+        model="stub",
+        messages=[{"role": "user", "content": "ping"}],
+    )
+    return response.choices[0].message.content
+
+
+async def pooled_call():
+    from agents.llm_client import get_client
+
+    response = await get_client().chat.completions.create(
+        model="stub",
+        messages=[{"role": "user", "content": "ping"}],
+    )
+    return response.choices[0].message.content
+
+
+async def run(concurrency: int, latency: float):
+    base_url = start_stub(latency)
+    os.environ["OPENROUTER_BASE_URL"] = base_url
+    os.environ.setdefault("OPENROUTER_API_KEY", "bench")
+
+    sync_client = OpenAI(base_url=base_url, api_key="bench")
+    start = time.perf_counter()
+    await asyncio.gather(*(blocking_call(sync_client) for _ in range(concurrency)))
+    blocking_elapsed = time.perf_counter() - start
+
+    # Warm the pool once so the measurement excludes connection setup
+    await pooled_call()
+    start = time.perf_counter()
+    await asyncio.gather(*(pooled_call() for _ in range(concurrency)))
+    async_elapsed = time.perf_counter() - start
+
+    print(f"concurrency={concurrency} upstream_latency={latency:.3f}s")
+    print(f"  blocking client: {blocking_elapsed:.3f}s ({blocking_elapsed / latency:.1f} round trips)")
+    print(f"  async client:    {async_elapsed:.3f}s ({async_elapsed / latency:.1f} round trips)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    asyncio.run(run(args.concurrency, args.latency))
@@ -2,14 +2,35 @@
 StudyBuddy AI - FastAPI Backend with Pydantic AI
 Main application entry point
 """
+import asyncio
 import os
-from fastapi import FastAPI, HTTPException
+import time
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 import logging
 
-from agents import study_agent, StudyContext, quiz_agent, QuizContext, QuizData
+from agents import (
+    get_study_agent, StudyContext, build_message_history, get_quiz_agent, QuizContext, QuizData, QuizQuestionData,
+    get_summary_agent, build_summary_prompt, get_chat_model, get_router,
+    CHAT_BUDGET, QUIZ_BUDGET, STUDY_PLAN_BUDGET, SUMMARY_BUDGET
+)
+from services.chat_sessions import ChatSessions, history_tokens
+from services.compression import CompressionMiddleware, compression_stats
+from services.conditional import conditional_response, conditional_stats, strong_etag
+from services.jobs import TERMINAL_STATES, JobManager
+from services.lifecycle import lifecycle
+from services.limiter import AdmissionRejected, upstream_limiter
+from services.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, observe_stream, render_metrics, stats_collector
+from services.question_bank import QuestionBank
+from services.semantic_cache import SemanticCache
+from services.resilience import breaker_stats, call_upstream, get_breaker
+from services.serialization import FastJSONResponse, FastRoute, dumps
+from services.token_budget import TokenBudgetExceeded, budget_stats
+from services.warmup import Prewarmer
 
 # Load environment variables
 load_dotenv()
@@ -18,12 +39,58 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Long generations submitted through /api/jobs run on a bounded worker pool
+job_manager = JobManager()
+
+# Validated quiz questions per subject/topic/difficulty, sampled instead of generating
+question_bank = QuestionBank()
+
+# Chat answers reused for near-duplicate questions
+chat_cache = SemanticCache()
+
+# Server-side chat history, compacted to a token budget
+chat_sessions = ChatSessions()
+
+
+def build_agents() -> None:
+    """Build the agents and the shared client for each agent's primary model"""
+    get_study_agent()
+    get_quiz_agent()
+    get_summary_agent()
+    for agent_prefix in ("STUDY", "QUIZ", "SUMMARY"):
+        get_chat_model(get_router(agent_prefix).primary)
+
+
+# Agents are built on first use; pre-warm them in the background at startup
+prewarmer = Prewarmer(build_agents)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await question_bank.start()
+    await chat_sessions.start()
+    await job_manager.start()
+    prewarmer.start()
+    lifecycle.mark_ready()
+    yield
+    lifecycle.begin_drain()
+    await prewarmer.stop()
+    # Running jobs, top-ups and compactions may finish within what is left of the drain deadline
+    await job_manager.stop(timeout=lifecycle.drain_remaining())
+    await chat_sessions.stop(timeout=lifecycle.drain_remaining())
+    await question_bank.stop(timeout=lifecycle.drain_remaining())
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="StudyBuddy AI API",
     description="AI-powered study assistant using Pydantic AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
+# Endpoints returning their response model skip FastAPI's re-validation (services/serialization.py)
+app.router.route_class = FastRoute
 
 # Configure CORS
 origins = os.getenv("CORS_ORIGINS", "http://localhost:5173").split(",")
@@ -33,26 +100,56 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# gzip/brotli for complete JSON responses above COMPRESS_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Request latency histograms and in-flight gauges per route
+app.add_middleware(MetricsMiddleware)
+
+# Component counters exported on /metrics
+stats_collector.register("upstream_limiter", upstream_limiter.stats)
+stats_collector.register("circuit", breaker_stats, label="model")
+stats_collector.register("jobs", job_manager.stats)
+stats_collector.register("question_bank", question_bank.stats)
+stats_collector.register("chat_cache", chat_cache.stats)
+stats_collector.register("chat_sessions", chat_sessions.stats)
+stats_collector.register("prewarm", prewarmer.stats)
+stats_collector.register("lifecycle", lifecycle.stats)
+stats_collector.register("compression", compression_stats)
+stats_collector.register("conditional", conditional_stats)
+stats_collector.register("token_budget", budget_stats, label="endpoint")
+
+
+# Follow-up suggestions returned with every chat answer
+FOLLOW_UP_QUESTIONS = [
+    "Can you explain this in simpler terms?",
+    "What are some practice problems for this topic?",
+    "How does this relate to real-world applications?"
+]
+
 
 # Request/Response Models
 class ChatRequest(BaseModel):
     message: str
     subject: str | None = None
     difficulty: str | None = "intermediate"
+    session_id: str | None = None
 
 
 class ChatResponse(BaseModel):
     response: str
     sources: list[str] | None = None
     follow_up_questions: list[str] | None = None
+    session_id: str | None = None
 
 
 class QuizRequest(BaseModel):
     subject: str
     topic: str
-    num_questions: int = 5
+    num_questions: int = Field(5, ge=1, le=QUIZ_BUDGET.max_items)
     difficulty: str = "intermediate"
 
 
@@ -73,7 +170,7 @@ class StudyPlanRequest(BaseModel):
     subject: str
     goal: str
     available_hours_per_week: int
-    duration_weeks: int
+    duration_weeks: int = Field(..., ge=1, le=STUDY_PLAN_BUDGET.max_items)
 
 
 class StudyPlanResponse(BaseModel):
@@ -82,6 +179,24 @@ class StudyPlanResponse(BaseModel):
     milestones: list[str]
 
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed excess load with 429/503 and a Retry-After hint"""
+    logger.warning(f"Rejected {request.url.path}: {exc.detail}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(TokenBudgetExceeded)
+async def token_budget_handler(request: Request, exc: TokenBudgetExceeded):
+    """Reject requests that cannot fit in their endpoint's token budget with 422"""
+    logger.warning(f"Rejected {request.url.path}: {exc.detail}")
+    return JSONResponse(status_code=422, content={"detail": exc.detail})
+
+
 # Health check endpoint
 @app.get("/")
 async def root():
@@ -93,12 +208,78 @@ async def root():
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process and its event loop are responsive"""
+    return {"status": "alive", "uptime_seconds": lifecycle.stats()["uptime_seconds"]}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once startup has finished and until shutdown
+    begins, 503 while starting or draining
+    """
+    status = lifecycle.status()
+    return JSONResponse(status_code=200 if status == "ready" else 503, content={"status": status})
+
+
+@asynccontextmanager
+async def chat_session(session_id: str | None):
+    """Hold a chat session for one turn; yields None for stateless chat"""
+    if session_id is None:
+        yield None
+        return
+    async with chat_sessions.lock(session_id):
+        session = await chat_sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+        yield session
+
+
+async def summarize_chat_history(summary: str, turns: list[tuple[str, str]]) -> str:
+    """Fold older chat turns into a session's running summary"""
+    prompt = build_summary_prompt(summary, turns)
+    result = await get_router("SUMMARY").run(
+        lambda model_name: call_upstream(
+            lambda: get_summary_agent().run(
+                prompt,
+                model=get_chat_model(model_name),
+                model_settings={"max_tokens": SUMMARY_BUDGET.max_tokens_for()}
+            ),
+            model_name,
+            agent="summary"
+        )
+    )
+    return result.output
+
+
+def check_chat_budget(message: str, session: dict | None) -> None:
+    """
+    Reject a chat message that is too long, or too long for the session's history
+
+    Raises:
+        TokenBudgetExceeded: if the turn cannot fit in the chat token budget
+    """
+    context = history_tokens(session["summary"], session["turns"]) if session else 0
+    CHAT_BUDGET.check(message, user_text=message, context_tokens=context)
+
+
+async def record_chat_turn(session: dict | None, message: str, answer: str) -> None:
+    """Store a finished turn and compact the session in the background if it is over budget"""
+    if session is not None:
+        await chat_sessions.add_turn(session, message, answer)
+        chat_sessions.compact_later(session, summarize_chat_history)
+
+
 # Chat with study agent
 @app.post("/api/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
     """
     Chat with the AI study assistant.
     Handles questions, explanations, and study guidance.
+    With a session_id, earlier turns of the session are sent as message history.
+    Near-duplicate questions without history are answered from the semantic cache.
     """
     try:
         logger.info(f"Processing chat request: {request.message[:50]}...")
@@ -109,78 +290,317 @@ async def chat(request: ChatRequest):
             difficulty=request.difficulty or "intermediate"
         )
 
-        # Run the Pydantic AI study agent
-        result = await study_agent.run(request.message, deps=context)
-
-        # Extract response text
-        response_text = result.output
-
-        # Generate follow-up questions
-        follow_ups = [
-            "Can you explain this in simpler terms?",
-            "What are some practice problems for this topic?",
-            "How does this relate to real-world applications?"
-        ]
+        async with chat_session(request.session_id) as session:
+            check_chat_budget(request.message, session)
+            history = build_message_history(session["summary"], session["turns"]) if session else []
+            # Answers that depend on earlier turns are not shared between conversations
+            response_text = None if history else chat_cache.get(request.message, context.subject, context.difficulty)
+            if response_text is None:
+                # Run the Pydantic AI study agent
+                result = await get_router("STUDY").run(
+                    lambda model_name: call_upstream(
+                        lambda: get_study_agent().run(
+                            request.message,
+                            deps=context,
+                            message_history=history,
+                            model=get_chat_model(model_name),
+                            model_settings={"max_tokens": CHAT_BUDGET.max_tokens_for()}
+                        ),
+                        model_name,
+                        agent="study"
+                    )
+                )
+
+                # Extract response text
+                response_text = result.output
+                if not history:
+                    chat_cache.set(request.message, context.subject, context.difficulty, response_text)
+
+            await record_chat_turn(session, request.message, response_text)
 
         return ChatResponse(
             response=response_text,
             sources=None,
-            follow_up_questions=follow_ups
+            follow_up_questions=FOLLOW_UP_QUESTIONS,
+            session_id=request.session_id
         )
 
+    except (AdmissionRejected, TokenBudgetExceeded, HTTPException):
+        raise
     except Exception as e:
         logger.error(f"Error in chat endpoint: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Generate quiz
-@app.post("/api/quiz/generate", response_model=QuizResponse)
-async def generate_quiz_endpoint(request: QuizRequest):
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+# Chat with study agent, streaming tokens as Server-Sent Events
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request):
     """
-    Generate a quiz for a given subject and topic.
-    Uses AI to create questions with multiple choice answers.
+    Streaming variant of /api/chat.
+    Emits `token` events with text deltas, then a `done` event with
+    follow-up questions. The upstream call is cancelled if the client disconnects.
+    A near-duplicate of a cached question is answered with a single `token` event.
+    A session turn is only recorded once the answer has streamed completely.
     """
-    try:
-        logger.info(f"Generating quiz: {request.subject} - {request.topic}")
+    logger.info(f"Processing streaming chat request: {request.message[:50]}...")
+    context = StudyContext(
+        subject=request.subject or "general",
+        difficulty=request.difficulty or "intermediate"
+    )
+
+    cached = None
+    session = None
+    if request.session_id is not None:
+        # Fail with 404 before the 200 status line is sent
+        session = await chat_sessions.get(request.session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Chat session not found")
+        if not session["summary"] and not session["turns"]:
+            cached = chat_cache.get(request.message, context.subject, context.difficulty)
+    else:
+        cached = chat_cache.get(request.message, context.subject, context.difficulty)
+    # Reject before the 200 status line is sent if the message is over budget or upstream is saturated
+    check_chat_budget(request.message, session)
+    if cached is None:
+        upstream_limiter.check()
+
+    async def event_stream():
+        started = time.perf_counter()
+        deltas = []
+        first_token_at = None
+        # Streams are not hedged; use the currently healthiest model
+        model_name = get_router("STUDY").ordered()[0]
+        try:
+            async with chat_session(request.session_id) as session:
+                if cached is not None:
+                    await record_chat_turn(session, request.message, cached)
+                    yield sse_event("token", {"delta": cached})
+                    yield sse_event("done", {"follow_up_questions": FOLLOW_UP_QUESTIONS})
+                    return
+
+                history = build_message_history(session["summary"], session["turns"]) if session else []
+                async with upstream_limiter.slot(), get_breaker(model_name).guard():
+                    with observe_stream("study", model_name) as observer:
+                        async with get_study_agent().run_stream(
+                            request.message,
+                            deps=context,
+                            message_history=history,
+                            model=get_chat_model(model_name),
+                            model_settings={"max_tokens": CHAT_BUDGET.max_tokens_for()}
+                        ) as result:
+                            async for delta in result.stream_text(delta=True, debounce_by=None):
+                                if await http_request.is_disconnected():
+                                    # Leaving the context manager closes the upstream response
+                                    logger.info("Client disconnected, cancelling chat stream")
+                                    return
+                                if first_token_at is None:
+                                    first_token_at = time.perf_counter()
+                                    observer.first_token()
+                                    logger.info(f"Chat stream time-to-first-token: {first_token_at - started:.3f}s")
+                                deltas.append(delta)
+                                yield sse_event("token", {"delta": delta})
+                        observer.finish(result)
+
+                if deltas:
+                    answer = "".join(deltas)
+                    if not history:
+                        chat_cache.set(request.message, context.subject, context.difficulty, answer)
+                    await record_chat_turn(session, request.message, answer)
+
+            logger.info(f"Chat stream completed in {time.perf_counter() - started:.3f}s")
+            yield sse_event("done", {"follow_up_questions": FOLLOW_UP_QUESTIONS})
+
+        except Exception as e:
+            logger.error(f"Error in chat stream: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def session_view(session: dict) -> dict:
+    """API representation of a chat session"""
+    return {
+        "session_id": session["id"],
+        "summary": session["summary"],
+        "turns": [{"user": user, "assistant": answer} for user, answer in session["turns"]],
+        "estimated_tokens": history_tokens(session["summary"], session["turns"]),
+        "created_at": session["created_at"],
+        "updated_at": session["updated_at"]
+    }
+
+
+# Chat sessions
+@app.post("/api/chat/sessions", status_code=201)
+async def create_chat_session():
+    """
+    Start a server-side chat session; pass its session_id to /api/chat.
+    """
+    return session_view(await chat_sessions.create())
+
+
+@app.get("/api/chat/sessions/{session_id}")
+async def get_chat_session(session_id: str):
+    """
+    The session's running summary and the turns kept verbatim.
+    """
+    session = await chat_sessions.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return session_view(session)
+
+
+@app.delete("/api/chat/sessions/{session_id}")
+async def delete_chat_session(session_id: str):
+    """
+    Delete a chat session and its history.
+    """
+    if not await chat_sessions.delete(session_id):
+        raise HTTPException(status_code=404, detail="Chat session not found")
+    return {"session_id": session_id, "deleted": True}
+
+
+def build_quiz_context(request: QuizRequest) -> QuizContext:
+    """Quiz agent dependencies for a request"""
+    return QuizContext(
+        subject=request.subject,
+        topic=request.topic,
+        num_questions=request.num_questions,
+        difficulty=request.difficulty
+    )
 
-        # Create quiz context
-        context = QuizContext(
-            subject=request.subject,
-            topic=request.topic,
-            num_questions=request.num_questions,
-            difficulty=request.difficulty
-        )
 
-        # Create the quiz generation prompt
-        prompt = f"""Generate {request.num_questions} multiple choice quiz questions about {request.topic} in {request.subject}.
+def build_quiz_prompt(request: QuizRequest, part: int = 1, parts: int = 1) -> str:
+    """Quiz generation prompt for a request, or for one part of a request split over several calls"""
+    prompt = f"""Generate {request.num_questions} multiple choice quiz questions about {request.topic} in {request.subject}.
 
 Difficulty level: {request.difficulty}
 
 Create educational questions that test understanding, not just memorization.
 Each question should have 4 options with one correct answer."""
+    if parts > 1:
+        # Steer each part towards a different slice of the topic
+        prompt += (
+            f"\n\nThis is part {part} of {parts} of the same quiz. "
+            f"Cover aspects of the topic that the other parts are unlikely to cover."
+        )
+    return prompt
+
+
+def quiz_chunks(request: QuizRequest) -> list[QuizRequest]:
+    """
+    The request split into parts whose questions fit in one call's token budget
+
+    Raises:
+        TokenBudgetExceeded: if the quiz cannot fit in its token budget
+    """
+    chunks = [request.model_copy(update={"num_questions": n}) for n in QUIZ_BUDGET.chunk_sizes(request.num_questions)]
+    QUIZ_BUDGET.check(
+        build_quiz_prompt(chunks[0], 1, len(chunks)) if chunks else "",
+        request.num_questions,
+        user_text=request.subject + request.topic + request.difficulty
+    )
+    return chunks
+
+
+def to_quiz_question(q: QuizQuestionData) -> QuizQuestion:
+    """Convert agent output to the API format, with correct_answer as an option index"""
+    correct_index = 0
+    for i, opt in enumerate(q.options):
+        if opt == q.correct_answer:
+            correct_index = i
+            break
+
+    return QuizQuestion(
+        question=q.question,
+        options=q.options,
+        correct_answer=str(correct_index),
+        explanation=q.explanation
+    )
+
+
+async def run_quiz_part(request: QuizRequest, part: int, parts: int) -> QuizData:
+    """Run the Pydantic AI quiz agent for one part of a request"""
+    context = build_quiz_context(request)
+    prompt = build_quiz_prompt(request, part, parts)
+
+    result = await get_router("QUIZ").run(
+        lambda model_name: call_upstream(
+            lambda: get_quiz_agent().run(
+                prompt,
+                deps=context,
+                model=get_chat_model(model_name),
+                model_settings={"max_tokens": QUIZ_BUDGET.max_tokens_for(request.num_questions)}
+            ),
+            model_name,
+            agent="quiz"
+        )
+    )
+    return result.output
+
+
+async def run_quiz_agent(request: QuizRequest) -> QuizData:
+    """
+    Run the Pydantic AI quiz agent for a request; a quiz larger than one
+    call's token budget is generated in concurrent parts
+    """
+    chunks = quiz_chunks(request)
+    results = await asyncio.gather(
+        *(run_quiz_part(chunk, part, len(chunks)) for part, chunk in enumerate(chunks, start=1))
+    )
+    return QuizData(questions=[q for result in results for q in result.questions][:request.num_questions])
 
-        # Run the Pydantic AI quiz agent
-        result = await quiz_agent.run(prompt, deps=context)
 
-        # Extract quiz data
-        quiz_data: QuizData = result.output
+async def refill_question_bank(request: QuizRequest, count: int) -> list[dict]:
+    """Generate questions for a question bank top-up"""
+    quiz_data = await run_quiz_agent(request.model_copy(update={"num_questions": count}))
+    return [q.model_dump() for q in quiz_data.questions]
+
+
+def stock_question_bank(request: QuizRequest) -> None:
+    """Top up the request's question bank bucket in the background if it is running low"""
+    question_bank.ensure_stock(
+        request.subject,
+        request.topic,
+        request.difficulty,
+        lambda n: refill_question_bank(request, n)
+    )
+
+
+# Generate quiz
+@app.post("/api/quiz/generate", response_model=QuizResponse)
+async def generate_quiz_endpoint(request: QuizRequest):
+    """
+    Generate a quiz for a given subject and topic.
+    Uses AI to create questions with multiple choice answers; sampled from
+    the question bank when it already holds enough questions.
+    """
+    try:
+        logger.info(f"Generating quiz: {request.subject} - {request.topic}")
+
+        banked = question_bank.sample(request.subject, request.topic, request.difficulty, request.num_questions)
+        if banked is not None:
+            quiz_questions = [QuizQuestionData(**q) for q in banked]
+        else:
+            quiz_questions = (await run_quiz_agent(request)).questions
+            await question_bank.add(
+                request.subject,
+                request.topic,
+                request.difficulty,
+                [q.model_dump() for q in quiz_questions]
+            )
+        stock_question_bank(request)
 
         # Convert to response format - adjust correct_answer to index
-        questions = []
-        for q in quiz_data.questions:
-            # Find the index of correct answer
-            correct_index = 0
-            for i, opt in enumerate(q.options):
-                if opt == q.correct_answer:
-                    correct_index = i
-                    break
-
-            questions.append(QuizQuestion(
-                question=q.question,
-                options=q.options,
-                correct_answer=str(correct_index),
-                explanation=q.explanation
-            ))
+        questions = [to_quiz_question(q) for q in quiz_questions]
 
         return QuizResponse(
             questions=questions,
@@ -188,11 +608,98 @@ Each question should have 4 options with one correct answer."""
             topic=request.topic
         )
 
+    except (AdmissionRejected, TokenBudgetExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error generating quiz: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Generate quiz, streaming each question as it completes
+@app.post("/api/quiz/generate/stream")
+async def generate_quiz_stream(request: QuizRequest, http_request: Request):
+    """
+    Streaming variant of /api/quiz/generate.
+    Emits a `question` event as soon as each question object is complete,
+    then a `done` event. Banked questions are replayed without an upstream call.
+    A quiz larger than one call's token budget is streamed from consecutive calls.
+    """
+    logger.info(f"Streaming quiz: {request.subject} - {request.topic}")
+    banked = question_bank.sample(request.subject, request.topic, request.difficulty, request.num_questions)
+    chunks = []
+    if banked is None:
+        # Reject before the 200 status line is sent if the quiz is over budget or upstream is saturated
+        chunks = quiz_chunks(request)
+        upstream_limiter.check()
+
+    async def event_stream():
+        emitted = 0
+        if banked is not None:
+            for q in banked:
+                yield sse_event("question", {"index": emitted, **to_quiz_question(QuizQuestionData(**q)).model_dump()})
+                emitted += 1
+            stock_question_bank(request)
+            yield sse_event("done", {"subject": request.subject, "topic": request.topic, "count": emitted})
+            return
+
+        # Streams are not hedged; use the currently healthiest model
+        model_name = get_router("QUIZ").ordered()[0]
+        generated = []
+        try:
+            for part, chunk in enumerate(chunks, start=1):
+                # Questions of this part already sent
+                sent = 0
+                async with upstream_limiter.slot(), get_breaker(model_name).guard():
+                    with observe_stream("quiz", model_name) as observer:
+                        async with get_quiz_agent().run_stream(
+                            build_quiz_prompt(chunk, part, len(chunks)),
+                            deps=build_quiz_context(chunk),
+                            model=get_chat_model(model_name),
+                            model_settings={"max_tokens": QUIZ_BUDGET.max_tokens_for(chunk.num_questions)}
+                        ) as result:
+                            # Partial outputs are parsed incrementally; a question is
+                            # complete once the next one has started
+                            async for partial in result.stream_output(debounce_by=None):
+                                observer.first_token()
+                                if await http_request.is_disconnected():
+                                    logger.info("Client disconnected, cancelling quiz stream")
+                                    return
+                                while sent < min(len(partial.questions) - 1, chunk.num_questions):
+                                    question = to_quiz_question(partial.questions[sent])
+                                    yield sse_event("question", {"index": emitted, **question.model_dump()})
+                                    sent += 1
+                                    emitted += 1
+
+                            quiz_data: QuizData = await result.get_output()
+                        observer.finish(result)
+
+                questions = quiz_data.questions[:chunk.num_questions]
+                for q in questions[sent:]:
+                    yield sse_event("question", {"index": emitted, **to_quiz_question(q).model_dump()})
+                    emitted += 1
+                generated.extend(questions)
+
+            await question_bank.add(
+                request.subject,
+                request.topic,
+                request.difficulty,
+                [q.model_dump() for q in generated]
+            )
+            stock_question_bank(request)
+
+            yield sse_event("done", {"subject": request.subject, "topic": request.topic, "count": emitted})
+
+        except Exception as e:
+            logger.error(f"Error streaming quiz: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # Generate study plan
 @app.post("/api/study-plan", response_model=StudyPlanResponse)
 async def generate_study_plan(request: StudyPlanRequest):
@@ -216,9 +723,21 @@ async def generate_study_plan(request: StudyPlanRequest):
 - Duration: {request.duration_weeks} weeks
 
 Provide a structured plan with weekly breakdown and milestones."""
+        STUDY_PLAN_BUDGET.check(prompt, request.duration_weeks, user_text=request.subject + request.goal)
 
         # Run the agent
-        result = await study_agent.run(prompt, deps=context)
+        result = await get_router("STUDY").run(
+            lambda model_name: call_upstream(
+                lambda: get_study_agent().run(
+                    prompt,
+                    deps=context,
+                    model=get_chat_model(model_name),
+                    model_settings={"max_tokens": STUDY_PLAN_BUDGET.max_tokens_for(request.duration_weeks)}
+                ),
+                model_name,
+                agent="study"
+            )
+        )
 
         # Parse the response into structured format
         plan_text = result.output
@@ -244,27 +763,126 @@ Provide a structured plan with weekly breakdown and milestones."""
             milestones=milestones
         )
 
+    except (AdmissionRejected, TokenBudgetExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error generating study plan: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-# Get available subjects
-@app.get("/api/subjects")
-async def get_subjects():
-    """Get list of available subjects"""
+# Background jobs: run the same generation as the endpoints above, off the request path
+job_manager.register("quiz", lambda params: generate_quiz_endpoint(QuizRequest(**params)))
+job_manager.register("study-plan", lambda params: generate_study_plan(StudyPlanRequest(**params)))
+
+
+def job_accepted(job: dict) -> JSONResponse:
+    """202 response for a submitted job, pointing at its status URL"""
+    status_url = f"/api/jobs/{job['id']}"
+    return JSONResponse(
+        status_code=202,
+        content={**job, "status_url": status_url, "events_url": f"{status_url}/events"},
+        headers={"Location": status_url}
+    )
+
+
+@app.post("/api/jobs/quiz", status_code=202)
+async def submit_quiz_job(request: QuizRequest):
+    """
+    Generate a quiz in the background; returns a job id at once.
+    """
+    logger.info(f"Queueing quiz job: {request.subject} - {request.topic}")
+    return job_accepted(await job_manager.submit("quiz", request.model_dump()))
+
+
+@app.post("/api/jobs/study-plan", status_code=202)
+async def submit_study_plan_job(request: StudyPlanRequest):
+    """
+    Create a study plan in the background; returns a job id at once.
+    """
+    logger.info(f"Queueing study plan job: {request.subject}")
+    return job_accepted(await job_manager.submit("study-plan", request.model_dump()))
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Job status, with the result once it has succeeded.
+    Pass wait=<seconds> (up to 60) to long-poll until the job finishes.
+    """
+    job = await job_manager.wait(job_id, min(max(wait, 0), 60))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Subscribe to a job: a `status` Server-Sent Event on every status change,
+    the last one carrying the result or error.
+    """
+    if await job_manager.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        status = None
+        while True:
+            job = await job_manager.wait_for_change(job_id, status, timeout=15)
+            if job is None:
+                return
+            if job["status"] == status:
+                # Keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            status = job["status"]
+            yield sse_event("status", job)
+            if status in TERMINAL_STATES:
+                return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+# Prometheus metrics
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+# Model routing statistics
+@app.get("/api/models")
+async def model_stats():
+    """Per-agent model order, hedging and latency/error statistics"""
     return {
-        "subjects": [
-            {"id": "mathematics", "name": "Mathematics", "icon": "📐"},
-            {"id": "science", "name": "Science", "icon": "🔬"},
-            {"id": "programming", "name": "Programming", "icon": "💻"},
-            {"id": "languages", "name": "Languages", "icon": "🌍"},
-            {"id": "history", "name": "History", "icon": "📚"},
-            {"id": "literature", "name": "Literature", "icon": "📖"},
-        ]
+        "study": get_router("STUDY").to_dict(),
+        "quiz": get_router("QUIZ").to_dict()
     }
 
 
+SUBJECTS = {
+    "subjects": [
+        {"id": "mathematics", "name": "Mathematics", "icon": "📐"},
+        {"id": "science", "name": "Science", "icon": "🔬"},
+        {"id": "programming", "name": "Programming", "icon": "💻"},
+        {"id": "languages", "name": "Languages", "icon": "🌍"},
+        {"id": "history", "name": "History", "icon": "📚"},
+        {"id": "literature", "name": "Literature", "icon": "📖"},
+    ]
+}
+SUBJECTS_ETAG = strong_etag(dumps(SUBJECTS).decode())
+
+
+# Get available subjects
+@app.get("/api/subjects")
+async def get_subjects(request: Request):
+    """Get list of available subjects; If-None-Match with its ETag gets 304 Not Modified"""
+    return conditional_response(request, SUBJECTS_ETAG, lambda: SUBJECTS)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,93 @@
+"""
+Production entry point
+
+Runs main:app under uvicorn with:
+- WEB_CONCURRENCY worker processes (default: the CPUs available to the
+  container, at most 8), sharing one listening socket
+- the uvloop event loop and httptools HTTP parser when installed
+  (uvicorn[standard]), falling back to asyncio/h11
+- graceful shutdown: on SIGTERM the process stops reporting ready, stops
+  accepting connections and lets in-flight requests, background jobs and
+  top-ups finish for up to SHUTDOWN_DRAIN_SECONDS (default 30) before
+  cancelling them
+
+Usage:
+    python serve.py
+    WEB_CONCURRENCY=4 PORT=8000 python serve.py
+
+`python main.py` remains the single-process development server.
+"""
+
+import importlib.util
+import logging
+import math
+import os
+
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+from services.lifecycle import lifecycle
+
+logger = logging.getLogger("serve")
+
+MAX_AUTO_WORKERS = 8
+
+
+def available_cpus() -> int:
+    """CPUs this process may use: its affinity mask, capped by a cgroup v2 CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, math.ceil(int(quota) / int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    configured = os.getenv("WEB_CONCURRENCY")
+    if configured:
+        return max(1, int(configured))
+    return min(available_cpus(), MAX_AUTO_WORKERS)
+
+
+class DrainingServer(uvicorn.Server):
+    """uvicorn server that marks the process as draining as soon as it is asked to exit"""
+
+    def handle_exit(self, sig, frame) -> None:
+        lifecycle.begin_drain()
+        super().handle_exit(sig, frame)
+
+
+def main() -> None:
+    has_uvloop = importlib.util.find_spec("uvloop") is not None
+    has_httptools = importlib.util.find_spec("httptools") is not None
+    config = uvicorn.Config(
+        "main:app",
+        host=os.getenv("HOST", "0.0.0.0"),
+        port=int(os.getenv("PORT", "8000")),
+        workers=worker_count(),
+        loop="uvloop" if has_uvloop else "asyncio",
+        http="httptools" if has_httptools else "h11",
+        timeout_graceful_shutdown=int(lifecycle.drain_seconds),
+        log_level=os.getenv("LOG_LEVEL", "info"),
+    )
+    logging.basicConfig(level=logging.INFO)
+    logger.info(
+        f"Starting {config.workers} worker(s) on {config.host}:{config.port} "
+        f"(loop={config.loop}, http={config.http}, drain={config.timeout_graceful_shutdown}s)"
+    )
+    server = DrainingServer(config)
+    if config.workers > 1:
+        Multiprocess(config, target=server.run, sockets=[config.bind_socket()]).run()
+    else:
+        server.run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+"""
+Chat Sessions - Server-side conversation history with a bounded size
+
+A session keeps a rolling summary plus the most recent turns (user
+message, assistant answer). Once the estimated tokens of the history
+exceed CHAT_HISTORY_TOKEN_BUDGET, the oldest turns are folded into the
+summary and only the newest ones are kept verbatim, so the prompt sent
+upstream stays bounded however long the conversation runs. Sessions are
+stored in SQLite (CHAT_SESSIONS_DB) as compact JSON.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .token_budget import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# (user message, assistant answer)
+Turn = Tuple[str, str]
+
+# Folds turns into the previous summary and returns the new summary
+Summarizer = Callable[[str, List[Turn]], Awaitable[str]]
+
+# Re-reads before a compaction gives up on a session other processes keep changing
+COMPACTION_SAVE_ATTEMPTS = 3
+
+
+def history_tokens(summary: str, turns: List[Turn]) -> int:
+    return estimate_tokens(summary) + sum(estimate_tokens(user) + estimate_tokens(answer) for user, answer in turns)
+
+
+class _SessionStore:
+    """Blocking SQLite store; called through asyncio.to_thread"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chat_sessions ("
+            " id TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL DEFAULT '',"
+            " turns TEXT NOT NULL DEFAULT '[]',"
+            " created_at REAL NOT NULL,"
+            " updated_at REAL NOT NULL,"
+            " version INTEGER NOT NULL DEFAULT 0)"
+        )
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(chat_sessions)")}
+        if "version" not in columns:
+            self._conn.execute("ALTER TABLE chat_sessions ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chat_sessions_updated ON chat_sessions (updated_at)")
+        self._conn.commit()
+
+    def insert(self, session_id: str, now: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO chat_sessions (id, created_at, updated_at) VALUES (?, ?, ?)",
+                (session_id, now, now),
+            )
+            self._conn.commit()
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM chat_sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        session = dict(row)
+        session["turns"] = [tuple(turn) for turn in json.loads(session["turns"])]
+        return session
+
+    def append(self, session_id: str, turn: Turn, now: float) -> bool:
+        """Append one turn in place, so appends from other processes are kept"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE chat_sessions SET turns = json_insert(turns, '$[#]', json(?)),"
+                " version = version + 1, updated_at = ? WHERE id = ?",
+                (json.dumps(turn, separators=(",", ":")), now, session_id),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def save(self, session_id: str, summary: str, turns: List[Turn], version: int, now: float) -> bool:
+        """Replace the history unless the session changed since it was read at version"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE chat_sessions SET summary = ?, turns = ?, version = version + 1, updated_at = ?"
+                " WHERE id = ? AND version = ?",
+                (summary, json.dumps(turns, separators=(",", ":")), now, session_id, version),
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM chat_sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def purge(self, updated_before: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM chat_sessions WHERE updated_at < ?", (updated_before,))
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ChatSessions:
+    """
+    Persistent chat sessions with compacted history.
+
+    - token_budget: estimated history tokens that trigger compaction
+      (CHAT_HISTORY_TOKEN_BUDGET, default 3000)
+    - keep_turns: newest turns kept verbatim when compacting, fewer if they
+      alone would take over half the budget (CHAT_HISTORY_KEEP_TURNS, default 4)
+    - ttl_seconds: idle sessions are deleted after this long (CHAT_SESSION_TTL, default 604800)
+    - db_path: SQLite file (CHAT_SESSIONS_DB, default chat_sessions.db)
+
+    Turns are appended in SQL and a compaction is saved only if the
+    session's version is still the one it read, so concurrent messages,
+    even in other worker processes, cannot lose each other's updates.
+    Within a process, turns of one session are serialized with a
+    per-session lock. Compaction summarizes outside the lock and only
+    takes it to save the result, keeping any turns added while the
+    summary was written.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        keep_turns: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        db_path: Optional[str] = None,
+    ):
+        self.token_budget = token_budget or int(os.getenv("CHAT_HISTORY_TOKEN_BUDGET", "3000"))
+        self.keep_turns = keep_turns or int(os.getenv("CHAT_HISTORY_KEEP_TURNS", "4"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("CHAT_SESSION_TTL", "604800"))
+        self.db_path = db_path or os.getenv("CHAT_SESSIONS_DB", "chat_sessions.db")
+
+        self._store: Optional[_SessionStore] = None
+        self._locks: Dict[str, List[Any]] = {}
+        self._compactions: Set[asyncio.Task] = set()
+        self._compacting: Set[str] = set()
+        self._purged_at = 0.0
+
+        self.created = 0
+        self.turns = 0
+        self.compactions = 0
+        self.compaction_failures = 0
+        self.summarized_turns = 0
+
+    async def start(self) -> None:
+        self._store = await asyncio.to_thread(_SessionStore, self.db_path)
+        await self._purge()
+
+    async def stop(self, timeout: float = 0) -> None:
+        """Give pending compactions up to timeout seconds and cancel the rest; they run again after the next turn"""
+        if self._compactions and timeout > 0:
+            await asyncio.wait(list(self._compactions), timeout=timeout)
+        for task in list(self._compactions):
+            task.cancel()
+        await asyncio.gather(*self._compactions, return_exceptions=True)
+        if self._store is not None:
+            await asyncio.to_thread(self._store.close)
+            self._store = None
+
+    async def create(self) -> Dict[str, Any]:
+        session_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._store.insert, session_id, time.time())
+        self.created += 1
+        if time.time() - self._purged_at > 3600:
+            await self._purge()
+        return await self.get(session_id)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._store.get, session_id)
+
+    async def delete(self, session_id: str) -> bool:
+        return await asyncio.to_thread(self._store.delete, session_id)
+
+    @asynccontextmanager
+    async def lock(self, session_id: str) -> AsyncIterator[None]:
+        """Hold a session for one turn"""
+        entry = self._locks.setdefault(session_id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+    async def add_turn(self, session: Dict[str, Any], message: str, answer: str) -> None:
+        """Append a finished turn to a session loaded under its lock"""
+        session["turns"] = [*session["turns"], (message, answer)]
+        await asyncio.to_thread(self._store.append, session["id"], (message, answer), time.time())
+        self.turns += 1
+
+    def needs_compaction(self, session: Dict[str, Any]) -> bool:
+        return len(session["turns"]) > 1 and history_tokens(session["summary"], session["turns"]) > self.token_budget
+
+    def compact_later(self, session: Dict[str, Any], summarize: Summarizer) -> None:
+        """Fold old turns into the summary in the background if the history is over budget"""
+        if session["id"] in self._compacting or not self.needs_compaction(session):
+            return
+        self._compacting.add(session["id"])
+        task = asyncio.create_task(self._compact(session["id"], summarize))
+        self._compactions.add(task)
+        task.add_done_callback(self._compactions.discard)
+        task.add_done_callback(lambda _: self._compacting.discard(session["id"]))
+
+    def _split(self, turns: List[Turn]) -> int:
+        """Index of the first turn kept verbatim"""
+        kept_tokens = 0
+        index = len(turns)
+        while index > 0 and len(turns) - index < self.keep_turns:
+            user, answer = turns[index - 1]
+            tokens = estimate_tokens(user) + estimate_tokens(answer)
+            if index < len(turns) and kept_tokens + tokens > self.token_budget // 2:
+                break
+            kept_tokens += tokens
+            index -= 1
+        return index
+
+    async def _compact(self, session_id: str, summarize: Summarizer) -> None:
+        # The summary call can take a while; turns of the session go on meanwhile
+        session = await self.get(session_id)
+        if session is None or not self.needs_compaction(session):
+            return
+        split = self._split(session["turns"])
+        older = session["turns"][:split]
+        if not older:
+            return
+        try:
+            summary = await summarize(session["summary"], older)
+        except Exception as e:
+            # Keep the prompt bounded anyway; the dropped turns are lost
+            logger.warning(f"Could not summarize chat session {session_id}, dropping {len(older)} turns: {str(e)}")
+            self.compaction_failures += 1
+            summary = session["summary"]
+        # A runaway summary must not undo the budget: at most a quarter of it (~4 chars per token)
+        summary = summary.strip()[: self.token_budget]
+        async with self.lock(session_id):
+            for _ in range(COMPACTION_SAVE_ATTEMPTS):
+                current = await self.get(session_id)
+                if current is None or current["summary"] != session["summary"] or current["turns"][:split] != older:
+                    # Deleted or compacted meanwhile
+                    return
+                recent = current["turns"][split:]
+                if await asyncio.to_thread(self._store.save, session_id, summary, recent, current["version"], time.time()):
+                    break
+                # Another worker process changed the session since it was read
+            else:
+                logger.warning(f"Chat session {session_id} kept changing, compaction skipped")
+                return
+        self.compactions += 1
+        self.summarized_turns += len(older)
+
+    async def _purge(self) -> None:
+        self._purged_at = time.time()
+        removed = await asyncio.to_thread(self._store.purge, self._purged_at - self.ttl_seconds)
+        if removed:
+            logger.info(f"Purged {removed} idle chat sessions")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "created": self.created,
+            "turns": self.turns,
+            "compactions": self.compactions,
+            "compaction_failures": self.compaction_failures,
+            "summarized_turns": self.summarized_turns,
+            "compactions_running": len(self._compactions),
+        }
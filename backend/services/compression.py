@@ -0,0 +1,130 @@
+"""
+Compression - gzip/brotli for complete JSON and text responses
+
+Explanations are tens of KB of markdown and long schedules over 100 KB of
+JSON; they compress about 4x and 7x (benchmarks/compression_bench.py).
+The middleware compresses a response when:
+- the client accepts br (preferred, when the brotli package is installed) or gzip
+- it is a complete (non-streaming) response with a compressible content type
+- its body is at least COMPRESS_MIN_BYTES (default 1024) and shrinks
+
+Streaming responses (SSE, NDJSON) are passed through untouched: compressing
+them would hold back events until the compressor flushes. A strong ETag on
+a compressed response gets the encoding appended ("<tag>-gzip"), since it
+no longer names the identity bytes; services/conditional.py accepts either
+form in If-None-Match.
+"""
+
+import gzip
+import os
+from typing import Any, Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+_counts = {"responses": 0, "gzip": 0, "br": 0, "identity_bytes": 0, "compressed_bytes": 0}
+
+
+def compression_stats() -> Dict[str, Any]:
+    return dict(_counts)
+
+
+def accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """Best encoding in ENCODINGS the Accept-Encoding header allows (q > 0), or None"""
+    accepted = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[name.strip()] = quality
+    for encoding in ENCODINGS:
+        if accepted.get(encoding, accepted.get("*", 0.0)) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return content_type.startswith(COMPRESSIBLE_TYPES) and "content-encoding" not in headers
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete responses.
+
+    - minimum_size: smallest body worth compressing (COMPRESS_MIN_BYTES, default 1024)
+    - gzip_level: COMPRESS_GZIP_LEVEL (default 6)
+    - brotli_quality: COMPRESS_BROTLI_QUALITY (default 5; 11 is 50-100x slower
+      for bodies about 10% smaller)
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: Optional[int] = None,
+        gzip_level: Optional[int] = None,
+        brotli_quality: Optional[int] = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size if minimum_size is not None else int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+        self.gzip_level = gzip_level if gzip_level is not None else int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+        self.brotli_quality = brotli_quality if brotli_quality is not None else int(
+            os.getenv("COMPRESS_BROTLI_QUALITY", "5")
+        )
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = accepted_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        start_message = None
+
+        async def send_wrapper(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                # Only complete responses carry a Content-Length; streams pass straight through
+                if "content-length" in headers and is_compressible(headers):
+                    start_message = message
+                    return
+            elif message["type"] == "http.response.body" and start_message is not None:
+                start, start_message = start_message, None
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                body = message.get("body", b"")
+                if encoding is not None and len(body) >= self.minimum_size and not message.get("more_body"):
+                    compressed = self.compress(body, encoding)
+                    if len(compressed) < len(body):
+                        headers["Content-Encoding"] = encoding
+                        headers["Content-Length"] = str(len(compressed))
+                        etag = headers.get("etag")
+                        if etag is not None and etag.endswith('"') and not etag.startswith("W/"):
+                            headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+                        _counts["responses"] += 1
+                        _counts[encoding] += 1
+                        _counts["identity_bytes"] += len(body)
+                        _counts["compressed_bytes"] += len(compressed)
+                        message = {**message, "body": compressed}
+                await send(start)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
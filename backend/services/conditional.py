@@ -0,0 +1,86 @@
+"""
+Conditional requests - Strong ETags and 304 Not Modified for cacheable GETs
+
+A GET of cached content carries a strong ETag naming exactly the bytes it
+returns: for generated content it is derived from the response cache key
+and the time the cached entry was generated, so it changes when the entry
+is regenerated (expiry, new model or prompt version) and never otherwise.
+A client that sends the tag back in If-None-Match gets an empty 304 and
+keeps its copy, skipping serialization, compression and the transfer.
+"""
+
+import hashlib
+import os
+from typing import Any, Callable, Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+from services.compression import ENCODINGS
+from services.serialization import FastJSONResponse
+
+# How long clients may reuse a response before revalidating it
+HTTP_CACHE_MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", "300"))
+
+_counts = {"responses": 0, "not_modified": 0}
+
+
+def conditional_stats() -> Dict[str, Any]:
+    return dict(_counts)
+
+
+def strong_etag(*parts: Any) -> str:
+    """Quoted strong entity tag for the given parts"""
+    digest = hashlib.sha256("\x1f".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def matching_etag(if_none_match: Optional[str], etag: str) -> Optional[str]:
+    """
+    The tag in an If-None-Match header that matches etag, or None
+
+    Uses the weak comparison If-None-Match calls for, and also accepts the
+    tag with an encoding suffix added by CompressionMiddleware.
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == "*":
+        return etag
+    opaque = etag.strip('"')
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        value = candidate[2:] if candidate.startswith("W/") else candidate
+        value = value.strip('"')
+        for encoding in ENCODINGS:
+            value = value.removesuffix(f"-{encoding}")
+        if value == opaque:
+            return candidate
+    return None
+
+
+def cache_headers(etag: Optional[str], max_age: Optional[int] = None) -> Dict[str, str]:
+    if etag is None:
+        # Placeholder content: never reuse it
+        return {"Cache-Control": "no-store"}
+    max_age = HTTP_CACHE_MAX_AGE if max_age is None else max_age
+    return {"ETag": etag, "Cache-Control": f"max-age={max_age}"}
+
+
+def conditional_response(
+    request: Request,
+    etag: Optional[str],
+    content: Callable[[], Any],
+    max_age: Optional[int] = None,
+) -> Response:
+    """
+    304 if the request's If-None-Match matches etag, else a 200 JSON response
+    of content(), built only when needed. etag None means not cacheable.
+    """
+    _counts["responses"] += 1
+    if etag is not None:
+        matched = matching_etag(request.headers.get("if-none-match"), etag)
+        if matched is not None:
+            _counts["not_modified"] += 1
+            # Echo the tag the client holds: it may name a compressed representation
+            return Response(status_code=304, headers=cache_headers(matched, max_age))
+    return FastJSONResponse(content(), headers=cache_headers(etag, max_age))
@@ -0,0 +1,455 @@
+"""
+Jobs - Background generation with a bounded worker pool
+
+Long generations can be submitted as jobs: the request returns a job id at
+once, a fixed pool of workers runs the generation, and clients poll or
+subscribe for the result. Jobs live in SQLite (JOBS_DB), so finished
+results survive a restart and jobs that were queued or running when the
+process stopped are picked up again on startup.
+
+Several server processes can share one JOBS_DB. A worker claims a job with
+a conditional update before it runs it, taking a lease (JOB_LEASE_SECONDS)
+that it renews while the handler runs. A running job can only be claimed
+again once its lease has expired, i.e. its process died or released it on
+shutdown, so a job resumed by every process at startup still runs once. A
+worker that fails to renew its lease cancels the handler, and the outcome
+is only recorded by the worker that still holds the job.
+Each process periodically requeues running jobs whose lease expired, and
+waiters re-read the store periodically to see changes made by another
+process.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from .limiter import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATES = ("succeeded", "failed")
+
+JobHandler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class _LeaseLost(Exception):
+    """This process no longer holds the lease on the job it is running"""
+
+
+class _JobStore:
+    """Blocking SQLite store; called through asyncio.to_thread"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY,"
+            " kind TEXT NOT NULL,"
+            " status TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " result TEXT,"
+            " error TEXT,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " created_at REAL NOT NULL,"
+            " started_at REAL,"
+            " finished_at REAL,"
+            " owner TEXT,"
+            " lease_until REAL)"
+        )
+        # Stores created before leases existed
+        columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+        for column, kind in (("owner", "TEXT"), ("lease_until", "REAL")):
+            if column not in columns:
+                self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {kind}")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)")
+        self._conn.commit()
+
+    @staticmethod
+    def _to_dict(row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def insert(self, job_id: str, kind: str, params: Dict[str, Any], created_at: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, created_at) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params), created_at),
+            )
+            self._conn.commit()
+
+    def claim(self, job_id: str, owner: str, attempts: int, started_at: float, lease_until: float) -> bool:
+        """
+        Mark a job running as attempt `attempts` under a lease held by owner
+
+        Only a queued job, a running job whose lease has expired, or one
+        the owner already holds (a retry) can be claimed. False if another
+        worker holds or got the job first.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET status = 'running', started_at = ?, attempts = ?, owner = ?, lease_until = ?"
+                " WHERE id = ? AND attempts = ? AND (status = 'queued'"
+                " OR (status = 'running' AND (owner = ? OR lease_until IS NULL OR lease_until < ?)))",
+                (started_at, attempts, owner, lease_until, job_id, attempts - 1, owner, started_at),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def renew(self, job_id: str, owner: str, lease_until: float) -> bool:
+        """Extend the owner's lease on a running job; False if it no longer holds it"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE id = ? AND owner = ? AND status = 'running'",
+                (lease_until, job_id, owner),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def release(self, owner: str) -> int:
+        """Expire the owner's leases so another process can resume its running jobs at once"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET lease_until = 0 WHERE owner = ? AND status = 'running'", (owner,)
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def expired(self, now: float) -> List[str]:
+        """Ids of running jobs whose lease has expired"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status = 'running' AND (lease_until IS NULL OR lease_until < ?)",
+                (now,),
+            ).fetchall()
+        return [row["id"] for row in rows]
+
+    def finish(self, job_id: str, owner: str, **fields: Any) -> bool:
+        """Record the outcome of a running job; False if owner no longer holds it"""
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        columns = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock:
+            cursor = self._conn.execute(
+                f"UPDATE jobs SET {columns} WHERE id = ? AND owner = ? AND status = 'running'",
+                (*fields.values(), job_id, owner),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._to_dict(row) if row is not None else None
+
+    def unfinished(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+
+    def purge(self, finished_before: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('succeeded', 'failed') AND finished_at < ?",
+                (finished_before,),
+            )
+            self._conn.commit()
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class JobManager:
+    """
+    Persistent job queue with a fixed number of workers.
+
+    - workers: jobs running at once (JOB_WORKERS, default 4)
+    - max_pending: queued jobs accepted before submit returns 503
+      (JOB_MAX_PENDING, default 100)
+    - ttl_seconds: how long finished jobs are kept (JOB_TTL, default 86400)
+    - db_path: SQLite file (JOBS_DB, default jobs.db)
+    - poll_interval: how often waiters re-read a job that another process
+      may be running (JOB_POLL_INTERVAL, default 1 second)
+    - lease_seconds: how long a claim lasts without renewal; a running job
+      of a process that died is resumed elsewhere after this
+      (JOB_LEASE_SECONDS, default 30)
+
+    A job that is refused by upstream admission control waits for the
+    Retry-After hint and tries again, up to max_attempts times.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        db_path: Optional[str] = None,
+        max_attempts: int = 5,
+        poll_interval: Optional[float] = None,
+        lease_seconds: Optional[float] = None,
+    ):
+        self.workers = workers or int(os.getenv("JOB_WORKERS", "4"))
+        self.max_pending = max_pending or int(os.getenv("JOB_MAX_PENDING", "100"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("JOB_TTL", "86400"))
+        self.db_path = db_path or os.getenv("JOBS_DB", "jobs.db")
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval or float(os.getenv("JOB_POLL_INTERVAL", "1"))
+        self.lease_seconds = lease_seconds or float(os.getenv("JOB_LEASE_SECONDS", "30"))
+        # Identifies this process's claims in a shared store
+        self.owner = uuid.uuid4().hex
+
+        self._handlers: Dict[str, JobHandler] = {}
+        self._store: Optional[_JobStore] = None
+        self._queue: "asyncio.Queue[str]" = asyncio.Queue()
+        self._tasks: List[asyncio.Task] = []
+        self._changed: Dict[str, asyncio.Event] = {}
+        self._purged_at = 0.0
+        self._draining = False
+
+        self.submitted = 0
+        self.running = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.resumed = 0
+        self.reclaimed = 0
+        self.lost_leases = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        """Register the coroutine that runs jobs of a kind; it gets the job params"""
+        self._handlers[kind] = handler
+
+    async def start(self) -> None:
+        """Open the store, resume unfinished jobs and start the workers"""
+        self._store = await asyncio.to_thread(_JobStore, self.db_path)
+        await self._purge()
+        for job in await asyncio.to_thread(self._store.unfinished):
+            if job["kind"] in self._handlers:
+                self.resumed += 1
+                self._queue.put_nowait(job["id"])
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._reclaim_expired()))
+
+    async def stop(self, timeout: float = 0) -> None:
+        """
+        Stop the workers. No new job is started; running jobs get up to
+        timeout seconds to finish; the leases of the rest are released so
+        another process, or the next start, resumes them.
+        """
+        self._draining = True
+        deadline = time.monotonic() + timeout
+        while self.running and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self.running:
+            logger.warning(f"Stopping with {self.running} jobs still running; they resume on the next start")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._store is not None:
+            await asyncio.to_thread(self._store.release, self.owner)
+            await asyncio.to_thread(self._store.close)
+            self._store = None
+
+    async def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Queue a job
+
+        Args:
+            kind: A registered job kind
+            params: JSON-serializable parameters passed to the handler
+
+        Returns:
+            The new job record (status "queued")
+        """
+        if kind not in self._handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if self._draining:
+            raise AdmissionRejected(503, "Server is shutting down, try again shortly", 5)
+        if self._queue.qsize() >= self.max_pending:
+            raise AdmissionRejected(503, "Job queue is full, try again shortly", 5)
+
+        job_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._store.insert, job_id, kind, params, time.time())
+        self.submitted += 1
+        self._queue.put_nowait(job_id)
+        if time.time() - self._purged_at > 3600:
+            await self._purge()
+        return await self.get(job_id)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._store.get, job_id)
+
+    async def wait_for_change(self, job_id: str, seen_status: Optional[str], timeout: float) -> Optional[Dict[str, Any]]:
+        """The job once its status differs from seen_status, or as it is after timeout seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            # Take the event before reading so an update in between is not missed
+            changed = self._changed.setdefault(job_id, asyncio.Event())
+            job = await self.get(job_id)
+            if job is None or job["status"] in TERMINAL_STATES:
+                # Nothing will ever set the event again
+                self._changed.pop(job_id, None)
+                return job
+            remaining = deadline - time.monotonic()
+            if job["status"] != seen_status or remaining <= 0:
+                return job
+            try:
+                # Bounded so a change made by another server process is seen too
+                await asyncio.wait_for(changed.wait(), timeout=min(remaining, self.poll_interval))
+            except asyncio.TimeoutError:
+                pass
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """The job once it has finished, or as it is after timeout seconds"""
+        deadline = time.monotonic() + timeout
+        job = await self.get(job_id)
+        while job is not None and job["status"] not in TERMINAL_STATES:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            job = await self.wait_for_change(job_id, job["status"], remaining)
+        return job
+
+    async def _finish(self, job_id: str, **fields: Any) -> bool:
+        """Record a job's outcome unless another process has taken it over"""
+        if not await asyncio.to_thread(self._store.finish, job_id, self.owner, **fields):
+            logger.warning(f"Job {job_id} was taken over by another process, its outcome here is discarded")
+            return False
+        self._notify(job_id)
+        return True
+
+    def _notify(self, job_id: str) -> None:
+        """Wake local waiters of a job whose status changed"""
+        event = self._changed.pop(job_id, None)
+        if event is not None:
+            event.set()
+
+    async def _purge(self) -> None:
+        self._purged_at = time.time()
+        removed = await asyncio.to_thread(self._store.purge, self._purged_at - self.ttl_seconds)
+        if removed:
+            logger.info(f"Purged {removed} expired jobs")
+
+    async def _reclaim_expired(self) -> None:
+        """Queue running jobs whose lease expired (their process died) so a worker here resumes them"""
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            for job_id in await asyncio.to_thread(self._store.expired, time.time()):
+                self.reclaimed += 1
+                self._queue.put_nowait(job_id)
+
+    async def _heartbeat(self, job_id: str) -> None:
+        """Renew the lease on a job while its handler runs; returns once the lease is lost"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            if not await asyncio.to_thread(self._store.renew, job_id, self.owner, time.time() + self.lease_seconds):
+                return
+
+    async def _handle(self, job_id: str, handler: JobHandler, params: Dict[str, Any]) -> Any:
+        """
+        Run a handler under the job's lease
+
+        Raises:
+            _LeaseLost: if the lease could not be renewed; the handler is cancelled
+        """
+        work = asyncio.ensure_future(handler(params))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id))
+        try:
+            await asyncio.wait({work, heartbeat}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            heartbeat.cancel()
+            if not work.done():
+                work.cancel()
+                await asyncio.gather(work, return_exceptions=True)
+        if work.cancelled():
+            raise _LeaseLost()
+        return work.result()
+
+    async def _worker(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job {job_id} could not be recorded: {str(e)}")
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job_id: str) -> None:
+        if self._draining:
+            # Left queued in the store; resumed on the next start
+            return
+        job = await self.get(job_id)
+        if job is None or job["status"] in TERMINAL_STATES:
+            return
+        handler = self._handlers[job["kind"]]
+        attempts = job["attempts"]
+
+        self.running += 1
+        try:
+            while True:
+                attempts += 1
+                now = time.time()
+                if not await asyncio.to_thread(
+                    self._store.claim, job_id, self.owner, attempts, now, now + self.lease_seconds
+                ):
+                    # Held by another worker process
+                    return
+                self._notify(job_id)
+                try:
+                    result = await self._handle(job_id, handler, job["params"])
+                except AdmissionRejected as e:
+                    if attempts >= self.max_attempts:
+                        raise
+                    # Upstream is saturated; the client is not waiting on this request
+                    await asyncio.sleep(e.retry_after)
+                    continue
+                break
+            if hasattr(result, "model_dump"):
+                result = result.model_dump(mode="json")
+            if await self._finish(job_id, status="succeeded", result=result, finished_at=time.time()):
+                self.succeeded += 1
+        except asyncio.CancelledError:
+            # Shutting down: the job stays "running" and stop() releases its lease
+            raise
+        except _LeaseLost:
+            # Another process has reclaimed the job and runs it
+            logger.warning(f"Lost the lease on job {job_id}, stopped running it")
+            self.lost_leases += 1
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['kind']}) failed: {str(e)}")
+            detail = getattr(e, "detail", None) or str(e)
+            if await self._finish(job_id, status="failed", error=str(detail), finished_at=time.time()):
+                self.failed += 1
+        finally:
+            self.running -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "running": self.running,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "resumed": self.resumed,
+            "reclaimed": self.reclaimed,
+            "lost_leases": self.lost_leases,
+        }
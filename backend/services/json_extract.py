@@ -0,0 +1,253 @@
+"""
+JSON Extract - Fault-tolerant JSON extraction from LLM output
+
+Models wrap JSON in markdown fences, add a sentence before or after it,
+leave trailing commas, type smart quotes, or run out of tokens halfway
+through an array. extract_json() finds the first JSON object in such
+text and only falls back to repairing it when it does not parse as is:
+
+1. json's C decoder (raw_decode) at the first "{": fences, preamble and
+   trailing chatter cost nothing extra
+2. repair_json(): one pass that swaps smart quotes used as delimiters
+   (a smart quote only closes a string a smart quote opened),
+   escapes raw newlines and stray quotes inside strings, drops trailing commas and, if the
+   text ends early, cuts back to the last complete value and closes the
+   open containers (a truncated array keeps its finished items)
+
+ArrayItemStream does the same incrementally for streamed output, yielding
+each object of an array as soon as it closes.
+(benchmarks/json_extract_bench.py compares this with plain fence stripping.)
+"""
+
+import json
+from typing import Any, Dict, List, Optional
+
+# Typographic double quotes models use instead of '"'
+SMART_QUOTES = frozenset("“”„‟″")
+
+# Candidate "{" positions tried before giving up (a preamble may contain braces)
+MAX_CANDIDATES = 3
+
+_decoder = json.JSONDecoder()
+
+_counts = {"parsed": 0, "repaired": 0, "failed": 0}
+
+
+def repair_json(text: str, start: int = 0) -> Optional[str]:
+    """
+    Rewrite the JSON value starting at text[start] ("{" or "[") into valid JSON text
+
+    Text after the value closes is ignored. Returns None if text[start]
+    does not open a container.
+    """
+    if start >= len(text) or text[start] not in "{[":
+        return None
+
+    out: List[str] = []
+    stack: List[str] = []
+    in_string = False
+    # Opened by a smart quote: only then may a smart quote close it
+    smart_string = False
+    escaped = False
+    # stack depth -> output length after the last complete value at that depth
+    safe: Dict[int, int] = {}
+
+    end = len(text)
+    for index in range(start, end):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+                out.append(char)
+            elif char == "\\":
+                escaped = True
+                out.append(char)
+            elif char == '"' or (smart_string and char in SMART_QUOTES):
+                # A quote only ends the string if JSON structure follows;
+                # otherwise it is an unescaped quote inside the text
+                after = index + 1
+                while after < end and text[after] in " \t\r\n":
+                    after += 1
+                if after == end or text[after] in ":,}]":
+                    in_string = False
+                    out.append('"')
+                else:
+                    out.append('\\"' if char == '"' else char)
+            elif char == "\n":
+                out.append("\\n")
+            elif char == "\r":
+                out.append("\\r")
+            elif char == "\t":
+                out.append("\\t")
+            else:
+                out.append(char)
+            continue
+
+        if char == '"' or char in SMART_QUOTES:
+            in_string = True
+            smart_string = char != '"'
+            out.append('"')
+        elif char in "{[":
+            stack.append(char)
+            out.append(char)
+            safe[len(stack)] = len(out)
+        elif char in "}]":
+            # Trailing comma before the closer
+            while out and out[-1] in " \t\r\n":
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append("}" if char == "}" else "]")
+            if not stack:
+                return "".join(out)
+            safe[len(stack)] = len(out)
+        elif char == ",":
+            safe[len(stack)] = len(out)
+            out.append(char)
+        else:
+            out.append(char)
+
+    # Truncated: cut back to the last complete value and close the open
+    # containers. Inside an array, an unfinished element is dropped whole.
+    depth = stack.index("[") + 1 if "[" in stack else len(stack)
+    length, depth = max((safe[d], d) for d in safe if d <= depth)
+    kept = "".join(out[:length]).rstrip()
+    if kept.endswith(","):
+        kept = kept[:-1]
+    return kept + "".join("}" if c == "{" else "]" for c in reversed(stack[:depth]))
+
+
+def _candidates(text: str) -> List[int]:
+    positions = []
+    index = text.find("{")
+    while index != -1 and len(positions) < MAX_CANDIDATES:
+        positions.append(index)
+        index = text.find("{", index + 1)
+    return positions
+
+
+def extract_json(text: str) -> Optional[Dict[str, Any]]:
+    """
+    First JSON object in model output, repairing it if necessary
+
+    Returns:
+        The parsed object, or None if no object could be recovered
+    """
+    text = text or ""
+    for start in _candidates(text):
+        try:
+            value, _ = _decoder.raw_decode(text, start)
+            _counts["parsed"] += 1
+            return value
+        except json.JSONDecodeError:
+            pass
+        try:
+            value = json.loads(repair_json(text, start))
+            _counts["repaired"] += 1
+            return value
+        except json.JSONDecodeError:
+            continue
+
+    _counts["failed"] += 1
+    return None
+
+
+def extraction_stats() -> Dict[str, Any]:
+    return dict(_counts)
+
+
+class ArrayItemStream:
+    """
+    Incremental parser that yields each object inside a JSON array as soon
+    as its closing brace arrives.
+
+    Text outside the JSON (markdown fences, preamble) is ignored. Only the
+    characters of the current unfinished object are buffered; an object
+    that does not parse as is goes through repair_json.
+
+    Example:
+        parser = ArrayItemStream()
+        for chunk in chunks:
+            for item in parser.feed(chunk):
+                ...
+    """
+
+    def __init__(self):
+        self._stack: List[str] = []     # open containers: "{" or "["
+        self._in_string = False
+        self._smart_string = False
+        self._quote_pending = False
+        self._escaped = False
+        self._item_depth = None          # stack depth of the object being captured
+        self._buffer: List[str] = []
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Consume a chunk of text
+
+        Args:
+            chunk: Next piece of model output
+
+        Returns:
+            Objects completed by this chunk, in order
+        """
+        items = []
+        for char in chunk:
+            if self._item_depth is not None:
+                self._buffer.append(char)
+
+            if self._in_string and self._quote_pending:
+                # Same rule as repair_json: the quote closed the string only
+                # if JSON structure follows it
+                if char in " \t\r\n":
+                    continue
+                self._quote_pending = False
+                if char in ":,}]":
+                    self._in_string = False
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"' and not self._smart_string:
+                    self._in_string = False
+                elif self._smart_string and (char == '"' or char in SMART_QUOTES):
+                    self._quote_pending = True
+                continue
+
+            if char == '"' or char in SMART_QUOTES:
+                if self._stack:
+                    self._in_string = True
+                    self._smart_string = char != '"'
+            elif char == "{":
+                if self._item_depth is None and self._stack and self._stack[-1] == "[":
+                    self._item_depth = len(self._stack)
+                    self._buffer = ["{"]
+                self._stack.append("{")
+            elif char == "[":
+                self._stack.append("[")
+            elif char in "}]":
+                if not self._stack:
+                    continue
+                self._stack.pop()
+                if char == "}" and self._item_depth == len(self._stack):
+                    item = self._parse("".join(self._buffer))
+                    self._item_depth = None
+                    self._buffer = []
+                    if isinstance(item, dict):
+                        items.append(item)
+        return items
+
+    @staticmethod
+    def _parse(raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return json.loads(repair_json(raw))
+        except json.JSONDecodeError:
+            return None
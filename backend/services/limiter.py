@@ -0,0 +1,142 @@
+"""
+Upstream Limiter - Admission control for LLM calls
+
+Bounds how many OpenRouter calls are in flight (semaphore), how fast new
+ones start (token bucket) and how many requests may wait for a slot.
+Anything beyond that is rejected immediately with a Retry-After hint.
+"""
+
+import asyncio
+import math
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """Raised when an upstream call is refused; maps to an HTTP error"""
+
+    def __init__(self, status_code: int, detail: str, retry_after: float):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class UpstreamLimiter:
+    """
+    Semaphore + token bucket with a bounded wait queue.
+
+    - max_concurrency: upstream calls in flight at once
+    - max_queue: requests allowed to wait for a slot; more get 503
+    - rate / burst: sustained calls per second and bucket size (rate 0 = off);
+      a call that would wait longer than max_wait for a token gets 429
+    - max_wait: longest a request may wait for a slot before 503
+    """
+
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        rate: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_wait: Optional[float] = None,
+    ):
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+        self.max_queue = max_queue if max_queue is not None else int(os.getenv("LLM_MAX_QUEUE", "64"))
+        self.rate = rate if rate is not None else float(os.getenv("LLM_RATE_LIMIT", "0"))
+        self.burst = burst or int(os.getenv("LLM_RATE_BURST", "10"))
+        self.max_wait = max_wait or float(os.getenv("LLM_MAX_WAIT", "10"))
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._tokens = float(self.burst)
+        self._refilled_at = time.monotonic()
+
+        self.in_flight = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_rate_limited = 0
+        self.rejected_timeout = 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def _token_wait(self) -> float:
+        """Seconds until a token is available (0 if one is available now)"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+
+    def check(self) -> None:
+        """
+        Fail fast if a call would be rejected right now, without reserving
+        anything. Used before starting a streaming response.
+        """
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected_queue_full += 1
+            raise AdmissionRejected(503, "Upstream queue is full, try again shortly", self.max_wait)
+        wait = self._token_wait()
+        if wait > self.max_wait:
+            self.rejected_rate_limited += 1
+            raise AdmissionRejected(429, "Upstream rate limit reached, try again shortly", wait)
+
+    async def acquire(self) -> None:
+        """Wait for a token and a slot, or raise AdmissionRejected"""
+        self.check()
+
+        wait = 0.0
+        if self.rate > 0:
+            # Reserve a token now; the bucket may go negative while we sleep
+            wait = self._token_wait()
+            self._tokens -= 1
+
+        if wait > 0 or self._semaphore.locked():
+            self.waiting += 1
+            try:
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                self.rejected_timeout += 1
+                raise AdmissionRejected(503, "Timed out waiting for an upstream slot", self.max_wait)
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+
+        self.in_flight += 1
+        self.admitted += 1
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        """Hold an upstream slot for the duration of the block"""
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "rate_limit": self.rate,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected_queue_full": self.rejected_queue_full,
+            "rejected_rate_limited": self.rejected_rate_limited,
+            "rejected_timeout": self.rejected_timeout,
+        }
+
+
+upstream_limiter = UpstreamLimiter()
@@ -0,0 +1,202 @@
+"""
+Resilience - Retries and circuit breaking for upstream LLM calls
+
+- Transient failures (429, 5xx, timeouts, dropped connections) are retried
+  with decorrelated-jitter backoff inside a total deadline per request.
+- Each model has a circuit breaker: after consecutive failures it fails fast
+  for a recovery period, then lets a single probe call through (half-open).
+"""
+
+import asyncio
+import os
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+import httpx
+
+from .limiter import AdmissionRejected, upstream_limiter
+from .metrics import observe_llm_call, record_usage
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(AdmissionRejected):
+    """Raised without calling upstream while a model's circuit is open"""
+
+    def __init__(self, model_name: str, retry_after: float):
+        super().__init__(503, f"Model {model_name} is temporarily unavailable", retry_after)
+        self.model_name = model_name
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether an exception is a transient upstream failure"""
+    if isinstance(exc, AdmissionRejected):
+        return False
+    if isinstance(exc, (asyncio.TimeoutError, httpx.TransportError)):
+        return True
+    # openai is imported lazily with the first client; without it this cannot be an openai error
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(exc, openai.APIConnectionError):
+        return True
+    status = getattr(exc, "status_code", None)
+    return status in RETRYABLE_STATUS
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    """Retry-After seconds sent by upstream, if any"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after", ""))
+    except ValueError:
+        return None
+
+
+@dataclass
+class RetryPolicy:
+    """Decorrelated-jitter backoff bounded by a total deadline"""
+    max_attempts: int = field(default_factory=lambda: int(os.getenv("LLM_RETRY_ATTEMPTS", "3")))
+    base_delay: float = field(default_factory=lambda: float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5")))
+    max_delay: float = field(default_factory=lambda: float(os.getenv("LLM_RETRY_MAX_DELAY", "8")))
+    deadline: float = field(default_factory=lambda: float(os.getenv("LLM_DEADLINE", "90")))
+
+    def next_delay(self, previous: float) -> float:
+        return min(self.max_delay, random.uniform(self.base_delay, max(self.base_delay, previous * 3)))
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe"""
+
+    def __init__(self, name: str, failure_threshold: Optional[int] = None, recovery_timeout: Optional[float] = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.recovery_timeout = recovery_timeout or float(os.getenv("CIRCUIT_RECOVERY_SECONDS", "30"))
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not reach upstream"""
+        if self.state == "open":
+            remaining = self.opened_at + self.recovery_timeout - time.monotonic()
+            if remaining > 0:
+                raise CircuitOpenError(self.name, remaining)
+            self.state = "half_open"
+            self._probe_in_flight = False
+        if self.state == "half_open":
+            if self._probe_in_flight:
+                raise CircuitOpenError(self.name, 1)
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self._probe_in_flight = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+            self.times_opened += 1
+
+    def record_other(self) -> None:
+        """A non-transient error: says nothing about upstream health"""
+        self._probe_in_flight = False
+
+    def record(self, exc: Optional[BaseException]) -> None:
+        if exc is None:
+            self.record_success()
+        elif is_retryable(exc):
+            self.record_failure()
+        else:
+            self.record_other()
+
+    @asynccontextmanager
+    async def guard(self) -> AsyncIterator[None]:
+        """Check and record around a single (e.g. streaming) call"""
+        self.before_call()
+        try:
+            yield
+        except BaseException as exc:
+            self.record(exc)
+            raise
+        self.record(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "times_opened": self.times_opened,
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(model_name: str) -> CircuitBreaker:
+    """The process-wide circuit breaker for a model"""
+    if model_name not in _breakers:
+        _breakers[model_name] = CircuitBreaker(model_name)
+    return _breakers[model_name]
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
+
+
+async def call_upstream(
+    fn: Callable[[], Awaitable[Any]],
+    model_name: str,
+    policy: Optional[RetryPolicy] = None,
+    agent: str = "unknown",
+) -> Any:
+    """
+    Run an upstream LLM call with admission control, retries and circuit breaking
+
+    Each attempt holds a limiter slot only while it runs, never while
+    backing off. The whole call, including backoff, must finish within
+    policy.deadline seconds.
+
+    Args:
+        fn: Coroutine factory for one attempt (must be safe to repeat)
+        model_name: Model used, selects the circuit breaker
+        policy: Retry policy (defaults from environment)
+        agent: Agent name for latency and token metrics
+
+    Returns:
+        The result of the first successful attempt
+    """
+    policy = policy or RetryPolicy()
+    breaker = get_breaker(model_name)
+    deadline = time.monotonic() + policy.deadline
+    delay = policy.base_delay
+
+    for attempt in range(1, policy.max_attempts + 1):
+        breaker.before_call()
+        try:
+            async with upstream_limiter.slot():
+                remaining = deadline - time.monotonic()
+                with observe_llm_call(agent, model_name):
+                    result = await asyncio.wait_for(fn(), timeout=max(remaining, 0.001))
+        except BaseException as exc:
+            breaker.record(exc)
+            if not isinstance(exc, Exception) or not is_retryable(exc) or attempt == policy.max_attempts:
+                raise
+            delay = max(policy.next_delay(delay), _retry_after(exc) or 0)
+            if time.monotonic() + delay >= deadline:
+                raise
+            await asyncio.sleep(delay)
+        else:
+            breaker.record(None)
+            record_usage(agent, model_name, result)
+            return result
@@ -0,0 +1,299 @@
+"""
+Semantic Cache - Near-duplicate lookup for free-form chat questions
+
+Chat messages are rarely byte-identical, but "what is photosynthesis" and
+"explain photosynthesis please" deserve the same answer. Each message is
+reduced to hashed features (content words and their character trigrams,
+with filler words dropped) and folded into a 256-bit SimHash signature.
+The Hamming distance between two signatures estimates the angle between
+their feature vectors, so similarity = cos(pi * distance / 256).
+
+Signatures live in NumPy arrays, one per namespace (subject, difficulty,
+the numbers in the message and its question words - how, why, when,
+where, who - which must match exactly), and a lookup
+is a vectorized XOR + popcount over the namespace, with the second half
+of each signature only compared for rows the first half did not already
+rule out: well under a millisecond at 100k entries
+(benchmarks/semantic_cache_bench.py). Everything is local; no embedding service.
+"""
+
+import hashlib
+import math
+import os
+import re
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+SIGNATURE_BITS = 256
+_WORDS = SIGNATURE_BITS // 64
+
+# Question phrasing that does not change what is being asked
+STOPWORDS = frozenset("""
+a an the and or of to in on for with about from by at as into
+is are was were be been being do does did can could would should will shall may might must
+i me my we us our you your it its this that these those there here
+what whats which
+please pls explain describe tell give show define definition meaning mean means
+help understand know want need just really briefly
+some any more detail details
+""".split())
+
+# Question words that change what is being asked ("why did X start" is not
+# "when did X start"); "what" and "which" ask for the same as no question word
+INTERROGATIVES = {"how": "how", "why": "why", "when": "when", "where": "where",
+                  "who": "who", "whom": "who", "whose": "who"}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_NUMBER = re.compile(r"\d+(?:\.\d+)?")
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def _stem(word: str) -> str:
+    """Crude plural/possessive folding: newtons, newton's -> newton"""
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _interrogatives(message: str) -> str:
+    """The message's question words that select the kind of answer, e.g. "how why" """
+    kinds = {INTERROGATIVES[word] for word in _TOKEN.findall(message.lower()) if word in INTERROGATIVES}
+    return " ".join(sorted(kinds))
+
+
+def _features(message: str) -> Dict[str, float]:
+    """Weighted hashed-feature bag: content words, plus character trigrams for morphology"""
+    features: Dict[str, float] = {}
+    for word in _TOKEN.findall(message.lower().replace("'", "").replace("\u2019", "")):
+        if word in STOPWORDS or word.isdigit():
+            continue
+        word = _stem(word)
+        features["w:" + word] = features.get("w:" + word, 0.0) + 2.0
+        padded = f"<{word}>"
+        for i in range(len(padded) - 2):
+            gram = "c:" + padded[i:i + 3]
+            features[gram] = features.get(gram, 0.0) + 1.0
+    return features
+
+
+def signature(message: str) -> Optional[np.ndarray]:
+    """
+    SimHash signature of a message as SIGNATURE_BITS / 64 uint64 words
+
+    Returns:
+        The signature, or None if the message has no content words
+    """
+    features = _features(message)
+    if not features:
+        return None
+    digests = b"".join(
+        hashlib.blake2b(name.encode("utf-8"), digest_size=SIGNATURE_BITS // 8).digest()
+        for name in features
+    )
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(features), SIGNATURE_BITS)
+    weights = np.fromiter(features.values(), dtype=np.float32, count=len(features))
+    votes = weights @ (bits.astype(np.float32) * 2 - 1)
+    return np.packbits(votes > 0).view(np.uint64)
+
+
+def similarity(distance: int) -> float:
+    """Cosine similarity estimated from the Hamming distance of two signatures"""
+    return math.cos(math.pi * distance / SIGNATURE_BITS)
+
+
+def max_distance(threshold: float) -> int:
+    """Largest Hamming distance whose estimated similarity is still >= threshold"""
+    return int(SIGNATURE_BITS * math.acos(max(-1.0, min(1.0, threshold))) / math.pi)
+
+
+def parse_thresholds(spec: str) -> Dict[str, float]:
+    """Parse "science=0.85,mathematics:advanced=0.95" into {scope: threshold}"""
+    thresholds: Dict[str, float] = {}
+    for item in spec.split(","):
+        scope, _, value = item.partition("=")
+        if scope.strip() and value.strip():
+            thresholds[_normalize(scope).replace(" ", "")] = float(value)
+    return thresholds
+
+
+class _Namespace:
+    """Signatures of one namespace in column-major uint64 arrays, grown by doubling"""
+
+    def __init__(self, capacity: int = 64):
+        self.signatures = np.zeros((_WORDS, capacity), dtype=np.uint64)
+        self.entry_ids: List[int] = []
+        # Scratch buffers reused by every lookup
+        self._xor = np.empty(capacity, dtype=np.uint64)
+        self._bits = np.empty(capacity, dtype=np.uint8)
+        self._distance = np.empty(capacity, dtype=np.uint16)
+        self._mask = np.empty(capacity, dtype=bool)
+
+    def __len__(self) -> int:
+        return len(self.entry_ids)
+
+    def add(self, entry_id: int, sig: np.ndarray) -> int:
+        row = len(self.entry_ids)
+        if row == self.signatures.shape[1]:
+            capacity = row * 2
+            grown = np.zeros((_WORDS, capacity), dtype=np.uint64)
+            grown[:, :row] = self.signatures
+            self.signatures = grown
+            self._xor = np.empty(capacity, dtype=np.uint64)
+            self._bits = np.empty(capacity, dtype=np.uint8)
+            self._distance = np.empty(capacity, dtype=np.uint16)
+            self._mask = np.empty(capacity, dtype=bool)
+        self.signatures[:, row] = sig
+        self.entry_ids.append(entry_id)
+        return row
+
+    def remove(self, row: int) -> Optional[Tuple[int, int]]:
+        """Swap-remove a row; returns (entry_id, new_row) of the entry moved into it"""
+        last = len(self.entry_ids) - 1
+        moved = None
+        if row != last:
+            self.signatures[:, row] = self.signatures[:, last]
+            self.entry_ids[row] = self.entry_ids[last]
+            moved = (self.entry_ids[row], row)
+        self.entry_ids.pop()
+        return moved
+
+    def nearest(self, sig: np.ndarray, limit: int) -> Optional[Tuple[int, int]]:
+        """(row, Hamming distance) of the closest signature within limit bits, if any"""
+        n = len(self.entry_ids)
+        xor, bits, distance, mask = self._xor[:n], self._bits[:n], self._distance[:n], self._mask[:n]
+        # The first half of the signature already rules out almost every row
+        np.bitwise_xor(self.signatures[0, :n], sig[0], out=xor)
+        np.bitwise_count(xor, out=bits)
+        distance[:] = bits
+        for word in range(1, _WORDS // 2):
+            np.bitwise_xor(self.signatures[word, :n], sig[word], out=xor)
+            np.bitwise_count(xor, out=bits)
+            np.add(distance, bits, out=distance)
+        np.less_equal(distance, limit, out=mask)
+        candidates = np.flatnonzero(mask)
+        if candidates.size == 0:
+            return None
+
+        full = distance[candidates]
+        for word in range(_WORDS // 2, _WORDS):
+            full += np.bitwise_count(self.signatures[word, candidates] ^ sig[word])
+        best = int(full.argmin())
+        if full[best] > limit:
+            return None
+        return int(candidates[best]), int(full[best])
+
+
+class SemanticCache:
+    """
+    LRU cache of answers keyed by message meaning.
+
+    - max_entries: answers kept across all namespaces (SEMANTIC_CACHE_MAX_ENTRIES,
+      default 10000; 0 disables the cache)
+    - threshold: minimum estimated similarity for a hit (SEMANTIC_CACHE_THRESHOLD, default 0.9)
+    - thresholds: per-scope overrides, "subject" or "subject:difficulty"
+      (SEMANTIC_CACHE_THRESHOLDS, e.g. "mathematics=0.97,history:beginner=0.85")
+    - max_chars: longer messages are neither cached nor looked up
+      (SEMANTIC_CACHE_MAX_CHARS, default 500)
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        threshold: Optional[float] = None,
+        thresholds: Optional[Dict[str, float]] = None,
+        max_chars: Optional[int] = None,
+    ):
+        self.max_entries = max_entries if max_entries is not None else int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "10000"))
+        self.threshold = threshold or float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.9"))
+        self.thresholds = thresholds if thresholds is not None else parse_thresholds(os.getenv("SEMANTIC_CACHE_THRESHOLDS", ""))
+        self.max_chars = max_chars or int(os.getenv("SEMANTIC_CACHE_MAX_CHARS", "500"))
+
+        self._namespaces: Dict[Tuple[str, ...], _Namespace] = {}
+        # entry_id -> (namespace key, row, value), least recently used first
+        self._entries: "OrderedDict[int, Tuple[Tuple[str, ...], int, Any]]" = OrderedDict()
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.evictions = 0
+
+    def threshold_for(self, subject: Optional[str], difficulty: Optional[str]) -> float:
+        subject = _normalize(subject or "").replace(" ", "")
+        difficulty = _normalize(difficulty or "").replace(" ", "")
+        return self.thresholds.get(
+            f"{subject}:{difficulty}",
+            self.thresholds.get(subject, self.threshold)
+        )
+
+    def _prepare(self, message: str, subject: Optional[str], difficulty: Optional[str]):
+        if self.max_entries <= 0 or len(message) > self.max_chars:
+            return None, None
+        sig = signature(message)
+        if sig is None:
+            return None, None
+        # Numbers and question words change the question ("2 + 2" vs "3 + 3",
+        # "how do vaccines work" vs "why do vaccines work"), so they must match exactly
+        numbers = " ".join(_NUMBER.findall(message))
+        return (_normalize(subject or ""), _normalize(difficulty or ""), numbers, _interrogatives(message)), sig
+
+    def get(self, message: str, subject: Optional[str], difficulty: Optional[str]) -> Optional[Any]:
+        """The answer to the nearest cached message, if it is similar enough"""
+        namespace_key, sig = self._prepare(message, subject, difficulty)
+        if sig is None:
+            self.skipped += 1
+            return None
+        namespace = self._namespaces.get(namespace_key)
+        if namespace is None or len(namespace) == 0:
+            self.misses += 1
+            return None
+
+        nearest = namespace.nearest(sig, max_distance(self.threshold_for(subject, difficulty)))
+        if nearest is None:
+            self.misses += 1
+            return None
+
+        entry_id = namespace.entry_ids[nearest[0]]
+        self._entries.move_to_end(entry_id)
+        self.hits += 1
+        return self._entries[entry_id][2]
+
+    def set(self, message: str, subject: Optional[str], difficulty: Optional[str], value: Any) -> None:
+        namespace_key, sig = self._prepare(message, subject, difficulty)
+        if sig is None:
+            return
+        namespace = self._namespaces.setdefault(namespace_key, _Namespace())
+        entry_id = self._next_id
+        self._next_id += 1
+        self._entries[entry_id] = (namespace_key, namespace.add(entry_id, sig), value)
+        while len(self._entries) > self.max_entries:
+            self._evict()
+
+    def _evict(self) -> None:
+        _, (namespace_key, row, _) = self._entries.popitem(last=False)
+        namespace = self._namespaces[namespace_key]
+        moved = namespace.remove(row)
+        if moved is not None:
+            moved_id, new_row = moved
+            key, _, value = self._entries[moved_id]
+            self._entries[moved_id] = (key, new_row, value)
+        if len(namespace) == 0:
+            del self._namespaces[namespace_key]
+        self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "namespaces": len(self._namespaces),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,89 @@
+"""
+Serialization - Fast JSON encoding for API responses
+
+FastAPI's default path for an endpoint with a response_model dumps the
+returned model to a dict, validates that dict against the response model
+again, serializes it to JSON-compatible data and finally json.dumps. Our
+endpoints already return instances of their response model, built (and
+validated) from agent output, so all but the last step is repeated work,
+and it grows with the size of the response (schedule blocks, quiz
+questions, batch items).
+
+- FastJSONResponse: renders models with pydantic's own JSON serializer and
+  everything else with orjson; the app's default response class
+- FastRoute: route class that sends an endpoint's return value straight to
+  FastJSONResponse when it is an instance of the route's response model,
+  skipping the re-validation and intermediate copy; any other return value
+  (dicts, other models, Response objects) takes FastAPI's usual path
+- dumps: orjson with a fallback for models, for SSE and NDJSON payloads
+
+See benchmarks/serialization_bench.py for the cost of each path.
+"""
+
+import asyncio
+import functools
+from typing import Any, Callable
+
+import orjson
+from fastapi.routing import APIRoute, request_response
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def dumps(data: Any) -> bytes:
+    """Encode data as compact UTF-8 JSON"""
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with pydantic's serializer (models) or orjson (anything else)"""
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, BaseModel):
+            return content.model_dump_json(by_alias=True).encode()
+        return dumps(content)
+
+
+def _send_models_directly(endpoint: Callable, response_model: type, status_code: int) -> Callable:
+    @functools.wraps(endpoint)
+    async def wrapper(*args, **kwargs):
+        result = await endpoint(*args, **kwargs)
+        # Exactly the response model: dumping it is what FastAPI's validation would produce
+        if type(result) is response_model:
+            return FastJSONResponse(result, status_code=status_code)
+        return result
+
+    return wrapper
+
+
+class FastRoute(APIRoute):
+    """
+    APIRoute that skips FastAPI's response re-validation for endpoints
+    returning their response model. The response model still documents the
+    route in OpenAPI. Routes that filter their output (response_model_include,
+    exclude_* options) keep FastAPI's behaviour.
+    """
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs: Any):
+        super().__init__(path, endpoint, **kwargs)
+        filters_output = (
+            self.response_model_include is not None
+            or self.response_model_exclude is not None
+            or self.response_model_exclude_unset
+            or self.response_model_exclude_defaults
+            or self.response_model_exclude_none
+        )
+        if (
+            isinstance(self.response_model, type)
+            and issubclass(self.response_model, BaseModel)
+            and asyncio.iscoroutinefunction(endpoint)
+            and not filters_output
+        ):
+            self.dependant.call = _send_models_directly(endpoint, self.response_model, self.status_code or 200)
+            self.app = request_response(self.get_route_handler())
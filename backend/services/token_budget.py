@@ -0,0 +1,190 @@
+"""
+Token Budget - Prompt and completion size control per endpoint
+
+Counts in request bodies (quiz questions, flashcards, schedule topics,
+study plan weeks) set the size of the model's answer. Unbounded, a request
+for 500 flashcards becomes one huge prompt whose answer is cut off at the
+model's output limit, and the missing items are then padded with generic
+ones. Each endpoint gets a TokenBudget that estimates the answer from the
+request and:
+- caps the count a request may ask for (max_items, used in the request models)
+- splits the items into chunks whose answers fit in one call (chunk_sizes)
+- picks max_tokens for each call from its chunk (max_tokens_for)
+- rejects a request that cannot fit before any upstream call (check)
+
+Estimates are rough, about four characters per token for English text and
+JSON (estimate_tokens), and per-item answer sizes measured on typical
+outputs. Limits are configured per endpoint with <NAME>_MAX_TOKENS (largest
+answer of one call), <NAME>_TOKEN_BUDGET (estimated answer tokens of one
+request over all its calls) and <NAME>_MAX_INPUT_TOKENS (user text in the
+prompt), within LLM_CONTEXT_TOKENS and LLM_MAX_OUTPUT_TOKENS.
+"""
+
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+# Context window and output limit of the configured models
+CONTEXT_TOKENS = int(os.getenv("LLM_CONTEXT_TOKENS", "32768"))
+MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "8192"))
+
+# max_tokens is the estimated answer times this, so a wordy answer is not cut off
+HEADROOM = 1.5
+
+_budgets: Dict[str, "TokenBudget"] = {}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: about four characters per token for English text"""
+    return len(text) // 4 + 1
+
+
+class TokenBudgetExceeded(Exception):
+    """A request that cannot be served within its endpoint's token budget (422)"""
+
+    def __init__(self, detail: str):
+        super().__init__(detail)
+        self.detail = detail
+
+
+class TokenBudget:
+    """
+    Answer size estimates and limits for one endpoint.
+
+    - name: endpoint name, also the prefix of its environment variables
+    - item_tokens: estimated answer tokens per item (question, card, topic, week)
+    - base_tokens: estimated answer tokens besides the items, per call
+    - max_tokens: default for <NAME>_MAX_TOKENS, the largest answer of one call
+    - request_tokens: default for <NAME>_TOKEN_BUDGET (default: max_tokens)
+    - max_input_tokens: default for <NAME>_MAX_INPUT_TOKENS
+    - chunked: whether items may be split over several calls
+    - unit: what an item is called in error messages
+    """
+
+    def __init__(
+        self,
+        name: str,
+        item_tokens: int = 0,
+        base_tokens: int = 0,
+        max_tokens: int = 2048,
+        request_tokens: Optional[int] = None,
+        max_input_tokens: int = 500,
+        chunked: bool = True,
+        unit: str = "items",
+    ):
+        prefix = name.upper()
+        self.name = name
+        self.item_tokens = item_tokens
+        self.base_tokens = base_tokens
+        self.max_tokens = min(int(os.getenv(f"{prefix}_MAX_TOKENS", str(max_tokens))), MAX_OUTPUT_TOKENS)
+        self.request_tokens = int(os.getenv(f"{prefix}_TOKEN_BUDGET", str(request_tokens or self.max_tokens)))
+        self.max_input_tokens = int(os.getenv(f"{prefix}_MAX_INPUT_TOKENS", str(max_input_tokens)))
+        self.chunked = chunked
+        self.unit = unit
+
+        self.checked = 0
+        self.rejected = 0
+        self.chunked_requests = 0
+        _budgets[name] = self
+
+    @property
+    def items_per_call(self) -> int:
+        """Most items whose estimated answer, with headroom, fits in max_tokens"""
+        if not self.item_tokens:
+            return 1
+        return max(1, int((self.max_tokens / HEADROOM - self.base_tokens) // self.item_tokens))
+
+    @property
+    def max_items(self) -> int:
+        """Most items one request may ask for"""
+        if not self.item_tokens:
+            return 1
+        items = self.request_tokens // self.item_tokens
+        if not self.chunked:
+            items = min(items, self.items_per_call)
+        while items > 1 and self.completion_tokens(items) > self.request_tokens:
+            items -= 1
+        return max(1, items)
+
+    def chunk_sizes(self, items: int, max_per_chunk: Optional[int] = None) -> List[int]:
+        """
+        Split items into near-equal chunks that each fit in one call
+
+        >>> TokenBudget("doc", item_tokens=100, max_tokens=1500).chunk_sizes(23)
+        [8, 8, 7]
+        """
+        if items <= 0:
+            return []
+        size = self.items_per_call if self.chunked else items
+        if max_per_chunk:
+            size = min(size, max_per_chunk)
+        chunks = -(-items // size)
+        base, extra = divmod(items, chunks)
+        return [base + 1 if i < extra else base for i in range(chunks)]
+
+    def completion_tokens(self, items: int = 0) -> int:
+        """Estimated answer tokens for a request of this many items, over all its calls"""
+        return self.base_tokens * max(1, len(self.chunk_sizes(items))) + self.item_tokens * items
+
+    def max_tokens_for(self, items: int = 0) -> int:
+        """max_tokens for one call producing this many items"""
+        estimate = self.base_tokens + self.item_tokens * items
+        return max(1, min(self.max_tokens, math.ceil(estimate * HEADROOM)))
+
+    def check(self, prompt: str, items: int = 0, user_text: str = "", context_tokens: int = 0) -> int:
+        """
+        Reject a request that cannot be served within budget
+
+        Args:
+            prompt: Prompt of the largest call (the first chunk)
+            items: Items the request asks for
+            user_text: Text the user supplied (topic, message, goal ...)
+            context_tokens: Tokens sent besides the prompt (system prompt, history)
+
+        Returns:
+            Estimated prompt tokens of the largest call
+
+        Raises:
+            TokenBudgetExceeded: with a message saying which limit was hit
+        """
+        self.checked += 1
+        input_tokens = estimate_tokens(user_text)
+        prompt_tokens = estimate_tokens(prompt) + context_tokens
+        chunks = self.chunk_sizes(items)
+        if input_tokens > self.max_input_tokens:
+            detail = (f"Request text is too long: about {input_tokens} tokens, "
+                      f"at most {self.max_input_tokens} for {self.name}")
+        elif items > self.max_items:
+            detail = f"At most {self.max_items} {self.unit} per {self.name} request"
+        elif prompt_tokens + self.max_tokens_for(chunks[0] if chunks else 0) > CONTEXT_TOKENS:
+            detail = (f"Request too large: about {prompt_tokens} prompt tokens plus the answer "
+                      f"exceed the {CONTEXT_TOKENS}-token context")
+        else:
+            if len(chunks) > 1:
+                self.chunked_requests += 1
+            return prompt_tokens
+        self.rejected += 1
+        raise TokenBudgetExceeded(detail)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "item_tokens": self.item_tokens,
+            "base_tokens": self.base_tokens,
+            "max_tokens": self.max_tokens,
+            "request_tokens": self.request_tokens,
+            "max_input_tokens": self.max_input_tokens,
+            "items_per_call": self.items_per_call,
+            "max_items": self.max_items,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.to_dict(),
+            "checked": self.checked,
+            "rejected": self.rejected,
+            "chunked_requests": self.chunked_requests,
+        }
+
+
+def budget_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: budget.stats() for name, budget in _budgets.items()}
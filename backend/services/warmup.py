@@ -0,0 +1,96 @@
+"""
+Warm-up - Optional background pre-warming at startup
+
+Agents are built on first use, so the app starts serving without importing
+openai and pydantic_ai (most of its import time). With AGENT_PREWARM on,
+the lifespan starts a background task that imports them in a worker thread
+and then builds the agents, so the first generation request does not pay
+for it either. Startup never waits for the task, and a failure (such as a
+missing API key) is only logged: requests then fail as they would have.
+"""
+
+import asyncio
+import importlib
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+# Slow to import and needed by the first upstream call
+HEAVY_MODULES = ("openai", "pydantic_ai", "pydantic_ai.models.openai")
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class Prewarmer:
+    """
+    Imports HEAVY_MODULES off the event loop, then calls build() on it.
+
+    - build: constructs the agents (and their shared client)
+    - enabled: AGENT_PREWARM (default true)
+    """
+
+    def __init__(
+        self,
+        build: Callable[[], Any],
+        modules: Sequence[str] = HEAVY_MODULES,
+        enabled: Optional[bool] = None,
+    ):
+        self.build = build
+        self.modules = tuple(modules)
+        self.enabled = enabled if enabled is not None else _env_flag("AGENT_PREWARM", True)
+        self._task: Optional[asyncio.Task] = None
+
+        self.completed = False
+        self.failed = False
+        self.import_seconds = 0.0
+        self.seconds = 0.0
+
+    def _import(self) -> None:
+        for name in self.modules:
+            importlib.import_module(name)
+
+    async def _run(self) -> None:
+        started = time.perf_counter()
+        try:
+            await asyncio.to_thread(self._import)
+            self.import_seconds = time.perf_counter() - started
+            # Built on the event loop thread, like first use from a request
+            self.build()
+            self.completed = True
+            logger.info(f"Pre-warmed agents in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            self.failed = True
+            logger.warning(f"Pre-warm failed, agents will be built on first use: {e}")
+        finally:
+            self.seconds = time.perf_counter() - started
+
+    def start(self) -> None:
+        """Start pre-warming in the background (no-op when disabled)"""
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": int(self.enabled),
+            "completed": int(self.completed),
+            "failed": int(self.failed),
+            "import_seconds": round(self.import_seconds, 3),
+            "seconds": round(self.seconds, 3),
+        }
@@ -0,0 +1,131 @@
+"""
+Tests for services/chat_sessions.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+
+from services.chat_sessions import ChatSessions
+
+
+class ChatSessionsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._dir.name, "chat.db")
+        self.sessions = ChatSessions(token_budget=40, keep_turns=1, db_path=self.db_path)
+        await self.sessions.start()
+        self.summarizing = asyncio.Event()
+        self.release = asyncio.Event()
+
+    async def asyncTearDown(self):
+        self.release.set()
+        await self.sessions.stop(timeout=1)
+        self._dir.cleanup()
+
+    async def summarize(self, summary, turns):
+        self.summarizing.set()
+        await self.release.wait()
+        return f"summary of {len(turns)} turns"
+
+    async def turn(self, session_id: str, message: str, answer: str) -> dict:
+        async with self.sessions.lock(session_id):
+            session = await self.sessions.get(session_id)
+            await self.sessions.add_turn(session, message, answer)
+            self.sessions.compact_later(session, self.summarize)
+        return session
+
+    async def test_compaction_does_not_hold_the_session(self):
+        session_id = (await self.sessions.create())["id"]
+        await self.turn(session_id, "first " * 20, "answer " * 20)
+        await self.turn(session_id, "second " * 20, "answer " * 20)
+        await asyncio.wait_for(self.summarizing.wait(), timeout=5)
+
+        # The summary is still being written; the next turn must not wait for it
+        await asyncio.wait_for(self.turn(session_id, "third", "answer"), timeout=1)
+        self.release.set()
+        await asyncio.wait_for(asyncio.gather(*self.sessions._compactions), timeout=5)
+
+        session = await self.sessions.get(session_id)
+        self.assertEqual(session["summary"], "summary of 1 turns")
+        self.assertEqual([user for user, _ in session["turns"]], ["second " * 20, "third"])
+        self.assertEqual(self.sessions.compactions, 1)
+
+    async def test_failed_summary_keeps_recent_turns(self):
+        async def failing(summary, turns):
+            raise RuntimeError("upstream down")
+
+        session_id = (await self.sessions.create())["id"]
+        for message in ("first " * 20, "second " * 20):
+            async with self.sessions.lock(session_id):
+                session = await self.sessions.get(session_id)
+                await self.sessions.add_turn(session, message, "answer")
+                self.sessions.compact_later(session, failing)
+        await asyncio.gather(*self.sessions._compactions)
+
+        session = await self.sessions.get(session_id)
+        self.assertEqual(session["summary"], "")
+        self.assertEqual([user for user, _ in session["turns"]], ["second " * 20])
+        self.assertEqual(self.sessions.compaction_failures, 1)
+
+    async def test_deleted_session_is_not_recreated(self):
+        session_id = (await self.sessions.create())["id"]
+        await self.turn(session_id, "first " * 20, "answer " * 20)
+        await self.turn(session_id, "second " * 20, "answer " * 20)
+        await asyncio.wait_for(self.summarizing.wait(), timeout=5)
+        self.assertTrue(await self.sessions.delete(session_id))
+        self.release.set()
+        await asyncio.gather(*self.sessions._compactions)
+        self.assertIsNone(await self.sessions.get(session_id))
+        self.assertEqual(self.sessions.compactions, 0)
+
+    async def test_workers_sharing_a_store_keep_each_others_turns(self):
+        other = ChatSessions(token_budget=40, keep_turns=1, db_path=self.db_path)
+        await other.start()
+        try:
+            session_id = (await self.sessions.create())["id"]
+            # Both workers load the session before either appends
+            mine = await self.sessions.get(session_id)
+            theirs = await other.get(session_id)
+            await self.sessions.add_turn(mine, "mine", "answer")
+            await other.add_turn(theirs, "theirs", "answer")
+        finally:
+            await other.stop()
+
+        session = await self.sessions.get(session_id)
+        self.assertEqual([user for user, _ in session["turns"]], ["mine", "theirs"])
+
+    async def test_compaction_keeps_turns_another_worker_appended(self):
+        other = ChatSessions(token_budget=40, keep_turns=1, db_path=self.db_path)
+        await other.start()
+        try:
+            session_id = (await self.sessions.create())["id"]
+            await self.turn(session_id, "first " * 20, "answer " * 20)
+            await self.turn(session_id, "second " * 20, "answer " * 20)
+            await asyncio.wait_for(self.summarizing.wait(), timeout=5)
+            # The other worker does not share this process's session locks
+            await other.add_turn(await other.get(session_id), "third", "answer")
+            self.release.set()
+            await asyncio.gather(*self.sessions._compactions)
+        finally:
+            await other.stop()
+
+        session = await self.sessions.get(session_id)
+        self.assertEqual(session["summary"], "summary of 1 turns")
+        self.assertEqual([user for user, _ in session["turns"]], ["second " * 20, "third"])
+
+    async def test_stale_save_is_rejected(self):
+        session_id = (await self.sessions.create())["id"]
+        store = self.sessions._store
+        version = (await self.sessions.get(session_id))["version"]
+        self.assertTrue(store.append(session_id, ("first", "answer"), 1.0))
+        self.assertFalse(store.save(session_id, "summary", [], version, 2.0))
+        self.assertTrue(store.save(session_id, "summary", [], version + 1, 2.0))
+        self.assertEqual((await self.sessions.get(session_id))["turns"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
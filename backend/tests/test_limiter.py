@@ -0,0 +1,89 @@
+"""
+Tests for services/limiter.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import asyncio
+import time
+import unittest
+
+from services.limiter import AdmissionRejected, UpstreamLimiter
+
+
+class AdmissionRejectedTest(unittest.TestCase):
+    def test_retry_after_is_whole_seconds_and_at_least_one(self):
+        self.assertEqual(AdmissionRejected(503, "busy", 0.2).retry_after, 1)
+        self.assertEqual(AdmissionRejected(429, "slow down", 2.1).retry_after, 3)
+        self.assertEqual(AdmissionRejected(503, "busy", 4).retry_after, 4)
+
+
+class UpstreamLimiterTest(unittest.IsolatedAsyncioTestCase):
+    async def test_full_queue_is_rejected_with_503(self):
+        limiter = UpstreamLimiter(max_concurrency=1, max_queue=1, rate=0, max_wait=2)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.waiting, 1)
+
+        with self.assertRaises(AdmissionRejected) as caught:
+            await limiter.acquire()
+        self.assertEqual((caught.exception.status_code, caught.exception.retry_after), (503, 2))
+        self.assertEqual(limiter.rejected_queue_full, 1)
+
+        # The queued request still gets the slot once it is free
+        limiter.release()
+        await asyncio.wait_for(waiter, timeout=1)
+        self.assertEqual((limiter.in_flight, limiter.waiting, limiter.admitted), (1, 0, 2))
+        limiter.release()
+
+    async def test_empty_bucket_is_rejected_with_429(self):
+        limiter = UpstreamLimiter(max_concurrency=4, max_queue=4, rate=1, burst=1, max_wait=0.5)
+        async with limiter.slot():
+            pass
+
+        # The next token is about a second away, longer than max_wait
+        with self.assertRaises(AdmissionRejected) as caught:
+            await limiter.acquire()
+        self.assertEqual((caught.exception.status_code, caught.exception.retry_after), (429, 1))
+        self.assertEqual(limiter.rejected_rate_limited, 1)
+        self.assertEqual(limiter.in_flight, 0)
+
+    async def test_check_does_not_reserve(self):
+        limiter = UpstreamLimiter(max_concurrency=1, max_queue=1, rate=1, burst=1, max_wait=0.5)
+        for _ in range(3):
+            limiter.check()
+        async with limiter.slot():
+            self.assertEqual(limiter.in_flight, 1)
+
+    async def test_bucket_paces_calls(self):
+        limiter = UpstreamLimiter(max_concurrency=4, max_queue=4, rate=20, burst=1, max_wait=1)
+        start = time.monotonic()
+        for _ in range(3):
+            async with limiter.slot():
+                pass
+        # The burst covers the first call; the next two wait 1/20 s each
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+        self.assertEqual(limiter.admitted, 3)
+
+    async def test_wait_for_a_slot_times_out_with_503(self):
+        limiter = UpstreamLimiter(max_concurrency=1, max_queue=4, rate=0, max_wait=0.05)
+        await limiter.acquire()
+        with self.assertRaises(AdmissionRejected) as caught:
+            await limiter.acquire()
+        self.assertEqual(caught.exception.status_code, 503)
+        self.assertEqual((limiter.rejected_timeout, limiter.waiting, limiter.in_flight), (1, 0, 1))
+        limiter.release()
+
+    async def test_slot_is_released_on_error(self):
+        limiter = UpstreamLimiter(max_concurrency=1, max_queue=0, rate=0, max_wait=1)
+        with self.assertRaises(RuntimeError):
+            async with limiter.slot():
+                raise RuntimeError("upstream failed")
+        self.assertEqual(limiter.in_flight, 0)
+        async with limiter.slot():
+            self.assertEqual(limiter.in_flight, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+"""
+Tests for services/resilience.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import asyncio
+import time
+import unittest
+import uuid
+
+import httpx
+
+from services.limiter import AdmissionRejected
+from services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, call_upstream, get_breaker
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self):
+        self.breaker = CircuitBreaker("model", failure_threshold=2, recovery_timeout=0.05)
+
+    def test_opens_after_consecutive_failures(self):
+        self.breaker.record(UpstreamError(503))
+        self.breaker.record(None)
+        self.breaker.record(UpstreamError(503))
+        self.assertEqual(self.breaker.state, "closed")
+        self.breaker.record(UpstreamError(502))
+        self.assertEqual(self.breaker.state, "open")
+        with self.assertRaises(CircuitOpenError) as caught:
+            self.breaker.before_call()
+        self.assertEqual(caught.exception.status_code, 503)
+
+    def test_open_half_open_closed(self):
+        for _ in range(2):
+            self.breaker.record(UpstreamError(500))
+        self.assertEqual(self.breaker.state, "open")
+        time.sleep(0.06)
+
+        # One probe is let through; others fail fast until it finishes
+        self.breaker.before_call()
+        self.assertEqual(self.breaker.state, "half_open")
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+        self.breaker.record(None)
+        self.assertEqual((self.breaker.state, self.breaker.failures), ("closed", 0))
+        self.breaker.before_call()
+        self.breaker.before_call()
+
+    def test_failed_probe_reopens(self):
+        for _ in range(2):
+            self.breaker.record(UpstreamError(500))
+        time.sleep(0.06)
+        self.breaker.before_call()
+        self.breaker.record(asyncio.TimeoutError())
+        self.assertEqual((self.breaker.state, self.breaker.times_opened), ("open", 2))
+        with self.assertRaises(CircuitOpenError):
+            self.breaker.before_call()
+
+    def test_non_transient_error_frees_the_probe(self):
+        for _ in range(2):
+            self.breaker.record(UpstreamError(500))
+        time.sleep(0.06)
+        self.breaker.before_call()
+        self.breaker.record(UpstreamError(400))
+        self.assertEqual(self.breaker.state, "half_open")
+        self.breaker.before_call()
+
+
+class CallUpstreamTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Breakers are process-wide; a fresh model name gets a fresh one
+        self.model = f"test/{uuid.uuid4().hex}"
+        self.policy = RetryPolicy(max_attempts=3, base_delay=0.01, max_delay=0.02, deadline=5)
+
+    async def test_transient_errors_are_retried(self):
+        attempts = []
+
+        async def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise httpx.ConnectError("reset")
+            return "ok"
+
+        self.assertEqual(await call_upstream(flaky, self.model, self.policy), "ok")
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(get_breaker(self.model).state, "closed")
+
+    async def test_client_errors_are_not_retried(self):
+        attempts = []
+
+        async def bad_request():
+            attempts.append(1)
+            raise UpstreamError(400)
+
+        with self.assertRaises(UpstreamError):
+            await call_upstream(bad_request, self.model, self.policy)
+        self.assertEqual(len(attempts), 1)
+
+    async def test_open_circuit_fails_without_calling_upstream(self):
+        breaker = get_breaker(self.model)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        attempts = []
+
+        async def call():
+            attempts.append(1)
+            return "ok"
+
+        with self.assertRaises(CircuitOpenError) as caught:
+            await call_upstream(call, self.model, self.policy)
+        self.assertIsInstance(caught.exception, AdmissionRejected)
+        self.assertEqual(attempts, [])
+
+    async def test_deadline_bounds_a_hanging_call(self):
+        policy = RetryPolicy(max_attempts=3, base_delay=0.5, max_delay=1, deadline=0.1)
+
+        async def hang():
+            await asyncio.sleep(10)
+
+        start = time.monotonic()
+        with self.assertRaises(asyncio.TimeoutError):
+            await call_upstream(hang, self.model, policy)
+        # No backoff is started that would end after the deadline
+        self.assertLess(time.monotonic() - start, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""
+Tests for services/semantic_cache.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import unittest
+
+from services.semantic_cache import SemanticCache
+
+
+class SemanticCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = SemanticCache(max_entries=100, threshold=0.9, thresholds={}, max_chars=500)
+
+    def cached(self, message: str, subject: str = "science", difficulty: str = "intermediate"):
+        return self.cache.get(message, subject, difficulty)
+
+    def test_paraphrases_hit(self):
+        self.cache.set("what is photosynthesis", "science", "intermediate", "photosynthesis answer")
+        for message in ("explain photosynthesis please", "What is photosynthesis?", "define photosynthesis"):
+            with self.subTest(message=message):
+                self.assertEqual(self.cached(message), "photosynthesis answer")
+
+    def test_same_question_word_hits(self):
+        self.cache.set("how do vaccines work", "science", "intermediate", "how answer")
+        self.assertEqual(self.cached("how do vaccines work?"), "how answer")
+        self.assertEqual(self.cached("please explain how vaccines work"), "how answer")
+
+    def test_question_words_do_not_collide(self):
+        self.cache.set("when did the french revolution start", "history", "intermediate", "when answer")
+        for message in ("why did the french revolution start", "where did the french revolution start"):
+            with self.subTest(message=message):
+                self.assertIsNone(self.cached(message, subject="history"))
+
+    def test_question_word_presence_matters(self):
+        self.cache.set("how do vaccines work", "science", "intermediate", "how answer")
+        for message in ("do vaccines work", "why do vaccines work"):
+            with self.subTest(message=message):
+                self.assertIsNone(self.cached(message))
+
+    def test_numbers_must_match(self):
+        self.cache.set("what is 2 + 2", "mathematics", "beginner", "4")
+        self.assertIsNone(self.cache.get("what is 3 + 3", "mathematics", "beginner"))
+
+    def test_subject_and_difficulty_are_namespaces(self):
+        self.cache.set("what is photosynthesis", "science", "intermediate", "answer")
+        self.assertIsNone(self.cached("what is photosynthesis", difficulty="advanced"))
+        self.assertIsNone(self.cached("what is photosynthesis", subject="history"))
+
+    def test_least_recently_used_is_evicted(self):
+        cache = SemanticCache(max_entries=2, threshold=0.9, thresholds={}, max_chars=500)
+        cache.set("what is photosynthesis", "science", None, "a")
+        cache.set("what is osmosis", "science", None, "b")
+        self.assertEqual(cache.get("what is photosynthesis", "science", None), "a")
+        cache.set("what is mitosis", "science", None, "c")
+        self.assertIsNone(cache.get("what is osmosis", "science", None))
+        self.assertEqual(cache.get("what is photosynthesis", "science", None), "a")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+"""
+Response compression benchmark: size and CPU cost per encoding and level
+
+Compresses the response bodies that dominate egress - a markdown
+explanation of --explanation-kb KB, a study schedule with --blocks blocks
+and a quiz with --questions questions, shaped as the apps send them -
+with gzip and brotli (when installed) at several levels, and reports the
+compressed size, compression time and the estimated time to deliver the
+body over a --mbps link (compression plus transfer). The defaults used by
+services/compression.py are gzip 6 and brotli 5. Needs python-backend's
+requirements.
+
+Usage:
+    python benchmarks/compression_bench.py --mbps 1.6 --json compression.json
+"""
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import time
+from statistics import median
+from typing import Any, Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "python-backend"))
+
+from services.serialization import FastJSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Model output is varied prose, not repeated boilerplate: bodies are built from
+# random sentences over this vocabulary so ratios resemble real responses
+VOCABULARY = (
+    "light energy chemical glucose chlorophyll thylakoid membrane photon water oxygen ATP NADPH Calvin "
+    "cycle stroma carbon dioxide sugar rate intensity temperature limiting factor enzyme reaction "
+    "the a of in and to is by which that from with as for on this each cell plant leaf produce absorb "
+    "convert store release fix split use depends explain why plateau increase decrease when because "
+    "example compare process stage structure function mitochondrion respiration equation balance "
+    "molecule electron transport chain gradient proton synthase pigment wavelength spectrum green"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(VOCABULARY) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def explanation_body(rng: random.Random, kb: int) -> bytes:
+    sections, size = [], 0
+    while size < kb * 1024:
+        bullets = "".join(f"- {sentence(rng, 8)}\n" for _ in range(3))
+        section = f"## Part {len(sections) + 1}\n\n{' '.join(sentence(rng, 18) for _ in range(5))}\n\n{bullets}\n"
+        sections.append(section)
+        size += len(section)
+    return FastJSONResponse({
+        "topic": "Photosynthesis",
+        "explanation": "".join(sections),
+        "key_points": [sentence(rng, 8) for _ in range(5)],
+        "examples": [sentence(rng, 12) for _ in range(3)],
+        "timestamp": "2025-01-01T09:00:00",
+    }).body
+
+
+def schedule_body(rng: random.Random, blocks: int) -> bytes:
+    return FastJSONResponse({
+        "schedule": [
+            {"day": i // 10 + 1, "topic": f"Topic {i % 25}", "duration": 25 + i % 4 * 15,
+             "focus_area": sentence(rng, 6), "kind": "review" if i % 5 == 4 else "study"}
+            for i in range(blocks)
+        ],
+        "total_hours": blocks // 2,
+        "tips": [sentence(rng, 10) for _ in range(3)],
+        "timestamp": "2025-01-01T09:00:00",
+    }).body
+
+
+def quiz_body(rng: random.Random, questions: int) -> bytes:
+    return FastJSONResponse({
+        "topic": "Photosynthesis",
+        "questions": [
+            {"question": sentence(rng, 14), "options": [sentence(rng, 4) for _ in range(4)],
+             "correct_answer": sentence(rng, 4), "explanation": sentence(rng, 20)}
+            for _ in range(questions)
+        ],
+        "timestamp": "2025-01-01T09:00:00",
+    }).body
+
+
+def codecs() -> List[Tuple[str, Callable[[bytes], bytes]]]:
+    result = [(f"gzip-{level}", lambda body, level=level: gzip.compress(body, compresslevel=level, mtime=0))
+              for level in (1, 6, 9)]
+    if brotli is not None:
+        result += [(f"br-{quality}", lambda body, quality=quality: brotli.compress(body, quality=quality))
+                   for quality in (1, 5, 11)]
+    return result
+
+
+def compress_ms(fn: Callable[[bytes], bytes], body: bytes, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(body)
+        times.append(time.perf_counter() - start)
+    return median(times) * 1000
+
+
+def bench(body: bytes, args: argparse.Namespace) -> Dict[str, Any]:
+    bytes_per_ms = args.mbps * 1e6 / 8 / 1000
+    result: Dict[str, Any] = {"identity": {"bytes": len(body), "deliver_ms": round(len(body) / bytes_per_ms, 1)}}
+    for name, fn in codecs():
+        size = len(fn(body))
+        cpu_ms = compress_ms(fn, body, args.runs)
+        result[name] = {
+            "bytes": size,
+            "ratio": round(len(body) / size, 1),
+            "compress_ms": round(cpu_ms, 2),
+            "deliver_ms": round(cpu_ms + size / bytes_per_ms, 1),
+        }
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--explanation-kb", type=int, default=30, help="Markdown explanation size (default: 30)")
+    parser.add_argument("--blocks", type=int, default=1000, help="Schedule blocks (default: 1000)")
+    parser.add_argument("--questions", type=int, default=100, help="Quiz questions (default: 100)")
+    parser.add_argument("--mbps", type=float, default=1.6, help="Link speed for delivery estimates (default: 1.6)")
+    parser.add_argument("--runs", type=int, default=20, help="Compressions timed per codec")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = {
+        f"explanation_{args.explanation_kb}kb": bench(explanation_body(rng, args.explanation_kb), args),
+        f"schedule_{args.blocks}_blocks": bench(schedule_body(rng, args.blocks), args),
+        f"quiz_{args.questions}_questions": bench(quiz_body(rng, args.questions), args),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Flashcard store benchmark at scale
+
+Fills a fresh python-backend flashcard database with decks, cards and a
+bulk-loaded review history (millions of rows), then times the two study
+operations against it: a due-cards query and a live review (card update
+plus review log append in one transaction). Stdlib only.
+
+Usage:
+    python benchmarks/flashcard_store_bench.py --decks 10000 --cards-per-deck 20 --reviews 2000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "python-backend"))
+
+from loop_lag import percentile
+from services.flashcard_store import _FlashcardDb
+from services.spaced_repetition import DAY, Scheduler
+
+
+def timed(fn, samples: int):
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(percentile(times, 50) * 1000, 3),
+        "p99_ms": round(percentile(times, 99) * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--decks", type=int, default=10_000)
+    parser.add_argument("--cards-per-deck", type=int, default=20)
+    parser.add_argument("--reviews", type=int, default=2_000_000, help="review log rows loaded before timing")
+    parser.add_argument("--samples", type=int, default=2000)
+    parser.add_argument("--db", help="database file (default: a temporary file)")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    path = args.db or os.path.join(tempfile.mkdtemp(), "flashcards-bench.db")
+    db = _FlashcardDb(path)
+    scheduler = Scheduler()
+    now = time.time()
+
+    start = time.perf_counter()
+    deck_ids = [f"deck{d:06d}" for d in range(args.decks)]
+    for deck_id in deck_ids:
+        db.create_deck(deck_id, "topic", [
+            {"question": f"{deck_id} question {c}", "answer": f"answer {c}"} for c in range(args.cards_per_deck)
+        ], now - 90 * DAY)
+    card_count = args.decks * args.cards_per_deck
+    # Spread due dates over the past and next 30 days
+    with db._conn:
+        db._conn.executemany(
+            "UPDATE cards SET due = ?, stability = ?, difficulty = ?, last_review = ?, reps = 3 WHERE id = ?",
+            (
+                (now + rng.uniform(-30, 30) * DAY, rng.uniform(1, 60), rng.uniform(1, 10), now - 5 * DAY, card_id)
+                for card_id in range(1, card_count + 1)
+            ),
+        )
+    cards_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = 100_000
+    for offset in range(0, args.reviews, batch):
+        with db._conn:
+            db._conn.executemany(
+                "INSERT INTO reviews (card_id, rating, reviewed_at, elapsed_days, interval_days, stability, difficulty)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (rng.randint(1, card_count), rng.randint(1, 4), now - rng.uniform(0, 90) * DAY,
+                     rng.uniform(0, 30), rng.uniform(1, 30), rng.uniform(1, 60), rng.uniform(1, 10))
+                    for _ in range(min(batch, args.reviews - offset))
+                ),
+            )
+    reviews_seconds = time.perf_counter() - start
+
+    def review():
+        deck = rng.randrange(args.decks)
+        card_id = deck * args.cards_per_deck + rng.randint(1, args.cards_per_deck)
+        db.review(deck_ids[deck], card_id, rng.randint(1, 4), time.time(), scheduler)
+
+    result = {
+        "decks": args.decks,
+        "cards": card_count,
+        "review_rows": db._conn.execute("SELECT COUNT(*) FROM reviews").fetchone()[0],
+        "load_seconds": {"cards": round(cards_seconds, 1), "reviews": round(reviews_seconds, 1)},
+        "due_query": timed(lambda: db.due(rng.choice(deck_ids), time.time(), 50), args.samples),
+        "deck_summary": timed(lambda: db.get_deck(rng.choice(deck_ids), time.time()), args.samples),
+        "review": timed(review, args.samples),
+        "db_mb": round(os.path.getsize(path) / 1e6, 1),
+    }
+    db.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
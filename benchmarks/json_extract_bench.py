@@ -0,0 +1,127 @@
+"""
+JSON extraction benchmark: fence stripping + json.loads vs services/json_extract
+
+Runs every sample of a corpus of model outputs (one JSON object per line
+with "kind" and "text") through the fence stripping the agents used before
+and through extract_json, and reports per kind whether a JSON object came
+back, how many list items it held (questions, flashcards, schedule blocks)
+and the parse time. The default corpus, benchmarks/data/llm_outputs.jsonl,
+covers the shapes seen from the free models: clean JSON, fenced with and
+without a language tag, preamble and trailing prose, trailing commas, smart
+quotes, raw newlines in strings and outputs cut off at max_tokens. Append
+captured outputs to it (or pass --corpus) to extend it. Stdlib only.
+
+Usage:
+    python benchmarks/json_extract_bench.py
+    python benchmarks/json_extract_bench.py --corpus captured.jsonl --json results.json
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "python-backend"))
+
+from loop_lag import percentile
+from services.json_extract import ArrayItemStream, extract_json
+
+DEFAULT_CORPUS = os.path.join(BENCH_DIR, "data", "llm_outputs.jsonl")
+LIST_KEYS = ("questions", "flashcards", "schedule")
+
+
+def fence_strip(text: str) -> Optional[Dict[str, Any]]:
+    """What the quiz/flashcard/schedule agents did before json_extract"""
+    response_text = text.strip()
+    try:
+        if response_text.startswith("```"):
+            response_text = response_text.split("```")[1]
+            if response_text.startswith("json"):
+                response_text = response_text[4:]
+            response_text = response_text.strip()
+        data = json.loads(response_text)
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def streamed(text: str, chunk_size: int = 8) -> int:
+    """Array items ArrayItemStream yields when the text arrives in small chunks"""
+    parser = ArrayItemStream()
+    items = 0
+    for i in range(0, len(text), chunk_size):
+        items += len(parser.feed(text[i:i + chunk_size]))
+    return items
+
+
+def items(data: Optional[Dict[str, Any]]) -> int:
+    if data is None:
+        return 0
+    for key in LIST_KEYS:
+        if isinstance(data.get(key), list):
+            return len(data[key])
+    return 0
+
+
+def timed(fn: Callable[[str], Any], text: str, repeat: int) -> List[float]:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(text)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=200, help="timed parses per sample and approach")
+    parser.add_argument("--json", dest="json_path", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        samples = [json.loads(line) for line in f if line.strip()]
+
+    rows = []
+    totals = {"fence_strip": [0, 0, []], "extract_json": [0, 0, []]}
+    for sample in samples:
+        text = sample["text"]
+        row = {"kind": sample["kind"]}
+        for name, fn in (("fence_strip", fence_strip), ("extract_json", extract_json)):
+            data = fn(text)
+            times = timed(fn, text, args.repeat)
+            row[name] = {"ok": data is not None, "items": items(data), "p50_us": round(percentile(times, 50) * 1e6, 1)}
+            totals[name][0] += data is not None
+            totals[name][1] += items(data)
+            totals[name][2].extend(times)
+        row["stream_items"] = streamed(text)
+        rows.append(row)
+
+    print(f"{'kind':32} {'fence ok':>8} {'items':>5} {'us':>7}   {'extract ok':>10} {'items':>5} {'us':>7}   {'stream':>6}")
+    for row in rows:
+        old, new = row["fence_strip"], row["extract_json"]
+        print(
+            f"{row['kind']:32} {str(old['ok']):>8} {old['items']:>5} {old['p50_us']:>7}   "
+            f"{str(new['ok']):>10} {new['items']:>5} {new['p50_us']:>7}   {row['stream_items']:>6}"
+        )
+
+    summary = {
+        name: {
+            "parsed": f"{ok}/{len(samples)}",
+            "items": item_count,
+            "p50_us": round(percentile(times, 50) * 1e6, 1),
+            "p99_us": round(percentile(times, 99) * 1e6, 1),
+        }
+        for name, (ok, item_count, times) in totals.items()
+    }
+    print(json.dumps(summary, indent=2))
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"samples": rows, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
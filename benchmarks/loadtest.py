@@ -0,0 +1,404 @@
+"""
+Load test both backends against the mock OpenRouter server
+
+Starts benchmarks/mock_openrouter.py, then each selected app through
+benchmarks/serve_app.py with OPENROUTER_BASE_URL pointing at the mock, and
+drives every endpoint at each concurrency level with a closed loop of
+workers for a fixed duration. Reports per endpoint and level:
+  - requests, errors (non-2xx or SSE error events) and RPS
+  - latency p50 / p95 / p99, and time to first byte for streaming endpoints
+  - upstream calls made to the mock
+  - server event-loop lag (p99 / max) sampled inside the app process
+
+Request bodies are unique per request so caches and coalescing do not hide
+upstream cost; pass --reuse-bodies to measure the cached path instead.
+
+Usage (from the repository root):
+    python benchmarks/loadtest.py --concurrency 1,16,64 --duration 10 \\
+        --backend-python backend/venv/bin/python --latency 0.8 --tokens-per-second 60
+    python benchmarks/loadtest.py --apps python-backend --endpoints quiz --error-rate 0.05
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from loop_lag import LoopLagMonitor, percentile
+from mock_openrouter import add_mock_arguments
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(BENCH_DIR)
+
+
+@dataclass
+class Scenario:
+    app: str
+    method: str
+    path: str
+    body: Optional[Callable[[int], Dict[str, Any]]] = None
+    stream: bool = False
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+
+@dataclass
+class Result:
+    latencies: List[float] = field(default_factory=list)
+    first_bytes: List[float] = field(default_factory=list)
+    errors: int = 0
+    statuses: Dict[int, int] = field(default_factory=dict)
+
+
+def _topic(i: int, base: str) -> str:
+    return f"{base} #{i}"
+
+
+SCENARIOS: List[Scenario] = [
+    # backend/main.py
+    Scenario("backend", "GET", "/"),
+    Scenario("backend", "GET", "/api/subjects"),
+    Scenario("backend", "GET", "/api/models"),
+    Scenario("backend", "POST", "/api/chat",
+             lambda i: {"message": f"Explain {_topic(i, 'photosynthesis')}", "subject": "Biology"}),
+    Scenario("backend", "POST", "/api/chat/stream",
+             lambda i: {"message": f"Explain {_topic(i, 'photosynthesis')}", "subject": "Biology"}, stream=True),
+    Scenario("backend", "POST", "/api/chat/sessions"),
+    Scenario("backend", "GET", "/api/chat/sessions/{session_id}"),
+    Scenario("backend", "POST", "/api/quiz/generate",
+             lambda i: {"subject": "Biology", "topic": _topic(i, "cells"), "num_questions": 5}),
+    Scenario("backend", "POST", "/api/quiz/generate/stream",
+             lambda i: {"subject": "Biology", "topic": _topic(i, "cells"), "num_questions": 5}, stream=True),
+    Scenario("backend", "POST", "/api/study-plan",
+             lambda i: {"subject": "Biology", "goal": _topic(i, "pass the final"),
+                        "available_hours_per_week": 10, "duration_weeks": 4}),
+    Scenario("backend", "POST", "/api/jobs/study-plan",
+             lambda i: {"subject": "Biology", "goal": _topic(i, "pass the final"),
+                        "available_hours_per_week": 10, "duration_weeks": 4}),
+    Scenario("backend", "POST", "/api/jobs/quiz",
+             lambda i: {"subject": "Biology", "topic": _topic(i, "cells"), "num_questions": 20}),
+    Scenario("backend", "GET", "/api/jobs/{job_id}"),
+    Scenario("backend", "GET", "/api/jobs/{job_id}/events", stream=True),
+    Scenario("backend", "GET", "/metrics"),
+    # python-backend/main.py
+    Scenario("python-backend", "GET", "/"),
+    Scenario("python-backend", "GET", "/api/cache/stats"),
+    Scenario("python-backend", "GET", "/api/coalescing/stats"),
+    Scenario("python-backend", "GET", "/api/question-bank/stats"),
+    Scenario("python-backend", "GET", "/api/limiter/stats"),
+    Scenario("python-backend", "GET", "/api/circuits"),
+    Scenario("python-backend", "GET", "/api/models"),
+    Scenario("python-backend", "POST", "/api/explain",
+             lambda i: {"topic": _topic(i, "recursion"), "depth": "intermediate"}),
+    Scenario("python-backend", "POST", "/api/flashcards",
+             lambda i: {"topic": _topic(i, "recursion"), "count": 5}),
+    Scenario("python-backend", "POST", "/api/batch",
+             lambda i: {"items": [
+                 {"kind": "explain", "topic": _topic(i, "recursion")},
+                 {"kind": "flashcards", "topic": _topic(i, "recursion"), "params": {"count": 5}},
+                 {"kind": "quiz", "topic": _topic(i, "recursion"), "params": {"count": 5}},
+             ]}, stream=True),
+    Scenario("python-backend", "POST", "/api/decks",
+             lambda i: {"topic": _topic(i, "recursion"), "count": 10}),
+    Scenario("python-backend", "GET", "/api/decks/{deck_id}"),
+    Scenario("python-backend", "GET", "/api/decks/{deck_id}/due"),
+    Scenario("python-backend", "POST", "/api/decks/{deck_id}/cards/{card_id}/review",
+             lambda i: {"rating": i % 4 + 1}),
+    Scenario("python-backend", "POST", "/api/quiz",
+             lambda i: {"topic": _topic(i, "recursion"), "difficulty": "medium", "count": 5}),
+    Scenario("python-backend", "POST", "/api/quiz/stream",
+             lambda i: {"topic": _topic(i, "recursion"), "difficulty": "medium", "count": 5}, stream=True),
+    Scenario("python-backend", "POST", "/api/schedule",
+             lambda i: {"topics": [_topic(i, "algebra"), "geometry", "statistics"], "hours_per_day": 2, "days": 7}),
+    Scenario("python-backend", "POST", "/api/jobs/schedule",
+             lambda i: {"topics": [_topic(i, "algebra"), "geometry", "statistics"], "hours_per_day": 2, "days": 7}),
+    Scenario("python-backend", "POST", "/api/jobs/quiz",
+             lambda i: {"topic": _topic(i, "recursion"), "difficulty": "medium", "count": 20}),
+    Scenario("python-backend", "GET", "/api/jobs/{job_id}"),
+    Scenario("python-backend", "GET", "/api/jobs/{job_id}/events", stream=True),
+    Scenario("python-backend", "GET", "/metrics"),
+]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise RuntimeError(f"{url} exited with code {process.returncode}")
+            try:
+                await client.get(url, timeout=1)
+                return
+            except httpx.HTTPError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not start within {timeout}s")
+
+
+def start_process(args: List[str], env: Dict[str, str], log_path: str) -> subprocess.Popen:
+    log = open(log_path, "w")
+    return subprocess.Popen(args, env=env, stdout=log, stderr=subprocess.STDOUT, cwd=ROOT_DIR)
+
+
+def stop_process(process: subprocess.Popen) -> None:
+    process.terminate()
+    try:
+        process.wait(timeout=10)
+    except subprocess.TimeoutExpired:
+        process.kill()
+
+
+def mock_command(args: argparse.Namespace, port: int) -> List[str]:
+    command = [
+        sys.executable, os.path.join(BENCH_DIR, "mock_openrouter.py"), "--port", str(port),
+        "--latency", str(args.latency), "--distribution", args.distribution, "--sigma", str(args.sigma),
+        "--tokens-per-second", str(args.tokens_per_second), "--completion-tokens", str(args.completion_tokens),
+        "--error-rate", str(args.error_rate), "--error-codes", args.error_codes,
+        "--hang-rate", str(args.hang_rate), "--hang-seconds", str(args.hang_seconds),
+        "--malformed-rate", str(args.malformed_rate),
+    ]
+    for value in args.model_latency:
+        command += ["--model-latency", value]
+    if args.seed is not None:
+        command += ["--seed", str(args.seed)]
+    return command
+
+
+async def one_request(
+    client: httpx.AsyncClient, scenario: Scenario, index: int, result: Result, path_params: Dict[str, str]
+) -> None:
+    body = scenario.body(index) if scenario.body else None
+    path = scenario.path.format(**path_params)
+    start = time.perf_counter()
+    failed = False
+    status = 0
+    try:
+        if scenario.stream:
+            async with client.stream(scenario.method, path, json=body) as response:
+                status = response.status_code
+                first = None
+                async for line in response.aiter_lines():
+                    if first is None:
+                        first = time.perf_counter() - start
+                    # SSE error event, or an NDJSON batch item that failed
+                    if line == "event: error" or (line.startswith("{") and '"error": ' in line):
+                        failed = True
+                if first is not None:
+                    result.first_bytes.append(first)
+        else:
+            response = await client.request(scenario.method, path, json=body)
+            status = response.status_code
+    except httpx.HTTPError:
+        failed = True
+    elapsed = time.perf_counter() - start
+
+    result.statuses[status] = result.statuses.get(status, 0) + 1
+    if failed or not 200 <= status < 300:
+        result.errors += 1
+    else:
+        result.latencies.append(elapsed)
+
+
+async def run_level(
+    base_url: str, scenario: Scenario, concurrency: int, duration: float, counter: itertools.count,
+    reuse_bodies: bool, timeout: float, path_params: Dict[str, str],
+) -> Result:
+    result = Result()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout) as client:
+        stop_at = time.perf_counter() + duration
+
+        async def worker() -> None:
+            while time.perf_counter() < stop_at:
+                await one_request(client, scenario, 0 if reuse_bodies else next(counter), result, path_params)
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return result
+
+
+async def finished_job(client: httpx.AsyncClient, app: str) -> Dict[str, str]:
+    """Path parameters for the job status endpoints: a job submitted and run to completion"""
+    submit = next(s for s in SCENARIOS if s.app == app and s.method == "POST" and s.path.startswith("/api/jobs/"))
+    job = (await client.post(submit.path, json=submit.body(0))).json()
+    await client.get(f"/api/jobs/{job['id']}", params={"wait": 60}, timeout=90)
+    return {"job_id": job["id"]}
+
+
+async def chat_session(client: httpx.AsyncClient, app: str) -> Dict[str, str]:
+    """Path parameters for the chat session endpoints: a session with one turn"""
+    if not any(s.app == app and s.path.startswith("/api/chat/sessions") for s in SCENARIOS):
+        return {}
+    session = (await client.post("/api/chat/sessions")).json()
+    await client.post("/api/chat", json={"message": "Explain photosynthesis", "session_id": session["session_id"]})
+    return {"session_id": session["session_id"]}
+
+
+async def flashcard_deck(client: httpx.AsyncClient, app: str) -> Dict[str, str]:
+    """Path parameters for the deck endpoints: a generated deck and its first card"""
+    if not any(s.app == app and s.path.startswith("/api/decks") for s in SCENARIOS):
+        return {}
+    deck = (await client.post("/api/decks", json={"topic": "photosynthesis", "count": 10}, timeout=60)).json()
+    return {"deck_id": deck["id"], "card_id": str(deck["cards"][0]["id"])}
+
+
+async def upstream_calls(client: httpx.AsyncClient) -> int:
+    return (await client.get("/mock/stats")).json()["requests"]
+
+
+def check_coverage(app: str, paths: List[str]) -> None:
+    covered = {s.path for s in SCENARIOS if s.app == app}
+    missing = sorted(set(paths) - covered)
+    if missing:
+        print(f"  warning: {app} endpoints without a scenario: {', '.join(missing)}")
+
+
+def format_row(cells: List[Any], widths: List[int]) -> str:
+    return "  ".join(str(cell).rjust(width) if i else str(cell).ljust(width) for i, (cell, width) in enumerate(zip(cells, widths)))
+
+
+HEADER = ["endpoint", "conc", "reqs", "err", "rps", "p50", "p95", "p99", "ttfb50", "upstream", "lag99", "lagmax"]
+WIDTHS = [32, 4, 6, 4, 7, 7, 7, 7, 7, 8, 7, 7]
+
+
+async def bench_app(app: str, python: str, mock_url: str, args: argparse.Namespace, log_dir: str) -> List[Dict[str, Any]]:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    env = dict(
+        os.environ,
+        OPENROUTER_BASE_URL=f"{mock_url}/v1",
+        OPENROUTER_API_KEY="mock",
+        QUESTION_BANK_DB=os.path.join(log_dir, f"{app}-question-bank.db"),
+        JOBS_DB=os.path.join(log_dir, f"{app}-jobs.db"),
+        CHAT_SESSIONS_DB=os.path.join(log_dir, f"{app}-chat-sessions.db"),
+        FLASHCARD_DB=os.path.join(log_dir, f"{app}-flashcards.db"),
+    )
+    for value in args.app_env:
+        key, _, val = value.partition("=")
+        env[key] = val
+    process = start_process(
+        [python, os.path.join(BENCH_DIR, "serve_app.py"), "--app-dir", os.path.join(ROOT_DIR, app), "--port", str(port)],
+        env, os.path.join(log_dir, f"{app}.log"),
+    )
+    rows = []
+    try:
+        await wait_ready(base_url + "/", process)
+        scenarios = [
+            s for s in SCENARIOS
+            if s.app == app and (not args.endpoints or any(f in s.path for f in args.endpoints.split(",")))
+        ]
+        print(f"\n{app} ({base_url}, logs in {log_dir})")
+        async with httpx.AsyncClient(base_url=base_url) as app_client, httpx.AsyncClient(base_url=mock_url) as mock_client:
+            check_coverage(app, list((await app_client.get("/openapi.json")).json()["paths"]))
+            print(format_row(HEADER, WIDTHS))
+            counter = itertools.count(1)
+            path_params = {
+                **await finished_job(app_client, app),
+                **await chat_session(app_client, app),
+                **await flashcard_deck(app_client, app),
+            }
+            for scenario in scenarios:
+                # Warm connections, imports and model construction outside the measurement
+                await one_request(app_client, scenario, next(counter), Result(), path_params)
+                for concurrency in args.concurrency:
+                    calls_before = await upstream_calls(mock_client)
+                    await app_client.get("/__bench/loop-lag")
+                    started = time.perf_counter()
+                    result = await run_level(
+                        base_url, scenario, concurrency, args.duration, counter, args.reuse_bodies, args.timeout,
+                        path_params
+                    )
+                    elapsed = time.perf_counter() - started
+                    lag = (await app_client.get("/__bench/loop-lag")).json()
+                    calls = await upstream_calls(mock_client) - calls_before
+
+                    completed = len(result.latencies) + result.errors
+                    row = {
+                        "app": app,
+                        "endpoint": scenario.name,
+                        "concurrency": concurrency,
+                        "requests": completed,
+                        "errors": result.errors,
+                        "statuses": result.statuses,
+                        "rps": round(len(result.latencies) / elapsed, 2),
+                        "p50_ms": round(percentile(result.latencies, 50) * 1000, 1),
+                        "p95_ms": round(percentile(result.latencies, 95) * 1000, 1),
+                        "p99_ms": round(percentile(result.latencies, 99) * 1000, 1),
+                        "ttfb_p50_ms": round(percentile(result.first_bytes, 50) * 1000, 1) if scenario.stream else None,
+                        "upstream_calls": calls,
+                        "loop_lag": lag,
+                    }
+                    rows.append(row)
+                    print(format_row([
+                        scenario.name, concurrency, completed, result.errors, row["rps"],
+                        row["p50_ms"], row["p95_ms"], row["p99_ms"],
+                        row["ttfb_p50_ms"] if scenario.stream else "-",
+                        calls, lag["p99_ms"], lag["max_ms"],
+                    ], WIDTHS))
+    finally:
+        stop_process(process)
+    return rows
+
+
+async def main(args: argparse.Namespace) -> None:
+    log_dir = tempfile.mkdtemp(prefix="loadtest-")
+    mock_port = free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    mock = start_process(mock_command(args, mock_port), dict(os.environ), os.path.join(log_dir, "mock.log"))
+
+    # Lag in this process means the load generator itself is saturated
+    client_lag = LoopLagMonitor()
+    client_lag.start()
+    rows = []
+    try:
+        await wait_ready(mock_url + "/mock/stats", mock)
+        pythons = {"backend": args.backend_python, "python-backend": args.python_backend_python}
+        for app in args.apps.split(","):
+            rows += await bench_app(app, pythons[app], mock_url, args, log_dir)
+    finally:
+        stop_process(mock)
+        await client_lag.stop()
+
+    lag = client_lag.collect()
+    print(f"\nlatencies in ms; load generator loop lag p99 {lag['p99_ms']}ms, max {lag['max_ms']}ms")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": rows, "client_loop_lag": lag}, f, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", default="backend,python-backend", help="Comma-separated: backend, python-backend")
+    parser.add_argument("--backend-python", default=sys.executable, help="Interpreter with backend/requirements.txt")
+    parser.add_argument("--python-backend-python", default=sys.executable,
+                        help="Interpreter with python-backend/requirements.txt")
+    parser.add_argument("--concurrency", default="1,16", help="Comma-separated concurrency levels (default: 1,16)")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per endpoint and level (default: 5)")
+    parser.add_argument("--endpoints", default="", help="Only paths containing one of these comma-separated substrings")
+    parser.add_argument("--reuse-bodies", action="store_true", help="Send identical bodies (measures cache hits)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request in seconds")
+    parser.add_argument("--app-env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra environment for the apps, e.g. LLM_MAX_CONCURRENCY=64 (repeatable)")
+    parser.add_argument("--json", help="Write full results to this file")
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+    args.concurrency = [int(level) for level in args.concurrency.split(",")]
+    asyncio.run(main(args))
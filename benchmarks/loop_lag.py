@@ -0,0 +1,55 @@
+"""
+Event-loop lag monitor
+
+Sleeps for a fixed interval in a loop and records how late each wake-up
+is. Lag above a few milliseconds means something is blocking the loop
+(sync I/O, CPU-heavy parsing, large serialization).
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Nearest-rank percentile of unsorted samples (0 for no samples)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.samples: List[float] = []
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(0.0, time.perf_counter() - start - self.interval))
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def collect(self) -> Dict[str, float]:
+        """Lag statistics in milliseconds since the last collect, then reset"""
+        samples, self.samples = self.samples, []
+        return {
+            "samples": len(samples),
+            "p50_ms": round(percentile(samples, 50) * 1000, 2),
+            "p99_ms": round(percentile(samples, 99) * 1000, 2),
+            "max_ms": round(max(samples, default=0.0) * 1000, 2),
+        }
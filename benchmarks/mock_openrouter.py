@@ -0,0 +1,415 @@
+"""
+Mock OpenRouter - A local OpenAI-compatible chat completions server
+
+Stands in for openrouter.ai when load testing either backend. It answers
+/chat/completions (plain and streamed) with canned content shaped like what
+the agents ask for:
+  - quiz, flashcard and schedule prompts get valid JSON of the requested size
+  - explanation prompts get EXPLANATION / KEY POINTS / EXAMPLES sections
+  - structured-output tool calls (final_result) get arguments built from the
+    tool's JSON schema
+  - anything else gets plain tutor-style prose
+
+Latency, token rate and failures are configurable:
+  - time to first token is drawn from a fixed / uniform / exponential /
+    lognormal distribution, optionally per model (--model-latency)
+  - tokens are then produced at --tokens-per-second, streamed or not
+  - --error-rate injects HTTP errors, --hang-rate stalls requests and
+    --malformed-rate returns truncated JSON
+
+Usage:
+    python benchmarks/mock_openrouter.py --port 9100 --latency 0.8 --distribution lognormal
+    OPENROUTER_BASE_URL=http://127.0.0.1:9100/v1 OPENROUTER_API_KEY=mock uvicorn main:app
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+WORDS = (
+    "understanding the concept starts with its core definition and builds towards "
+    "worked examples that connect each idea to practical problems students meet "
+    "when revising for exams and applying knowledge in new situations"
+).split()
+
+
+@dataclass
+class MockConfig:
+    latency: float = 0.5
+    distribution: str = "lognormal"
+    sigma: float = 0.5
+    model_latency: Dict[str, float] = field(default_factory=dict)
+    tokens_per_second: float = 80.0
+    completion_tokens: int = 150
+    error_rate: float = 0.0
+    error_codes: List[int] = field(default_factory=lambda: [429, 500, 502, 503])
+    hang_rate: float = 0.0
+    hang_seconds: float = 300.0
+    malformed_rate: float = 0.0
+    seed: Optional[int] = None
+
+    def sample_latency(self, model: str) -> float:
+        """Seconds until the first token for one request"""
+        mean = self.model_latency.get(model, self.latency)
+        if mean <= 0:
+            return 0.0
+        if self.distribution == "fixed":
+            return mean
+        if self.distribution == "uniform":
+            return random.uniform(mean * (1 - self.sigma), mean * (1 + self.sigma))
+        if self.distribution == "exponential":
+            return random.expovariate(1 / mean)
+        # lognormal with the requested mean
+        mu = math.log(mean) - self.sigma ** 2 / 2
+        return random.lognormvariate(mu, self.sigma)
+
+
+# ---------------------------------------------------------------------------
+# Canned content
+# ---------------------------------------------------------------------------
+
+def _prose(tokens: int, offset: int = 0) -> str:
+    return " ".join(WORDS[(offset + i) % len(WORDS)] for i in range(tokens)).capitalize() + "."
+
+
+def _count(prompt: str, default: int = 5) -> int:
+    match = re.search(r"(?:Generate|Create a)\s+(\d+)", prompt)
+    return max(1, int(match.group(1))) if match else default
+
+
+def _topic(prompt: str) -> str:
+    match = re.search(r"(?:about:?|topics?:)\s*([^\n.]+)", prompt)
+    return match.group(1).strip()[:80] if match else "the topic"
+
+
+def quiz_question(topic: str, index: int) -> Dict[str, Any]:
+    options = [f"{topic} answer {index}.{n}" for n in range(1, 5)]
+    return {
+        "question": f"Question {index} about {topic}: which statement is correct?",
+        "options": options,
+        "correct_answer": options[index % 4],
+        "explanation": f"Option {index % 4 + 1} follows from the definition of {topic}.",
+    }
+
+
+def canned_quiz(prompt: str) -> Dict[str, Any]:
+    topic = _topic(prompt)
+    return {"questions": [quiz_question(topic, i) for i in range(1, _count(prompt) + 1)]}
+
+
+def canned_flashcards(prompt: str) -> Dict[str, Any]:
+    topic = _topic(prompt)
+    return {"flashcards": [
+        {"question": f"What is key idea {i} of {topic}?", "answer": f"Key idea {i} of {topic} explained briefly."}
+        for i in range(1, _count(prompt) + 1)
+    ]}
+
+
+def canned_schedule_outline(prompt: str) -> Dict[str, Any]:
+    topics_match = re.search(r"topics:\s*([^\n]+)", prompt)
+    topics = [t.strip() for t in topics_match.group(1).split(",")] if topics_match else ["General"]
+    areas_match = re.search(r"list\s+(\d+)\s+focus areas", prompt)
+    areas = int(areas_match.group(1)) if areas_match else 4
+    return {
+        "focus_areas": {topic: [f"{topic} core concepts, part {i}" for i in range(1, areas + 1)] for topic in topics},
+        "tips": ["Review notes daily", "Use active recall", "Take short breaks"],
+    }
+
+
+def canned_explanation(prompt: str, tokens: int) -> str:
+    return (
+        f"EXPLANATION:\n{_prose(tokens)}\n\n"
+        "KEY POINTS:\n- " + "\n- ".join(_prose(8, i * 8) for i in range(3)) + "\n\n"
+        "EXAMPLES:\n- " + "\n- ".join(_prose(10, i * 5) for i in range(3))
+    )
+
+
+def canned_text(prompt: str, tokens: int) -> str:
+    """Content for a plain text completion, shaped by the prompt"""
+    lowered = prompt.lower()
+    if "flashcards" in lowered and "json" in lowered:
+        return json.dumps(canned_flashcards(prompt))
+    if "focus areas" in lowered and "json" in lowered:
+        return json.dumps(canned_schedule_outline(prompt))
+    if "questions" in lowered and "json" in lowered:
+        return json.dumps(canned_quiz(prompt))
+    if "EXPLANATION:" in prompt:
+        return canned_explanation(prompt, tokens)
+    return _prose(tokens)
+
+
+def fill_schema(schema: Dict[str, Any], defs: Dict[str, Any], name: str = "", count: int = 3) -> Any:
+    """Build a value matching a JSON schema, with readable placeholder content"""
+    if "$ref" in schema:
+        return fill_schema(defs[schema["$ref"].split("/")[-1]], defs, name, count)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [s for s in schema[key] if s.get("type") != "null"] or schema[key]
+            return fill_schema(options[0], defs, name, count)
+    kind = schema.get("type")
+    if kind == "object" or "properties" in schema:
+        return {
+            prop: fill_schema(sub, defs, prop, count)
+            for prop, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = 4 if name == "options" else count
+        return [fill_schema(schema.get("items", {}), defs, name, count) for _ in range(items)]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 1.0
+    if kind == "boolean":
+        return True
+    return f"Sample {name or 'text'}"
+
+
+def tool_arguments(tool: Dict[str, Any], prompt: str) -> Dict[str, Any]:
+    schema = tool.get("function", {}).get("parameters", {})
+    if "questions" in schema.get("properties", {}):
+        return canned_quiz(prompt)
+    return fill_schema(schema, schema.get("$defs", {}), count=_count(prompt, default=3))
+
+
+def _message_text(message: Dict[str, Any]) -> str:
+    content = message.get("content") or ""
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+# ---------------------------------------------------------------------------
+# Server
+# ---------------------------------------------------------------------------
+
+def build_app(config: MockConfig) -> FastAPI:
+    app = FastAPI(title="Mock OpenRouter")
+    stats: Dict[str, Any] = {
+        "requests": 0,
+        "streamed": 0,
+        "in_flight": 0,
+        "max_in_flight": 0,
+        "errors_injected": 0,
+        "hangs_injected": 0,
+        "malformed_injected": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "by_model": {},
+    }
+
+    def error_response(status: int) -> JSONResponse:
+        stats["errors_injected"] += 1
+        headers = {"Retry-After": "1"} if status == 429 else None
+        return JSONResponse(
+            status_code=status,
+            content={"error": {"message": f"Injected upstream error {status}", "type": "mock_error", "code": status}},
+            headers=headers,
+        )
+
+    def chunk(completion_id: str, model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "mock")
+        messages = body.get("messages", [])
+        prompt = _message_text(next((m for m in reversed(messages) if m.get("role") == "user"), {}))
+        prompt_tokens = sum(estimate_tokens(_message_text(m)) for m in messages)
+        tokens = min(config.completion_tokens, body.get("max_tokens") or body.get("max_completion_tokens") or 10 ** 9)
+
+        stats["requests"] += 1
+        stats["by_model"][model] = stats["by_model"].get(model, 0) + 1
+
+        roll = random.random()
+        if roll < config.error_rate:
+            await asyncio.sleep(config.sample_latency(model) / 4)
+            return error_response(random.choice(config.error_codes))
+        if roll < config.error_rate + config.hang_rate:
+            stats["hangs_injected"] += 1
+            await asyncio.sleep(config.hang_seconds)
+
+        tool = next(
+            (t for t in body.get("tools") or [] if t.get("function", {}).get("name") == "final_result"),
+            None,
+        )
+        if tool is not None:
+            text = json.dumps(tool_arguments(tool, prompt))
+        else:
+            text = canned_text(prompt, tokens)
+        if random.random() < config.malformed_rate:
+            stats["malformed_injected"] += 1
+            text = text[: max(1, len(text) // 2)]
+
+        completion_tokens = estimate_tokens(text)
+        stats["prompt_tokens"] += prompt_tokens
+        stats["completion_tokens"] += completion_tokens
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        call_id = f"call_{uuid.uuid4().hex[:12]}"
+        ttft = config.sample_latency(model)
+        per_token = 1 / config.tokens_per_second if config.tokens_per_second > 0 else 0.0
+
+        if not body.get("stream"):
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            try:
+                await asyncio.sleep(ttft + completion_tokens * per_token)
+            finally:
+                stats["in_flight"] -= 1
+            if tool is not None:
+                message = {"role": "assistant", "content": None, "tool_calls": [{
+                    "id": call_id, "type": "function",
+                    "function": {"name": "final_result", "arguments": text},
+                }]}
+                finish_reason = "tool_calls"
+            else:
+                message = {"role": "assistant", "content": text}
+                finish_reason = "stop"
+            return {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": usage,
+            }
+
+        stats["streamed"] += 1
+        include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+
+        async def events() -> AsyncIterator[str]:
+            stats["in_flight"] += 1
+            stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+            try:
+                await asyncio.sleep(ttft)
+                if tool is not None:
+                    yield chunk(completion_id, model, {"role": "assistant", "tool_calls": [{
+                        "index": 0, "id": call_id, "type": "function",
+                        "function": {"name": "final_result", "arguments": ""},
+                    }]})
+                    pieces = [text[i:i + 4] for i in range(0, len(text), 4)]
+                else:
+                    yield chunk(completion_id, model, {"role": "assistant", "content": ""})
+                    pieces = re.findall(r"\S+\s*|\s+", text)
+
+                for piece in pieces:
+                    if per_token:
+                        await asyncio.sleep(per_token * estimate_tokens(piece))
+                    if tool is not None:
+                        delta = {"tool_calls": [{"index": 0, "function": {"arguments": piece}}]}
+                    else:
+                        delta = {"content": piece}
+                    yield chunk(completion_id, model, delta)
+
+                yield chunk(completion_id, model, {}, "tool_calls" if tool is not None else "stop")
+                if include_usage:
+                    yield "data: " + json.dumps({
+                        "id": completion_id, "object": "chat.completion.chunk",
+                        "created": int(time.time()), "model": model, "choices": [], "usage": usage,
+                    }) + "\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                stats["in_flight"] -= 1
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    for path in ("/chat/completions", "/v1/chat/completions", "/api/v1/chat/completions"):
+        app.add_api_route(path, chat_completions, methods=["POST"])
+
+    @app.get("/mock/stats")
+    async def mock_stats():
+        return stats
+
+    @app.post("/mock/reset")
+    async def mock_reset():
+        for key, value in stats.items():
+            if key == "by_model":
+                value.clear()
+            elif key != "in_flight":
+                stats[key] = 0
+        return stats
+
+    return app
+
+
+def parse_model_latency(values: List[str]) -> Dict[str, float]:
+    result = {}
+    for value in values:
+        model, _, seconds = value.rpartition("=")
+        if not model:
+            raise argparse.ArgumentTypeError(f"Expected MODEL=SECONDS, got {value!r}")
+        result[model] = float(seconds)
+    return result
+
+
+def add_mock_arguments(parser: argparse.ArgumentParser) -> None:
+    """Mock server options, shared with the load test harness"""
+    parser.add_argument("--latency", type=float, default=0.5, help="Mean seconds to first token (default: 0.5)")
+    parser.add_argument("--distribution", choices=["fixed", "uniform", "exponential", "lognormal"], default="lognormal")
+    parser.add_argument("--sigma", type=float, default=0.5,
+                        help="Spread: lognormal sigma, or +/- fraction for uniform (default: 0.5)")
+    parser.add_argument("--model-latency", action="append", default=[], metavar="MODEL=SECONDS",
+                        help="Mean latency override for one model (repeatable)")
+    parser.add_argument("--tokens-per-second", type=float, default=80.0, help="Generation rate after the first token (0 = instant)")
+    parser.add_argument("--completion-tokens", type=int, default=150, help="Length of prose answers in tokens")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an HTTP error")
+    parser.add_argument("--error-codes", default="429,500,502,503", help="Comma-separated status codes to inject")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of requests that stall for --hang-seconds")
+    parser.add_argument("--hang-seconds", type=float, default=300.0)
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="Fraction of responses cut off mid-JSON")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def config_from_args(args: argparse.Namespace) -> MockConfig:
+    return MockConfig(
+        latency=args.latency,
+        distribution=args.distribution,
+        sigma=args.sigma,
+        model_latency=parse_model_latency(args.model_latency),
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_codes=[int(code) for code in args.error_codes.split(",") if code.strip()],
+        hang_rate=args.hang_rate,
+        hang_seconds=args.hang_seconds,
+        malformed_rate=args.malformed_rate,
+        seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_mock_arguments(parser)
+    args = parser.parse_args()
+
+    config = config_from_args(args)
+    if config.seed is not None:
+        random.seed(config.seed)
+    uvicorn.run(build_app(config), host=args.host, port=args.port, log_level="warning")
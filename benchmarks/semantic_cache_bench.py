@@ -0,0 +1,90 @@
+"""
+Semantic cache lookup benchmark
+
+Fills backend's SemanticCache with synthetic chat questions in a single
+namespace (the worst case: every lookup scans every entry) and times
+lookups that hit and miss. Run it with the backend's interpreter.
+
+Usage:
+    backend/venv/bin/python benchmarks/semantic_cache_bench.py --entries 100000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "backend"))
+
+from loop_lag import percentile
+from services.semantic_cache import SemanticCache, signature
+
+VOCABULARY = (
+    "photosynthesis mitochondria enzyme osmosis gravity momentum velocity entropy catalyst "
+    "isotope polymer algorithm recursion pointer compiler closure vector matrix integral "
+    "derivative theorem parliament revolution empire treaty renaissance metaphor sonnet "
+    "irony grammar subjunctive tectonic volcano climate glacier ecosystem genome protein"
+).split()
+TEMPLATES = ["what is {}", "explain {} and {}", "how does {} affect {}", "why is {} important for {}"]
+
+
+def message(rng: random.Random) -> str:
+    template = rng.choice(TEMPLATES)
+    # Letter suffixes: digits would split entries across namespaces
+    words = [
+        rng.choice(VOCABULARY) + "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(3))
+        for _ in range(template.count("{}"))
+    ]
+    return template.format(*words)
+
+
+def timed(fn, samples: int):
+    times = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return {
+        "p50_ms": round(percentile(times, 50) * 1000, 3),
+        "p99_ms": round(percentile(times, 99) * 1000, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    cache = SemanticCache(max_entries=args.entries, thresholds={})
+    stored = []
+    start = time.perf_counter()
+    for i in range(args.entries):
+        text = message(rng)
+        cache.set(text, "science", "intermediate", f"answer {i}")
+        if i % 97 == 0:
+            stored.append(text)
+    fill_seconds = time.perf_counter() - start
+
+    hit_texts = [f"please {rng.choice(stored)}?" for _ in range(args.lookups)]
+    miss_texts = [message(rng) + " tomorrow" for _ in range(args.lookups)]
+    hits, misses = iter(hit_texts), iter(miss_texts)
+
+    result = {
+        "entries": cache.stats()["entries"],
+        "fill_us_per_entry": round(fill_seconds / args.entries * 1e6, 1),
+        "signature": timed(lambda: signature(rng.choice(miss_texts)), args.lookups),
+        "lookup_hit": timed(lambda: cache.get(next(hits), "science", "intermediate"), args.lookups),
+        "lookup_miss": timed(lambda: cache.get(next(misses), "science", "intermediate"), args.lookups),
+        "stats": cache.stats(),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Response serialization benchmark: FastAPI's default path vs services/serialization
+
+Builds python-backend response models of realistic size - a study schedule
+with --blocks blocks and a quiz with --questions questions - and times
+turning each into a response body:
+- fastapi: what FastAPI does for a route with response_model (dump,
+  re-validate, serialize to JSON-compatible data) followed by JSONResponse
+  (json.dumps)
+- fastapi_orjson: the same with fastapi.responses.ORJSONResponse as the
+  response class (only the last step changes)
+- orjson_model_dump: orjson.dumps(model.model_dump())
+- fast_response: FastJSONResponse(model), what FastRoute sends
+and, end to end, the median time of a GET through each app in process
+(httpx ASGI transport, no network). Bodies are checked to decode to the
+same JSON. Needs python-backend's requirements.
+
+Usage:
+    python benchmarks/serialization_bench.py --blocks 1000 --questions 100 --json serialization.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from statistics import median
+from typing import Any, Awaitable, Callable, Dict
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(BENCH_DIR), "python-backend"))
+
+import httpx
+import orjson
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import APIRoute, serialize_response
+from pydantic import BaseModel
+
+from main import QuizQuestion, QuizResponse, ScheduleResponse, StudyBlock
+from services.serialization import FastJSONResponse, FastRoute
+
+FOCUS = "Work through the worked examples, then summarize the key definitions in your own words"
+
+
+def make_schedule(blocks: int) -> ScheduleResponse:
+    return ScheduleResponse(
+        schedule=[
+            StudyBlock(day=i // 10 + 1, topic=f"Topic {i % 25}", duration=25 + i % 4 * 15,
+                       focus_area=FOCUS, kind="review" if i % 5 == 4 else "study")
+            for i in range(blocks)
+        ],
+        total_hours=blocks // 2,
+        tips=["Take a short break between blocks", "Review yesterday's notes first"],
+        timestamp="2025-01-01T09:00:00",
+    )
+
+
+def make_quiz(questions: int) -> QuizResponse:
+    return QuizResponse(
+        topic="Cell biology",
+        questions=[
+            QuizQuestion(
+                question=f"Question {i}: which organelle is responsible for producing most of the cell's ATP?",
+                options=["Mitochondrion", "Ribosome", "Golgi apparatus", "Lysosome"],
+                correct_answer="Mitochondrion",
+                explanation="Mitochondria carry out oxidative phosphorylation, which yields most of the ATP.",
+            )
+            for i in range(questions)
+        ],
+        timestamp="2025-01-01T09:00:00",
+    )
+
+
+def per_call_us(fn: Callable[[], Any], seconds: float) -> float:
+    """Median microseconds per call over batches filling about `seconds`"""
+    fn()
+    batch, samples, deadline = 1, [], time.perf_counter() + seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        elapsed = time.perf_counter() - start
+        samples.append(elapsed / batch)
+        if elapsed < 0.01:
+            batch *= 2
+    return round(median(samples) * 1e6, 1)
+
+
+async def async_per_call_us(fn: Callable[[], Awaitable[Any]], seconds: float) -> float:
+    """Median microseconds per awaited call over about `seconds`"""
+    await fn()
+    samples, deadline = [], time.perf_counter() + seconds
+    while time.perf_counter() < deadline or len(samples) < 5:
+        start = time.perf_counter()
+        await fn()
+        samples.append(time.perf_counter() - start)
+    return round(median(samples) * 1e6, 1)
+
+
+def build_app(model: BaseModel, fast: bool) -> FastAPI:
+    app = FastAPI(default_response_class=FastJSONResponse if fast else JSONResponse)
+    if fast:
+        app.router.route_class = FastRoute
+
+    @app.get("/item", response_model=type(model))
+    async def item():
+        return model
+
+    return app
+
+
+async def request_us(app: FastAPI, samples: int) -> float:
+    times = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+        for _ in range(samples + 5):
+            start = time.perf_counter()
+            response = await client.get("/item")
+            times.append(time.perf_counter() - start)
+            response.raise_for_status()
+    return round(median(times[5:]) * 1e6, 1)
+
+
+def bench(model: BaseModel, args: argparse.Namespace) -> Dict[str, Any]:
+    field = APIRoute("/item", lambda: None, response_model=type(model)).response_field
+
+    def via_fastapi(response_class) -> Callable[[], Awaitable[bytes]]:
+        async def render() -> bytes:
+            content = await serialize_response(field=field, response_content=model, is_coroutine=True)
+            return response_class(content).body
+        return render
+
+    bodies = {
+        "fastapi": asyncio.run(via_fastapi(JSONResponse)()),
+        "fastapi_orjson": asyncio.run(via_fastapi(ORJSONResponse)()),
+        "orjson_model_dump": orjson.dumps(model.model_dump()),
+        "fast_response": FastJSONResponse(model).body,
+    }
+    reference = json.loads(bodies["fastapi"])
+    for name, body in bodies.items():
+        assert json.loads(body) == reference, f"{name} body differs"
+
+    result = {
+        "body_kb": round(len(bodies["fast_response"]) / 1024, 1),
+        "render_us": {
+            "fastapi": asyncio.run(async_per_call_us(via_fastapi(JSONResponse), args.seconds)),
+            "fastapi_orjson": asyncio.run(async_per_call_us(via_fastapi(ORJSONResponse), args.seconds)),
+            "orjson_model_dump": per_call_us(lambda: orjson.dumps(model.model_dump()), args.seconds),
+            "fast_response": per_call_us(lambda: FastJSONResponse(model).body, args.seconds),
+        },
+        "request_us": {
+            "fastapi": asyncio.run(request_us(build_app(model, fast=False), args.requests)),
+            "fast": asyncio.run(request_us(build_app(model, fast=True), args.requests)),
+        },
+    }
+    render = result["render_us"]
+    result["render_speedup"] = round(render["fastapi"] / render["fast_response"], 1)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--blocks", type=int, default=1000, help="Schedule blocks (default: 1000)")
+    parser.add_argument("--questions", type=int, default=100, help="Quiz questions (default: 100)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="Time spent per render measurement")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per end-to-end measurement")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = {
+        f"schedule_{args.blocks}_blocks": bench(make_schedule(args.blocks), args),
+        f"quiz_{args.questions}_questions": bench(make_quiz(args.questions), args),
+    }
+    print(json.dumps(results, indent=2))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Serve one of the backends with an event-loop lag probe
+
+Imports main:app from the given app directory, adds
+GET /__bench/loop-lag (lag statistics since the previous call) and runs it
+under uvicorn. Run it with the app's own interpreter/virtualenv.
+
+Usage:
+    backend/venv/bin/python benchmarks/serve_app.py --app-dir backend --port 8001
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import uvicorn
+
+from loop_lag import LoopLagMonitor
+
+
+async def serve(app_dir: str, host: str, port: int, log_level: str) -> None:
+    app_dir = os.path.abspath(app_dir)
+    sys.path.insert(0, app_dir)
+    os.chdir(app_dir)
+
+    from main import app
+
+    # The apps configure INFO logging on import; per-request log lines would dominate the profile
+    logging.getLogger().setLevel(log_level.upper())
+
+    monitor = LoopLagMonitor()
+
+    async def loop_lag():
+        return monitor.collect()
+
+    app.add_api_route("/__bench/loop-lag", loop_lag, methods=["GET"], include_in_schema=False)
+
+    server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level=log_level))
+    monitor.start()
+    try:
+        await server.serve()
+    finally:
+        await monitor.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app-dir", required=True, help="Directory containing main.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="warning")
+    args = parser.parse_args()
+
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    asyncio.run(serve(args.app_dir, args.host, args.port, args.log_level))
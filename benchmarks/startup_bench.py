@@ -0,0 +1,189 @@
+"""
+Cold start benchmark: import time, time to ready and first-request latency
+
+For each app, in fresh processes:
+- import: seconds to `import main`, whether the heavy modules (openai,
+  pydantic_ai) were loaded by it, and the slowest direct imports of main
+  (from python -X importtime)
+- ready: seconds from spawning benchmarks/serve_app.py until GET / answers
+- first / second: latency of the first generation request, sent --settle
+  seconds after the app is ready (it pays for lazy agent construction
+  unless the pre-warm already did), and of a second, different one
+
+Both AGENT_PREWARM settings are measured. Generation requests go to
+benchmarks/mock_openrouter.py with a fixed latency, so differences are
+startup cost, not model latency. Run with an interpreter that has httpx and
+the mock's dependencies; each app runs with its own interpreter.
+
+Usage:
+    python benchmarks/startup_bench.py --backend-python backend/venv/bin/python \\
+        --python-backend-python python-backend/venv/bin/python --runs 5 --json startup.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from statistics import median
+from typing import Any, Dict, List
+
+import httpx
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, BENCH_DIR)
+
+from loadtest import ROOT_DIR, free_port, start_process, stop_process, wait_ready
+
+HEAVY_MODULES = ("openai", "pydantic_ai")
+
+# One generation request per app, and a different one for the warm comparison
+FIRST_REQUEST = {
+    "backend": ("/api/chat", [
+        {"message": "Explain recursion with an example", "subject": "Computer Science"},
+        {"message": "How do plants turn sunlight into sugar?", "subject": "Biology"},
+    ]),
+    "python-backend": ("/api/explain", [
+        {"topic": "recursion", "depth": "basic"},
+        {"topic": "photosynthesis", "depth": "advanced"},
+    ]),
+}
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - started,
+                  "heavy": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+
+def app_env(log_dir: str, app: str, mock_url: str, prewarm: bool) -> Dict[str, str]:
+    return dict(
+        os.environ,
+        OPENROUTER_BASE_URL=f"{mock_url}/v1",
+        OPENROUTER_API_KEY="mock",
+        AGENT_PREWARM="1" if prewarm else "0",
+        QUESTION_BANK_DB=os.path.join(log_dir, f"{app}-question-bank.db"),
+        JOBS_DB=os.path.join(log_dir, f"{app}-jobs.db"),
+        CHAT_SESSIONS_DB=os.path.join(log_dir, f"{app}-chat-sessions.db"),
+        FLASHCARD_DB=os.path.join(log_dir, f"{app}-flashcards.db"),
+    )
+
+
+def measure_import(python: str, app: str, env: Dict[str, str]) -> Dict[str, Any]:
+    output = subprocess.run(
+        [python, "-c", IMPORT_SCRIPT], cwd=os.path.join(ROOT_DIR, app), env=env,
+        capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(python: str, app: str, env: Dict[str, str], top: int) -> List[Dict[str, Any]]:
+    """Direct imports of main with the largest cumulative import time"""
+    stderr = subprocess.run(
+        [python, "-X", "importtime", "-c", "import main"], cwd=os.path.join(ROOT_DIR, app), env=env,
+        capture_output=True, text=True, check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        name = name[1:]
+        # Direct imports of main are indented by exactly two spaces
+        if not name.startswith("  ") or name.startswith("   ") or not cumulative.strip().isdigit():
+            continue
+        rows.append({"module": name.strip(), "ms": round(int(cumulative) / 1000, 1)})
+    return sorted(rows, key=lambda row: row["ms"], reverse=True)[:top]
+
+
+async def measure_start(
+    python: str, app: str, env: Dict[str, str], log_dir: str, run: int, settle: float
+) -> Dict[str, float]:
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = start_process(
+        [python, os.path.join(BENCH_DIR, "serve_app.py"), "--app-dir", os.path.join(ROOT_DIR, app), "--port", str(port)],
+        env, os.path.join(log_dir, f"{app}-{env['AGENT_PREWARM']}-{run}.log"),
+    )
+    try:
+        await wait_ready(base_url + "/", process)
+        ready = time.perf_counter() - started
+        await asyncio.sleep(settle)
+        path, bodies = FIRST_REQUEST[app]
+        latencies = []
+        async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+            for body in bodies:
+                request_started = time.perf_counter()
+                response = await client.post(path, json=body)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - request_started)
+        return {"ready": ready, "first": latencies[0], "second": latencies[1]}
+    finally:
+        stop_process(process)
+
+
+def summarize(samples: List[float], scale: float = 1.0) -> Dict[str, float]:
+    return {"median": round(median(samples) * scale, 3), "max": round(max(samples) * scale, 3)}
+
+
+async def bench_app(app: str, python: str, mock_url: str, args: argparse.Namespace, log_dir: str) -> Dict[str, Any]:
+    env = app_env(log_dir, app, mock_url, prewarm=False)
+    imports = [measure_import(python, app, env) for _ in range(args.runs)]
+    result: Dict[str, Any] = {
+        "import_s": summarize([sample["seconds"] for sample in imports]),
+        "heavy_modules_loaded_by_import": imports[-1]["heavy"],
+        "slowest_imports": slowest_imports(python, app, env, args.top),
+    }
+    for prewarm in (False, True):
+        env = app_env(log_dir, app, mock_url, prewarm)
+        starts = [await measure_start(python, app, env, log_dir, run, args.settle) for run in range(args.runs)]
+        result["prewarm" if prewarm else "lazy"] = {
+            "ready_s": summarize([s["ready"] for s in starts]),
+            "first_request_ms": summarize([s["first"] for s in starts], 1000),
+            "second_request_ms": summarize([s["second"] for s in starts], 1000),
+        }
+    return result
+
+
+async def main(args: argparse.Namespace) -> None:
+    log_dir = tempfile.mkdtemp(prefix="startup-bench-")
+    mock_port = free_port()
+    mock_url = f"http://127.0.0.1:{mock_port}"
+    mock = start_process(
+        [sys.executable, os.path.join(BENCH_DIR, "mock_openrouter.py"), "--port", str(mock_port),
+         "--latency", str(args.latency), "--distribution", "fixed", "--tokens-per-second", "0"],
+        dict(os.environ), os.path.join(log_dir, "mock.log"),
+    )
+    results = {}
+    try:
+        await wait_ready(mock_url + "/mock/stats", mock)
+        pythons = {"backend": args.backend_python, "python-backend": args.python_backend_python}
+        for app in args.apps.split(","):
+            results[app] = await bench_app(app, pythons[app], mock_url, args, log_dir)
+            print(json.dumps({app: results[app]}, indent=2))
+    finally:
+        stop_process(mock)
+    print(f"logs in {log_dir}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apps", default="backend,python-backend", help="Comma-separated: backend, python-backend")
+    parser.add_argument("--backend-python", default=sys.executable, help="Interpreter with backend/requirements.txt")
+    parser.add_argument("--python-backend-python", default=sys.executable,
+                        help="Interpreter with python-backend/requirements.txt")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement (default: 5)")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mock seconds per upstream call (default: 0.2)")
+    parser.add_argument("--settle", type=float, default=3.0,
+                        help="Seconds between ready and the first request (0 = at once; default: 3)")
+    parser.add_argument("--top", type=int, default=8, help="Slowest direct imports of main to report")
+    parser.add_argument("--json", help="Write results to this file")
+    asyncio.run(main(parser.parse_args()))
@@ -2,29 +2,44 @@
 Flashcard Agent - Generates study flashcards using Pydantic AI
 """
 
-import os
-import json
-from typing import List, Dict
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Dict, Tuple
+
+from .model_registry import build_agent, get_model, model_registry
+from services.fanout import batch_concurrency, batch_size, dedupe_near_duplicates, gather_limited
+from services.json_extract import extract_json
+from services.metrics import record_fallback
+from services.model_router import ModelRouter, models_for
+from services.resilience import call_upstream
+from services.token_budget import TokenBudget
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+# A question and a one or two sentence answer are about 70 tokens of JSON
+FLASHCARD_BUDGET = TokenBudget(
+    "flashcards", item_tokens=70, base_tokens=20, max_tokens=4096, request_tokens=14000,
+    max_input_tokens=200, unit="flashcards"
+)
 
 
 class FlashcardAgent:
+    # Bump when the prompt changes so cached responses are invalidated
+    PROMPT_VERSION = "1"
+
     def __init__(self):
         """Initialize the Flashcard Agent with OpenRouter"""
-        api_key = os.getenv("OPENROUTER_API_KEY")
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY environment variable not set")
-
-        self.model = OpenAIModel(
-            "google/gemini-2.0-flash-001:free",
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-        )
-
-        self.agent = Agent(
-            self.model,
-            system_prompt=(
+        # Ordered models (FLASHCARD_MODELS / AI_MODELS); the first is the primary
+        self.router = ModelRouter(models_for("FLASHCARD", model_registry.default_model_name()))
+        # Primary model; the pydantic-ai agent on it is built on first use
+        self.model_name = self.router.primary
+
+    @cached_property
+    def agent(self) -> "Agent":
+        """pydantic-ai Agent on the shared model (imports pydantic_ai on first use)"""
+        return build_agent(
+            self.model_name,
+            (
                 "You are a flashcard generator. Create clear, concise flashcards for studying. "
                 "Each flashcard should have a question on one side and an answer on the other. "
                 "Questions should test understanding, not just memorization. "
@@ -34,71 +49,117 @@ class FlashcardAgent:
             ),
         )
 
+    def _build_prompt(self, topic: str, count: int, part: int = 1, parts: int = 1) -> str:
+        prompt = (
+            f"Generate {count} flashcards about: {topic}\n\n"
+            f"Return ONLY a JSON object with this structure:\n"
+            f'{{"flashcards": [{{"question": "...", "answer": "..."}}, ...]}}\n\n'
+            f"No other text, just the JSON."
+        )
+        if parts > 1:
+            # Steer each sub-batch towards a different slice of the topic
+            prompt += (
+                f"\n\nThis is batch {part} of {parts} for the same deck. "
+                f"Cover aspects of the topic that the other batches are unlikely to cover."
+            )
+        return prompt
+
+    async def _generate_batch(self, topic: str, count: int, part: int, parts: int) -> Tuple[List[Dict], bool]:
+        """Run one prompt; returns the cards and whether the output was valid JSON"""
+        prompt = self._build_prompt(topic, count, part, parts)
+        result = await self.router.run(
+            lambda model_name: call_upstream(
+                lambda: self.agent.run(
+                    prompt,
+                    model=get_model(model_name),
+                    model_settings={"max_tokens": FLASHCARD_BUDGET.max_tokens_for(count)}
+                ),
+                model_name,
+                agent="flashcard"
+            )
+        )
+        response_text = result.data.strip()
+
+        data = extract_json(response_text)
+        if data is not None:
+            return data.get("flashcards", [])[:count], True
+
+        # Fallback: Parse manually
+        lines = response_text.split("\n")
+        flashcards = []
+        current_q = None
+
+        for line in lines:
+            line = line.strip()
+            if line.startswith("Q:") or line.startswith("Question:"):
+                current_q = line.split(":", 1)[1].strip()
+            elif (line.startswith("A:") or line.startswith("Answer:")) and current_q:
+                answer = line.split(":", 1)[1].strip()
+                flashcards.append({"question": current_q, "answer": answer})
+                current_q = None
+
+        return flashcards[:count], False
+
     async def generate_flashcards(self, topic: str, count: int) -> Dict:
         """
         Generate flashcards for a topic
 
+        Large counts are split into sub-batches of FANOUT_BATCH_SIZE (fewer
+        if the flashcard token budget requires it) that run concurrently (at
+        most FANOUT_CONCURRENCY at a time); near-duplicate cards across
+        batches are dropped.
+
         Args:
             topic: The subject for flashcards
             count: Number of flashcards to generate
 
         Returns:
-            Dictionary with list of flashcards
+            Dictionary with list of flashcards; "fallback" is True when
+            generic cards were used, and each generic card is marked "fallback"
+
+        Raises:
+            TokenBudgetExceeded: if the deck cannot fit in its token budget
         """
-        prompt = (
-            f"Generate {count} flashcards about: {topic}\n\n"
-            f"Return ONLY a JSON object with this structure:\n"
-            f'{{"flashcards": [{{"question": "...", "answer": "..."}}, ...]}}\n\n'
-            f"No other text, just the JSON."
+        sizes = FLASHCARD_BUDGET.chunk_sizes(count, batch_size())
+        FLASHCARD_BUDGET.check(self._build_prompt(topic, sizes[0] if sizes else 0, 1, len(sizes)), count, topic)
+        results = await gather_limited(
+            [
+                lambda n=n, part=part: self._generate_batch(topic, n, part, len(sizes))
+                for part, n in enumerate(sizes, start=1)
+            ],
+            batch_concurrency(),
         )
 
-        result = await self.agent.run(prompt)
-        response_text = result.data.strip()
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        batches = [r for r in results if not isinstance(r, BaseException)]
 
-        # Try to parse JSON
-        try:
-            # Remove markdown code blocks if present
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
-                response_text = response_text.strip()
-
-            data = json.loads(response_text)
-            flashcards = data.get("flashcards", [])
-
-            # Ensure we have the requested count
-            if len(flashcards) < count:
-                # Pad with generic flashcards if needed
-                for i in range(len(flashcards), count):
-                    flashcards.append({
-                        "question": f"What is an important concept in {topic}?",
-                        "answer": "This is a key concept that requires further study."
-                    })
-
-            return {"flashcards": flashcards[:count]}
-
-        except json.JSONDecodeError:
-            # Fallback: Parse manually
-            lines = response_text.split("\n")
-            flashcards = []
-            current_q = None
-
-            for line in lines:
-                line = line.strip()
-                if line.startswith("Q:") or line.startswith("Question:"):
-                    current_q = line.split(":", 1)[1].strip()
-                elif (line.startswith("A:") or line.startswith("Answer:")) and current_q:
-                    answer = line.split(":", 1)[1].strip()
-                    flashcards.append({"question": current_q, "answer": answer})
-                    current_q = None
-
-            # If parsing failed, create default flashcards
-            if not flashcards:
-                flashcards = [
-                    {"question": f"What is {topic}?", "answer": f"A fundamental concept in the field."},
-                    {"question": f"Why is {topic} important?", "answer": "It forms the basis for advanced understanding."},
-                    {"question": f"How is {topic} applied?", "answer": "In various practical scenarios."},
-                ]
-
-            return {"flashcards": flashcards[:count]}
+        flashcards = dedupe_near_duplicates(
+            [card for cards, _ in batches for card in cards],
+            key=lambda card: card.get("question", ""),
+        )
+        fallback = len(flashcards) < count or not all(parsed for _, parsed in batches)
+
+        # If parsing failed everywhere, create default flashcards
+        if not flashcards and not any(parsed for _, parsed in batches):
+            flashcards = [
+                {"question": f"What is {topic}?", "answer": f"A fundamental concept in the field.", "fallback": True},
+                {"question": f"Why is {topic} important?", "answer": "It forms the basis for advanced understanding.", "fallback": True},
+                {"question": f"How is {topic} applied?", "answer": "In various practical scenarios.", "fallback": True},
+            ]
+            record_fallback("flashcard", "default_flashcards")
+            return {"flashcards": flashcards[:count], "fallback": True}
+
+        # Ensure we have the requested count
+        if len(flashcards) < count:
+            # Pad with generic flashcards if needed
+            record_fallback("flashcard", "generic_flashcard", count - len(flashcards))
+            for i in range(len(flashcards), count):
+                flashcards.append({
+                    "question": f"What is an important concept in {topic}?",
+                    "answer": "This is a key concept that requires further study.",
+                    "fallback": True
+                })
+
+        return {"flashcards": flashcards[:count], "fallback": fallback}
@@ -0,0 +1,129 @@
+"""
+Model Registry - One shared, pooled OpenRouter connection for every agent
+
+openai and pydantic_ai are imported on first use, not at import time, so
+the app starts (and serves cached or banked content) without paying for
+them; services/warmup.py can load them in the background at startup.
+"""
+
+import os
+from typing import TYPE_CHECKING, Dict, Optional
+
+import httpx
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+    from pydantic_ai import Agent
+    from pydantic_ai.models.openai import OpenAIModel
+
+DEFAULT_BASE_URL = "https://openrouter.ai/api/v1"
+DEFAULT_MODEL = "google/gemini-2.0-flash-001:free"
+
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of OpenAIModel instances.
+
+    All models share one AsyncOpenAI client, and therefore one httpx
+    connection pool, so TLS sessions to OpenRouter are reused across agents.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        http2: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+    ):
+        self.base_url = base_url or os.getenv("OPENROUTER_BASE_URL", DEFAULT_BASE_URL)
+        self.max_connections = max_connections or int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+        self.max_keepalive_connections = max_keepalive_connections or int(os.getenv("LLM_MAX_KEEPALIVE", "20"))
+        self.keepalive_expiry = keepalive_expiry or float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+        self.http2 = http2 if http2 is not None else _env_flag("LLM_HTTP2", True)
+        self.timeout = timeout or float(os.getenv("LLM_TIMEOUT", "120"))
+        self.connect_timeout = connect_timeout or float(os.getenv("LLM_CONNECT_TIMEOUT", "10"))
+
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._openai_client: Optional["AsyncOpenAI"] = None
+        self._models: Dict[str, "OpenAIModel"] = {}
+
+    def _build_http_client(self) -> httpx.AsyncClient:
+        limits = httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+        timeout = httpx.Timeout(self.timeout, connect=self.connect_timeout)
+        return httpx.AsyncClient(limits=limits, timeout=timeout, http2=self.http2)
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """The shared AsyncOpenAI client, built on first use"""
+        if self._openai_client is None:
+            from openai import AsyncOpenAI
+
+            api_key = os.getenv("OPENROUTER_API_KEY")
+            if not api_key:
+                raise ValueError("OPENROUTER_API_KEY environment variable not set")
+
+            self._http_client = self._build_http_client()
+            self._openai_client = AsyncOpenAI(
+                base_url=self.base_url,
+                api_key=api_key,
+                http_client=self._http_client,
+            )
+        return self._openai_client
+
+    @staticmethod
+    def default_model_name() -> str:
+        return os.getenv("AI_MODEL", DEFAULT_MODEL)
+
+    def get_model(self, model_name: Optional[str] = None) -> "OpenAIModel":
+        """
+        Get the shared model for a model name
+
+        Args:
+            model_name: OpenRouter model id (defaults to AI_MODEL)
+
+        Returns:
+            An OpenAIModel backed by the shared client
+        """
+        model_name = model_name or self.default_model_name()
+        if model_name not in self._models:
+            from pydantic_ai.models.openai import OpenAIModel
+
+            self._models[model_name] = OpenAIModel(model_name, openai_client=self.client)
+        return self._models[model_name]
+
+    async def aclose(self) -> None:
+        """Close the pooled connections (call on application shutdown)"""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+        self._http_client = None
+        self._openai_client = None
+        self._models.clear()
+
+
+model_registry = ModelRegistry()
+
+
+def get_model(model_name: Optional[str] = None) -> "OpenAIModel":
+    """Shortcut for model_registry.get_model"""
+    return model_registry.get_model(model_name)
+
+
+def build_agent(model_name: str, system_prompt: str) -> "Agent":
+    """A pydantic-ai Agent on the shared model for model_name"""
+    from pydantic_ai import Agent
+
+    return Agent(get_model(model_name), system_prompt=system_prompt)
@@ -2,29 +2,67 @@
 Quiz Agent - Generates quiz questions using Pydantic AI
 """
 
-import os
-import json
-from typing import List, Dict
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
+from functools import cached_property
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict, Optional
+
+from .model_registry import build_agent, get_model, model_registry
+from services.fanout import batch_concurrency, batch_size, dedupe_near_duplicates, gather_limited
+from services.json_extract import ArrayItemStream, extract_json
+from services.limiter import upstream_limiter
+from services.metrics import observe_stream, record_fallback
+from services.model_router import ModelRouter, models_for
+from services.resilience import call_upstream, get_breaker
+from services.token_budget import TokenBudget
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+REQUIRED_FIELDS = ["question", "options", "correct_answer", "explanation"]
+
+# A question with four options and an explanation is about 130 tokens of JSON
+QUIZ_BUDGET = TokenBudget(
+    "quiz", item_tokens=130, base_tokens=30, max_tokens=4096, request_tokens=13000,
+    max_input_tokens=200, unit="questions"
+)
+
+
+def is_valid_question(q: Dict) -> bool:
+    """A question needs every field and exactly 4 options"""
+    return all(k in q for k in REQUIRED_FIELDS) and len(q["options"]) == 4
+
+
+def placeholder_question(topic: str) -> Dict:
+    """Generic question used to pad a quiz that came back short"""
+    return {
+        "question": f"What is an important aspect of {topic}?",
+        "options": [
+            "Fundamental concept A",
+            "Basic principle B",
+            "Core idea C",
+            "Essential element D"
+        ],
+        "correct_answer": "Fundamental concept A",
+        "explanation": "This represents a key understanding of the topic."
+    }
 
 
 class QuizAgent:
+    # Bump when the prompt changes so cached responses are invalidated
+    PROMPT_VERSION = "1"
+
     def __init__(self):
         """Initialize the Quiz Agent with OpenRouter"""
-        api_key = os.getenv("OPENROUTER_API_KEY")
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY environment variable not set")
-
-        self.model = OpenAIModel(
-            "google/gemini-2.0-flash-001:free",
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-        )
-
-        self.agent = Agent(
-            self.model,
-            system_prompt=(
+        # Ordered models (QUIZ_MODELS / AI_MODELS); the first is the primary
+        self.router = ModelRouter(models_for("QUIZ", model_registry.default_model_name()))
+        # Primary model; the pydantic-ai agent on it is built on first use
+        self.model_name = self.router.primary
+
+    @cached_property
+    def agent(self) -> "Agent":
+        """pydantic-ai Agent on the shared model (imports pydantic_ai on first use)"""
+        return build_agent(
+            self.model_name,
+            (
                 "You are a quiz generator. Create multiple-choice questions with 4 options each. "
                 "Questions should test comprehension and application, not just recall. "
                 "One option must be correct, three must be plausible but incorrect. "
@@ -35,65 +73,98 @@ class QuizAgent:
             ),
         )
 
+    def _build_prompt(self, topic: str, difficulty: str, count: int, part: int = 1, parts: int = 1) -> str:
+        prompt = (
+            f"Generate {count} {difficulty} multiple-choice questions about: {topic}\n\n"
+            f"Return ONLY a JSON object with this structure:\n"
+            f'{{"questions": [{{"question": "...", "options": ["Option 1", "Option 2", "Option 3", "Option 4"], '
+            f'"correct_answer": "Option 1", "explanation": "..."}}, ...]}}\n\n'
+            f"No other text, just the JSON."
+        )
+        if parts > 1:
+            # Steer each sub-batch towards a different slice of the topic
+            prompt += (
+                f"\n\nThis is batch {part} of {parts} for the same quiz. "
+                f"Cover aspects of the topic that the other batches are unlikely to cover."
+            )
+        return prompt
+
+    def check_budget(self, topic: str, difficulty: str, count: int, max_per_call: Optional[int] = None) -> List[int]:
+        """
+        Question counts of the calls a quiz is split into
+
+        Raises:
+            TokenBudgetExceeded: if the quiz cannot fit in its token budget
+        """
+        sizes = QUIZ_BUDGET.chunk_sizes(count, max_per_call)
+        QUIZ_BUDGET.check(
+            self._build_prompt(topic, difficulty, sizes[0] if sizes else 0, 1, len(sizes)),
+            count,
+            user_text=topic + difficulty
+        )
+        return sizes
+
+    async def _generate_batch(
+        self, topic: str, difficulty: str, count: int, part: int, parts: int
+    ) -> Optional[List[Dict]]:
+        """Run one prompt; returns validated questions, or None if the output was not JSON"""
+        prompt = self._build_prompt(topic, difficulty, count, part, parts)
+
+        result = await self.router.run(
+            lambda model_name: call_upstream(
+                lambda: self.agent.run(
+                    prompt,
+                    model=get_model(model_name),
+                    model_settings={"max_tokens": QUIZ_BUDGET.max_tokens_for(count)}
+                ),
+                model_name,
+                agent="quiz"
+            )
+        )
+        data = extract_json(result.data)
+        if data is None:
+            return None
+        questions = data.get("questions", [])
+
+        # Validate and ensure correct structure
+        return [q for q in questions if is_valid_question(q)][:count]
+
     async def generate_quiz(self, topic: str, difficulty: str, count: int) -> Dict:
         """
         Generate quiz questions for a topic
 
+        Large counts are split into sub-batches of FANOUT_BATCH_SIZE (fewer
+        if the quiz token budget requires it) that run concurrently (at most
+        FANOUT_CONCURRENCY at a time); near-duplicate questions across
+        batches are dropped.
+
         Args:
             topic: The subject for the quiz
             difficulty: The difficulty level (easy, medium, hard)
             count: Number of questions to generate
 
         Returns:
-            Dictionary with list of quiz questions
+            Dictionary with list of quiz questions; "fallback" is True when
+            placeholder questions were used
+
+        Raises:
+            TokenBudgetExceeded: if the quiz cannot fit in its token budget
         """
-        prompt = (
-            f"Generate {count} {difficulty} multiple-choice questions about: {topic}\n\n"
-            f"Return ONLY a JSON object with this structure:\n"
-            f'{{"questions": [{{"question": "...", "options": ["Option 1", "Option 2", "Option 3", "Option 4"], '
-            f'"correct_answer": "Option 1", "explanation": "..."}}, ...]}}\n\n'
-            f"No other text, just the JSON."
+        sizes = self.check_budget(topic, difficulty, count, batch_size())
+        results = await gather_limited(
+            [
+                lambda n=n, part=part: self._generate_batch(topic, difficulty, n, part, len(sizes))
+                for part, n in enumerate(sizes, start=1)
+            ],
+            batch_concurrency(),
         )
 
-        result = await self.agent.run(prompt)
-        response_text = result.data.strip()
-
-        # Try to parse JSON
-        try:
-            # Remove markdown code blocks if present
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
-                response_text = response_text.strip()
-
-            data = json.loads(response_text)
-            questions = data.get("questions", [])
-
-            # Validate and ensure correct structure
-            validated_questions = []
-            for q in questions:
-                if all(k in q for k in ["question", "options", "correct_answer", "explanation"]):
-                    if len(q["options"]) == 4:
-                        validated_questions.append(q)
-
-            # If we don't have enough valid questions, create defaults
-            while len(validated_questions) < count:
-                validated_questions.append({
-                    "question": f"What is an important aspect of {topic}?",
-                    "options": [
-                        "Fundamental concept A",
-                        "Basic principle B",
-                        "Core idea C",
-                        "Essential element D"
-                    ],
-                    "correct_answer": "Fundamental concept A",
-                    "explanation": "This represents a key understanding of the topic."
-                })
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors and len(errors) == len(results):
+            raise errors[0]
+        batches = [r for r in results if not isinstance(r, BaseException)]
 
-            return {"questions": validated_questions[:count]}
-
-        except json.JSONDecodeError:
+        if batches and all(batch is None for batch in batches):
             # Fallback: Create default questions
             default_questions = []
             for i in range(count):
@@ -109,4 +180,68 @@ class QuizAgent:
                     "explanation": "This is the correct answer because it accurately describes the concept."
                 })
 
-            return {"questions": default_questions}
+            record_fallback("quiz", "default_questions")
+            return {"questions": default_questions, "fallback": True}
+
+        validated_questions = dedupe_near_duplicates(
+            [q for batch in batches if batch for q in batch],
+            key=lambda q: q["question"],
+        )
+
+        # If we don't have enough valid questions, create defaults
+        fallback = len(validated_questions) < count
+        if fallback:
+            record_fallback("quiz", "placeholder_question", count - len(validated_questions))
+        while len(validated_questions) < count:
+            validated_questions.append(placeholder_question(topic))
+
+        return {"questions": validated_questions[:count], "fallback": fallback}
+
+    async def stream_quiz(self, topic: str, difficulty: str, count: int) -> AsyncIterator[Dict]:
+        """
+        Stream quiz questions one at a time as the model produces them
+
+        Each question is yielded as soon as its JSON object closes in the
+        model output, with the same validation as generate_quiz. A quiz
+        larger than one call's token budget is streamed from consecutive
+        calls. A short quiz is padded with placeholder questions (marked
+        "fallback") at the end. Callers check the request with
+        check_budget before streaming.
+
+        Args:
+            topic: The subject for the quiz
+            difficulty: The difficulty level (easy, medium, hard)
+            count: Number of questions to generate
+
+        Yields:
+            Validated question dictionaries
+        """
+        sizes = QUIZ_BUDGET.chunk_sizes(count)
+        emitted = 0
+
+        # Streams are not hedged; use the currently healthiest model
+        model_name = self.router.ordered()[0]
+        for part, size in enumerate(sizes, start=1):
+            prompt = self._build_prompt(topic, difficulty, size, part, len(sizes))
+            parser = ArrayItemStream()
+            target = emitted + size
+            async with upstream_limiter.slot(), get_breaker(model_name).guard():
+                with observe_stream("quiz", model_name) as observer:
+                    async with self.agent.run_stream(
+                        prompt,
+                        model=get_model(model_name),
+                        model_settings={"max_tokens": QUIZ_BUDGET.max_tokens_for(size)}
+                    ) as result:
+                        async for delta in result.stream_text(delta=True, debounce_by=None):
+                            observer.first_token()
+                            for q in parser.feed(delta):
+                                if emitted < target and is_valid_question(q):
+                                    emitted += 1
+                                    yield q
+                    observer.finish(result)
+
+        if emitted < count:
+            record_fallback("quiz", "placeholder_question", count - emitted)
+        while emitted < count:
+            emitted += 1
+            yield {**placeholder_question(topic), "fallback": True}
@@ -1,109 +1,217 @@
 """
 Schedule Agent - Creates personalized study schedules using Pydantic AI
+
+Time is allocated locally; the model only writes focus areas and tips.
 """
 
+import logging
 import os
-import json
-from typing import List, Dict
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Dict, Optional
+
+from .model_registry import build_agent, get_model, model_registry
+from services.fanout import batch_concurrency, gather_limited
+from services.json_extract import extract_json
+from services.metrics import record_fallback
+from services.model_router import ModelRouter, models_for
+from services.resilience import call_upstream
+from services.response_cache import normalize_value
+from services.study_plan import PlanSettings, plan_schedule
+from services.token_budget import TokenBudget
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+logger = logging.getLogger(__name__)
+
+
+# Used when the model output has no usable tips
+DEFAULT_TIPS = [
+    "Take regular breaks every 45-60 minutes",
+    "Review previous day's material before starting new topics",
+    "Practice active recall and self-testing",
+    "Create summary notes at the end of each session",
+    "Stay hydrated and get enough sleep"
+]
+
+# Progression used for topics the model gave no focus areas for
+GENERIC_FOCUS_AREAS = [
+    "Core concepts and definitions",
+    "Key principles and how they connect",
+    "Worked examples",
+    "Practice problems",
+    "Common mistakes and tricky cases",
+    "Mixed practice and self-testing"
+]
+
+# Six short focus areas are about 100 tokens of JSON per topic, the tips about 120
+SCHEDULE_BUDGET = TokenBudget(
+    "schedule", item_tokens=100, base_tokens=120, max_tokens=4096, request_tokens=10000,
+    max_input_tokens=1500, unit="topics"
+)
+
+# The local timetable has about days * hours_per_day * 60 / max_block_minutes
+# blocks, so days and hours bound the response size the way topics bound the prompt
+SCHEDULE_MAX_DAYS = int(os.getenv("SCHEDULE_MAX_DAYS", "365"))
+SCHEDULE_MAX_HOURS_PER_DAY = 24
 
 
 class ScheduleAgent:
+    # Bump when the prompt changes so cached responses are invalidated
+    PROMPT_VERSION = "2"
+    # Focus areas requested per topic; spread over however many sessions it gets
+    FOCUS_AREAS = 6
+
     def __init__(self):
         """Initialize the Schedule Agent with OpenRouter"""
-        api_key = os.getenv("OPENROUTER_API_KEY")
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY environment variable not set")
-
-        self.model = OpenAIModel(
-            "google/gemini-2.0-flash-001:free",
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-        )
-
-        self.agent = Agent(
-            self.model,
-            system_prompt=(
-                "You are a study schedule optimizer. Create balanced, effective study schedules. "
-                "Distribute topics across days, allocate appropriate time based on complexity, "
-                "include breaks and variety, and provide study tips. "
+        # Ordered models (SCHEDULE_MODELS / AI_MODELS); the first is the primary
+        self.router = ModelRouter(models_for("SCHEDULE", model_registry.default_model_name()))
+        # Primary model; the pydantic-ai agent on it is built on first use
+        self.model_name = self.router.primary
+
+    @cached_property
+    def agent(self) -> "Agent":
+        """pydantic-ai Agent on the shared model (imports pydantic_ai on first use)"""
+        return build_agent(
+            self.model_name,
+            (
+                "You are a study coach. For each topic, list what to focus on in the order it should be "
+                "studied, from fundamentals to advanced practice, and give practical study tips. "
                 "Return ONLY valid JSON in this exact format: "
-                '{{"schedule": [{{"day": 1, "topic": "...", "duration": 60, "focus_area": "..."}}, ...], '
-                '"total_hours": 14, "tips": ["Tip 1", "Tip 2", "Tip 3"]}}'
+                '{{"focus_areas": {{"Topic": ["Focus area 1", "Focus area 2"]}}, "tips": ["Tip 1", "Tip 2", "Tip 3"]}}'
             ),
         )
 
-    async def create_schedule(self, topics: List[str], hours_per_day: int, days: int) -> Dict:
+    def _outline_prompt(self, topics: List[str]) -> str:
+        return (
+            f"Plan the study of these topics: {', '.join(topics)}\n\n"
+            f"For each topic list {self.FOCUS_AREAS} focus areas in the order they should be studied, "
+            f"each under 12 words, and give 3 to 5 short study tips.\n"
+            f"Return ONLY a JSON object with this structure:\n"
+            f'{{"focus_areas": {{"Topic name": ["Focus area 1", "Focus area 2", ...], ...}}, '
+            f'"tips": ["Study tip 1", "Study tip 2", "Study tip 3"]}}\n\n'
+            f"Use the topic names exactly as given. No other text, just the JSON."
+        )
+
+    async def _outline_batch(self, topics: List[str]) -> Dict:
+        """Run one outline prompt; returns the parsed JSON, or {} if the call failed"""
+        prompt = self._outline_prompt(topics)
+        try:
+            result = await self.router.run(
+                lambda model_name: call_upstream(
+                    lambda: self.agent.run(
+                        prompt,
+                        model=get_model(model_name),
+                        model_settings={"max_tokens": SCHEDULE_BUDGET.max_tokens_for(len(topics))}
+                    ),
+                    model_name,
+                    agent="schedule"
+                )
+            )
+            return extract_json(result.data) or {}
+        except Exception as e:
+            # The schedule itself is planned locally; only the wording degrades
+            logger.warning(f"Schedule outline generation failed, using generic focus areas: {str(e)}")
+            return {}
+
+    async def generate_outline(self, topics: List[str]) -> Dict:
+        """
+        Ask the model for per-topic focus areas and study tips
+
+        The outline depends only on the topics, so it is cached across
+        schedules with different hours, days or weights. More topics than
+        fit in one call's token budget are outlined by concurrent calls.
+        Generic focus areas are used for topics the model skipped; if the
+        calls fail or nothing usable comes back, the result is marked
+        "fallback".
+
+        Args:
+            topics: Topics to study
+
+        Returns:
+            {"focus_areas": {topic: [area, ...]}, "tips": [...], "fallback": bool}
+
+        Raises:
+            TokenBudgetExceeded: if there are too many topics or they are too long
+        """
+        sizes = SCHEDULE_BUDGET.chunk_sizes(len(topics))
+        chunks, start = [], 0
+        for size in sizes:
+            chunks.append(topics[start:start + size])
+            start += size
+        SCHEDULE_BUDGET.check(self._outline_prompt(chunks[0] if chunks else []), len(topics), " ".join(topics))
+
+        results = await gather_limited(
+            [lambda chunk=chunk: self._outline_batch(chunk) for chunk in chunks],
+            batch_concurrency(),
+        )
+
+        by_name = {}
+        tips: List[str] = []
+        for data in results:
+            if not isinstance(data, dict):
+                continue
+            focus = data.get("focus_areas")
+            if isinstance(focus, dict):
+                by_name.update((normalize_value(str(k)), v) for k, v in focus.items())
+            if not tips and isinstance(data.get("tips"), list):
+                tips = [t.strip() for t in data["tips"] if isinstance(t, str) and t.strip()]
+
+        focus_areas = {}
+        for topic in topics:
+            areas = by_name.get(normalize_value(topic))
+            areas = [a.strip() for a in areas if isinstance(a, str) and a.strip()] if isinstance(areas, list) else []
+            if areas:
+                focus_areas[topic] = areas[:self.FOCUS_AREAS]
+
+        if not focus_areas:
+            record_fallback("schedule", "generic_outline")
+        return {"focus_areas": focus_areas, "tips": tips[:5] or DEFAULT_TIPS, "fallback": not focus_areas}
+
+    def create_schedule(
+        self,
+        topics: List[str],
+        hours_per_day: int,
+        days: int,
+        outline: Dict,
+        weights: Optional[Dict[str, float]] = None,
+        difficulty: Optional[Dict[str, str]] = None,
+        settings: Optional[PlanSettings] = None
+    ) -> Dict:
         """
         Create a personalized study schedule
 
+        Time is allocated locally (services/study_plan.py); the outline from
+        generate_outline supplies the focus_area text and tips.
+
         Args:
             topics: List of topics to study
             hours_per_day: Hours available per day
             days: Number of days for the schedule
+            outline: Result of generate_outline for these topics
+            weights: Optional relative weight per topic
+            difficulty: Optional "easy" / "medium" / "hard" per topic
+            settings: Block length and review constraints
 
         Returns:
             Dictionary with schedule, total_hours, and tips
         """
-        prompt = (
-            f"Create a {days}-day study schedule for these topics: {', '.join(topics)}\n"
-            f"Available time: {hours_per_day} hours per day\n\n"
-            f"Return ONLY a JSON object with this structure:\n"
-            f'{{"schedule": [{{"day": 1, "topic": "Topic name", "duration": 60, "focus_area": "Specific area"}}, ...], '
-            f'"total_hours": {hours_per_day * days}, "tips": ["Study tip 1", "Study tip 2", "Study tip 3"]}}\n\n'
-            f"Duration should be in minutes. Distribute topics across all {days} days. "
-            f"No other text, just the JSON."
-        )
+        blocks = plan_schedule(topics, hours_per_day, days, weights, difficulty, settings)
 
-        result = await self.agent.run(prompt)
-        response_text = result.data.strip()
+        sessions: Dict[str, int] = {}
+        for block in blocks:
+            sessions[block["topic"]] = max(sessions.get(block["topic"], 0), block["session"])
 
-        # Try to parse JSON
-        try:
-            # Remove markdown code blocks if present
-            if response_text.startswith("```"):
-                response_text = response_text.split("```")[1]
-                if response_text.startswith("json"):
-                    response_text = response_text[4:]
-                response_text = response_text.strip()
-
-            data = json.loads(response_text)
-
-            # Validate structure
-            if "schedule" in data and "tips" in data:
-                return {
-                    "schedule": data["schedule"],
-                    "total_hours": data.get("total_hours", hours_per_day * days),
-                    "tips": data["tips"]
-                }
-
-        except json.JSONDecodeError:
-            pass
-
-        # Fallback: Create a basic schedule
-        minutes_per_day = hours_per_day * 60
-        blocks_per_day = len(topics)
-        duration_per_block = minutes_per_day // max(blocks_per_day, 1)
-
-        schedule = []
-        for day in range(1, days + 1):
-            for i, topic in enumerate(topics):
-                schedule.append({
-                    "day": day,
-                    "topic": topic,
-                    "duration": duration_per_block,
-                    "focus_area": f"Core concepts and practice for {topic}"
-                })
+        # The outline may be cached for the same topics in another case or spacing
+        focus_areas = {normalize_value(topic): areas for topic, areas in outline["focus_areas"].items()}
+        for block in blocks:
+            areas = focus_areas.get(normalize_value(block["topic"])) or GENERIC_FOCUS_AREAS
+            # Walk through the focus areas in order over the topic's sessions
+            area = areas[(block["session"] - 1) * len(areas) // sessions[block["topic"]]]
+            block["focus_area"] = f"Review: {area}" if block["kind"] == "review" else area
 
         return {
-            "schedule": schedule,
+            "schedule": blocks,
             "total_hours": hours_per_day * days,
-            "tips": [
-                "Take regular breaks every 45-60 minutes",
-                "Review previous day's material before starting new topics",
-                "Practice active recall and self-testing",
-                "Create summary notes at the end of each session",
-                "Stay hydrated and get enough sleep"
-            ]
+            "tips": outline["tips"]
         }
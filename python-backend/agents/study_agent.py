@@ -2,30 +2,39 @@
 Study Agent - Explains topics and concepts using Pydantic AI
 """
 
-import os
-from typing import List, Dict
-from pydantic_ai import Agent
-from pydantic_ai.models.openai import OpenAIModel
+from functools import cached_property
+from typing import TYPE_CHECKING, List, Dict
+
+from .model_registry import build_agent, get_model, model_registry
+from services.metrics import record_fallback
+from services.model_router import ModelRouter, models_for
+from services.resilience import call_upstream
+from services.token_budget import TokenBudget
+
+if TYPE_CHECKING:
+    from pydantic_ai import Agent
+
+# Three paragraphs, five key points and three examples are about 1500 tokens
+EXPLAIN_BUDGET = TokenBudget("explain", base_tokens=1500, max_tokens=3072, max_input_tokens=200)
 
 
 class StudyAgent:
+    # Bump when the prompt changes so cached responses are invalidated
+    PROMPT_VERSION = "1"
+
     def __init__(self):
         """Initialize the Study Agent with OpenRouter"""
-        api_key = os.getenv("OPENROUTER_API_KEY")
-        if not api_key:
-            raise ValueError("OPENROUTER_API_KEY environment variable not set")
-
-        # Use OpenRouter with a free model
-        self.model = OpenAIModel(
-            "google/gemini-2.0-flash-001:free",
-            base_url="https://openrouter.ai/api/v1",
-            api_key=api_key,
-        )
+        # Ordered models (STUDY_MODELS / AI_MODELS); the first is the primary
+        self.router = ModelRouter(models_for("STUDY", model_registry.default_model_name()))
+        # Primary model; the pydantic-ai agent on it is built on first use
+        self.model_name = self.router.primary
 
-        # Create the agent with a system prompt
-        self.agent = Agent(
-            self.model,
-            system_prompt=(
+    @cached_property
+    def agent(self) -> "Agent":
+        """pydantic-ai Agent on the shared model (imports pydantic_ai on first use)"""
+        return build_agent(
+            self.model_name,
+            (
                 "You are an expert educational tutor specializing in breaking down complex topics. "
                 "Your role is to provide clear, comprehensive explanations suitable for students. "
                 "Always structure your responses with: "
@@ -45,7 +54,11 @@ class StudyAgent:
             depth: The depth level (basic, intermediate, advanced)
 
         Returns:
-            Dictionary with explanation, key_points, and examples
+            Dictionary with explanation, key_points, and examples; "fallback"
+            is True when generic points or examples were filled in
+
+        Raises:
+            TokenBudgetExceeded: if the topic is too long
         """
         prompt = (
             f"Explain the following topic at a {depth} level: {topic}\n\n"
@@ -54,8 +67,19 @@ class StudyAgent:
             f"KEY POINTS:\n- [Point 1]\n- [Point 2]\n- [Point 3]\n\n"
             f"EXAMPLES:\n- [Example 1]\n- [Example 2]\n- [Example 3]"
         )
+        EXPLAIN_BUDGET.check(prompt, user_text=topic + depth)
 
-        result = await self.agent.run(prompt)
+        result = await self.router.run(
+            lambda model_name: call_upstream(
+                lambda: self.agent.run(
+                    prompt,
+                    model=get_model(model_name),
+                    model_settings={"max_tokens": EXPLAIN_BUDGET.max_tokens_for()}
+                ),
+                model_name,
+                agent="study"
+            )
+        )
         response_text = result.data
 
         # Parse the structured response
@@ -95,13 +119,17 @@ class StudyAgent:
             explanation = "\n".join(explanation_lines).strip()
 
         # Ensure we have content
+        fallback = not key_points or not examples
         if not key_points:
+            record_fallback("study", "generic_key_points")
             key_points = ["Understanding requires practice", "Break down complex concepts", "Connect to real applications"]
         if not examples:
+            record_fallback("study", "generic_examples")
             examples = ["Real-world application example", "Practical use case", "Common scenario"]
 
         return {
             "explanation": explanation or response_text,
             "key_points": key_points[:5],  # Limit to 5
-            "examples": examples[:3]  # Limit to 3
+            "examples": examples[:3],  # Limit to 3
+            "fallback": fallback
         }
@@ -3,19 +3,40 @@ Study Buddy AI - Main FastAPI Application
 A Pydantic AI-powered study assistant
 """
 
+import asyncio
 import os
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field, ValidationError
 from dotenv import load_dotenv
 import logging
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional
 from datetime import datetime
 
 from agents.study_agent import StudyAgent
-from agents.flashcard_agent import FlashcardAgent
-from agents.quiz_agent import QuizAgent
-from agents.schedule_agent import ScheduleAgent
+from agents.flashcard_agent import FLASHCARD_BUDGET, FlashcardAgent
+from agents.quiz_agent import QUIZ_BUDGET, QuizAgent
+from agents.schedule_agent import SCHEDULE_BUDGET, SCHEDULE_MAX_DAYS, SCHEDULE_MAX_HOURS_PER_DAY, ScheduleAgent
+from agents.model_registry import model_registry
+from services.response_cache import ResponseCache, make_cache_key
+from services.compression import CompressionMiddleware, compression_stats
+from services.conditional import conditional_response, conditional_stats, strong_etag
+from services.fanout import as_completed_limited
+from services.flashcard_store import FlashcardStore
+from services.jobs import TERMINAL_STATES, JobManager
+from services.json_extract import extraction_stats
+from services.lifecycle import lifecycle
+from services.limiter import AdmissionRejected, upstream_limiter
+from services.metrics import CONTENT_TYPE_LATEST, MetricsMiddleware, render_metrics, stats_collector
+from services.question_bank import QuestionBank
+from services.resilience import breaker_stats
+from services.serialization import FastJSONResponse, FastRoute, dumps
+from services.singleflight import SingleFlight
+from services.study_plan import PlanSettings
+from services.token_budget import TokenBudgetExceeded, budget_stats
+from services.warmup import Prewarmer
 
 # Load environment variables
 load_dotenv()
@@ -24,11 +45,34 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await question_bank.start()
+    await flashcard_store.start()
+    await job_manager.start()
+    prewarmer.start()
+    lifecycle.mark_ready()
+    yield
+    lifecycle.begin_drain()
+    await prewarmer.stop()
+    # Running jobs and top-ups may finish within what is left of the drain deadline
+    await job_manager.stop(timeout=lifecycle.drain_remaining())
+    await flashcard_store.stop()
+    await question_bank.stop(timeout=lifecycle.drain_remaining())
+    # Release the shared OpenRouter connection pool
+    await model_registry.aclose()
+
+
 app = FastAPI(
     title="Study Buddy AI",
     description="AI-powered study assistant using Pydantic AI",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
+# Endpoints returning their response model skip FastAPI's re-validation (services/serialization.py)
+app.router.route_class = FastRoute
 
 # Configure CORS
 app.add_middleware(
@@ -37,14 +81,118 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+# gzip/brotli for complete JSON responses above COMPRESS_MIN_BYTES
+app.add_middleware(CompressionMiddleware)
+
+# Request latency histograms and in-flight gauges per route
+app.add_middleware(MetricsMiddleware)
+
 # Initialize agents
 study_agent = StudyAgent()
 flashcard_agent = FlashcardAgent()
 quiz_agent = QuizAgent()
 schedule_agent = ScheduleAgent()
 
+# Agents build their pydantic-ai agent and client on first use; pre-warm them in the background
+prewarmer = Prewarmer(lambda: [agent.agent for agent in (study_agent, flashcard_agent, quiz_agent, schedule_agent)])
+
+# Cache for generated content, keyed on the normalized request
+response_cache = ResponseCache()
+
+# Concurrent identical requests share one upstream call
+single_flight = SingleFlight()
+
+# Long generations submitted through /api/jobs run on a bounded worker pool
+job_manager = JobManager()
+
+# Validated quiz questions per topic/difficulty, sampled instead of generating
+question_bank = QuestionBank()
+
+# Generated flashcard decks with their spaced-repetition review state
+flashcard_store = FlashcardStore()
+
+# Component counters exported on /metrics
+stats_collector.register("response_cache", response_cache.stats)
+stats_collector.register("coalescing", single_flight.stats)
+stats_collector.register("upstream_limiter", upstream_limiter.stats)
+stats_collector.register("circuit", breaker_stats, label="model")
+stats_collector.register("jobs", job_manager.stats)
+stats_collector.register("question_bank", question_bank.stats)
+stats_collector.register("flashcards", flashcard_store.stats)
+stats_collector.register("json_extract", extraction_stats)
+stats_collector.register("prewarm", prewarmer.stats)
+stats_collector.register("lifecycle", lifecycle.stats)
+stats_collector.register("compression", compression_stats)
+stats_collector.register("conditional", conditional_stats)
+stats_collector.register("token_budget", budget_stats, label="endpoint")
+
+
+async def cached_generation(
+    kind: str,
+    agent,
+    generate: Callable[[], Awaitable[Dict]],
+    **params
+) -> Dict:
+    """
+    Serve an agent result from the response cache, generating it on a miss.
+    Concurrent identical requests are coalesced into one generation.
+    Placeholder (fallback) results are never cached.
+    """
+    key = generation_key(kind, agent, **params)
+
+    async def generate_tagged() -> Dict:
+        return tag_generation(key, await generate())
+
+    return await single_flight.do(
+        key,
+        lambda: response_cache.get_or_compute(
+            key,
+            generate_tagged,
+            should_store=lambda result: not result.get("fallback")
+        )
+    )
+
+
+def generation_key(kind: str, agent, **params) -> str:
+    return make_cache_key(kind, agent.model_name, agent.PROMPT_VERSION, **params)
+
+
+async def cached_result(kind: str, agent, **params) -> Dict:
+    """
+    An agent result already in the response cache, for the GET endpoints.
+    GET is safe and may be prefetched or crawled, so it never generates:
+    a miss is 404 and the content is created with the POST endpoint.
+    """
+    result = await response_cache.get(generation_key(kind, agent, **params))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Not generated yet, use POST to generate it")
+    return result
+
+
+def tag_generation(key: str, result: Dict) -> Dict:
+    """
+    Stamp a cacheable result with its generation time and a strong ETag
+    derived from its cache key and that time (used by the GET endpoints)
+    """
+    if result.get("fallback"):
+        return result
+    generated_at = datetime.now().isoformat()
+    return {**result, "generated_at": generated_at, "etag": strong_etag(key, generated_at)}
+
+
+async def refill_question_bank(topic: str, difficulty: str, count: int) -> List[Dict]:
+    """Generate questions for a question bank top-up; placeholder results are not banked"""
+    result = await quiz_agent.generate_quiz(topic, difficulty, count)
+    return [] if result.get("fallback") else result["questions"]
+
+
+def stock_question_bank(topic: str, difficulty: str) -> None:
+    """Top up the topic's question bank bucket in the background if it is running low"""
+    question_bank.ensure_stock(None, topic, difficulty, lambda n: refill_question_bank(topic, difficulty, n))
+
 
 # Request/Response Models
 class TopicRequest(BaseModel):
@@ -62,7 +210,7 @@ class ExplanationResponse(BaseModel):
 
 class FlashcardRequest(BaseModel):
     topic: str
-    count: int = 5
+    count: int = Field(5, ge=1, le=FLASHCARD_BUDGET.max_items)
 
 
 class Flashcard(BaseModel):
@@ -76,10 +224,51 @@ class FlashcardResponse(BaseModel):
     timestamp: str
 
 
+class DeckRequest(BaseModel):
+    topic: str
+    count: int = Field(10, ge=1, le=FLASHCARD_BUDGET.max_items)
+
+
+class DeckCard(BaseModel):
+    id: int
+    question: str
+    answer: str
+    due: str
+    reps: int
+    lapses: int
+
+
+class DeckResponse(BaseModel):
+    id: str
+    topic: str
+    card_count: int
+    due_count: int
+    new_count: int
+    next_due: Optional[str]
+    cards: List[DeckCard]
+    timestamp: str
+
+
+class DueCardsResponse(BaseModel):
+    deck_id: str
+    cards: List[DeckCard]
+    timestamp: str
+
+
+class ReviewRequest(BaseModel):
+    rating: int  # 1 again, 2 hard, 3 good, 4 easy
+
+
+class ReviewResponse(BaseModel):
+    card: DeckCard
+    interval_days: float
+    timestamp: str
+
+
 class QuizRequest(BaseModel):
     topic: str
     difficulty: str = "medium"  # easy, medium, hard
-    count: int = 5
+    count: int = Field(5, ge=1, le=QUIZ_BUDGET.max_items)
 
 
 class QuizQuestion(BaseModel):
@@ -96,9 +285,22 @@ class QuizResponse(BaseModel):
 
 
 class ScheduleRequest(BaseModel):
-    topics: List[str]
-    hours_per_day: int = 2
-    days: int = 7
+    topics: List[str] = Field(..., max_length=SCHEDULE_BUDGET.max_items)
+    hours_per_day: int = Field(2, ge=1, le=SCHEDULE_MAX_HOURS_PER_DAY)
+    days: int = Field(7, ge=1, le=SCHEDULE_MAX_DAYS)
+    weights: Optional[Dict[str, float]] = None  # relative study time per topic, default 1
+    difficulty: Optional[Dict[str, str]] = None  # easy, medium, hard per topic
+    max_block_minutes: Optional[int] = None  # default SCHEDULE_MAX_BLOCK_MINUTES
+
+
+class BatchItem(BaseModel):
+    kind: str  # explain, flashcards, quiz
+    topic: str
+    params: Dict[str, Any] = {}  # other fields of that endpoint's request body
+
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
 
 
 class StudyBlock(BaseModel):
@@ -106,6 +308,7 @@ class StudyBlock(BaseModel):
     topic: str
     duration: int  # minutes
     focus_area: str
+    kind: str = "study"  # study, review
 
 
 class ScheduleResponse(BaseModel):
@@ -115,6 +318,24 @@ class ScheduleResponse(BaseModel):
     timestamp: str
 
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """Shed excess load with 429/503 and a Retry-After hint"""
+    logger.warning(f"Rejected {request.url.path}: {exc.detail}")
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.detail},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+
+@app.exception_handler(TokenBudgetExceeded)
+async def token_budget_handler(request: Request, exc: TokenBudgetExceeded):
+    """Reject requests that cannot fit in their endpoint's token budget with 422"""
+    logger.warning(f"Rejected {request.url.path}: {exc.detail}")
+    return JSONResponse(status_code=422, content={"detail": exc.detail})
+
+
 # API Endpoints
 @app.get("/")
 async def root():
@@ -126,6 +347,90 @@ async def root():
     }
 
 
+@app.get("/health/live")
+async def liveness():
+    """Liveness probe: the process and its event loop are responsive"""
+    return {"status": "alive", "uptime_seconds": lifecycle.stats()["uptime_seconds"]}
+
+
+@app.get("/health/ready")
+async def readiness():
+    """
+    Readiness probe: 200 once startup has finished and until shutdown
+    begins, 503 while starting or draining
+    """
+    status = lifecycle.status()
+    return JSONResponse(status_code=200 if status == "ready" else 503, content={"status": status})
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics"""
+    return Response(render_metrics(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get("/api/cache/stats")
+async def cache_stats():
+    """Response cache hit/miss counters"""
+    return response_cache.stats()
+
+
+@app.get("/api/coalescing/stats")
+async def coalescing_stats():
+    """Single-flight counters: how many calls joined an in-flight generation"""
+    return single_flight.stats()
+
+
+@app.get("/api/question-bank/stats")
+async def question_bank_stats():
+    """Question bank size, sampling hits/misses and top-up counters"""
+    return question_bank.stats()
+
+
+@app.get("/api/limiter/stats")
+async def limiter_stats():
+    """Upstream admission control counters"""
+    return upstream_limiter.stats()
+
+
+@app.get("/api/circuits")
+async def circuit_stats():
+    """Per-model circuit breaker state"""
+    return breaker_stats()
+
+
+@app.get("/api/models")
+async def model_stats():
+    """Per-agent model order, hedging and latency/error statistics"""
+    return {
+        "explain": study_agent.router.to_dict(),
+        "flashcards": flashcard_agent.router.to_dict(),
+        "quiz": quiz_agent.router.to_dict(),
+        "schedule": schedule_agent.router.to_dict()
+    }
+
+
+async def explanation_result(request: TopicRequest) -> Dict:
+    """Cached explanation of a topic at a depth"""
+    return await cached_generation(
+        "explain",
+        study_agent,
+        lambda: study_agent.explain_topic(request.topic, request.depth),
+        topic=request.topic,
+        depth=request.depth
+    )
+
+
+def explanation_response(request: TopicRequest, result: Dict, timestamp: str) -> ExplanationResponse:
+    return ExplanationResponse(
+        topic=request.topic,
+        explanation=result["explanation"],
+        key_points=result["key_points"],
+        examples=result["examples"],
+        timestamp=timestamp
+    )
+
+
 @app.post("/api/explain", response_model=ExplanationResponse)
 async def explain_topic(request: TopicRequest):
     """
@@ -133,20 +438,52 @@ async def explain_topic(request: TopicRequest):
     """
     try:
         logger.info(f"Explaining topic: {request.topic} at {request.depth} level")
-        result = await study_agent.explain_topic(request.topic, request.depth)
-
-        return ExplanationResponse(
-            topic=request.topic,
-            explanation=result["explanation"],
-            key_points=result["key_points"],
-            examples=result["examples"],
-            timestamp=datetime.now().isoformat()
-        )
+        result = await explanation_result(request)
+        return explanation_response(request, result, datetime.now().isoformat())
+    except (AdmissionRejected, TokenBudgetExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error explaining topic: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/explain", response_model=ExplanationResponse)
+async def get_explanation(http_request: Request, request: TopicRequest = Depends()):
+    """
+    Cached explanation from POST /api/explain: the response carries a strong
+    ETag and its generation time, If-None-Match gets 304 Not Modified, and
+    an explanation not generated yet is 404 (no model call)
+    """
+    result = await cached_result("explain", study_agent, topic=request.topic, depth=request.depth)
+    return conditional_response(
+        http_request,
+        result.get("etag"),
+        lambda: explanation_response(request, result, result.get("generated_at") or datetime.now().isoformat())
+    )
+
+
+async def flashcard_result(request: FlashcardRequest) -> Dict:
+    """Cached flashcards for a topic"""
+    return await cached_generation(
+        "flashcards",
+        flashcard_agent,
+        lambda: flashcard_agent.generate_flashcards(request.topic, request.count),
+        topic=request.topic,
+        count=request.count
+    )
+
+
+def flashcard_response(request: FlashcardRequest, result: Dict, timestamp: str) -> FlashcardResponse:
+    return FlashcardResponse(
+        topic=request.topic,
+        flashcards=[
+            Flashcard(question=fc["question"], answer=fc["answer"])
+            for fc in result["flashcards"]
+        ],
+        timestamp=timestamp
+    )
+
+
 @app.post("/api/flashcards", response_model=FlashcardResponse)
 async def generate_flashcards(request: FlashcardRequest):
     """
@@ -154,37 +491,158 @@ async def generate_flashcards(request: FlashcardRequest):
     """
     try:
         logger.info(f"Generating {request.count} flashcards for: {request.topic}")
-        result = await flashcard_agent.generate_flashcards(request.topic, request.count)
-
-        flashcards = [
-            Flashcard(question=fc["question"], answer=fc["answer"])
-            for fc in result["flashcards"]
-        ]
-
-        return FlashcardResponse(
-            topic=request.topic,
-            flashcards=flashcards,
-            timestamp=datetime.now().isoformat()
-        )
+        result = await flashcard_result(request)
+        return flashcard_response(request, result, datetime.now().isoformat())
+    except (AdmissionRejected, TokenBudgetExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error generating flashcards: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.post("/api/quiz", response_model=QuizResponse)
-async def generate_quiz(request: QuizRequest):
+@app.get("/api/flashcards", response_model=FlashcardResponse)
+async def get_flashcards(http_request: Request, request: FlashcardRequest = Depends()):
     """
-    Generate a quiz for a topic
+    Cached flashcards from POST /api/flashcards (ETag and 304 Not Modified;
+    404 if not generated yet, no model call)
+    """
+    result = await cached_result("flashcards", flashcard_agent, topic=request.topic, count=request.count)
+    return conditional_response(
+        http_request,
+        result.get("etag"),
+        lambda: flashcard_response(request, result, result.get("generated_at") or datetime.now().isoformat())
+    )
+
+
+def iso_time(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+def deck_card(card: Dict) -> DeckCard:
+    return DeckCard(
+        id=card["id"],
+        question=card["question"],
+        answer=card["answer"],
+        due=iso_time(card["due"]),
+        reps=card["reps"],
+        lapses=card["lapses"]
+    )
+
+
+async def deck_view(deck_id: str) -> DeckResponse:
+    deck = await flashcard_store.get_deck(deck_id)
+    if deck is None:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    return DeckResponse(
+        id=deck["id"],
+        topic=deck["topic"],
+        card_count=deck["cards"],
+        due_count=deck["due"],
+        new_count=deck["new"],
+        next_due=iso_time(deck["next_due"]),
+        cards=[deck_card(card) for card in await flashcard_store.cards(deck_id)],
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@app.post("/api/decks", response_model=DeckResponse, status_code=201)
+async def create_deck(request: DeckRequest):
+    """
+    Generate flashcards for a topic and keep them as a deck studied with
+    spaced repetition (shares the /api/flashcards cache)
     """
     try:
-        logger.info(f"Generating {request.count} quiz questions for: {request.topic}")
-        result = await quiz_agent.generate_quiz(
-            request.topic,
-            request.difficulty,
-            request.count
+        logger.info(f"Creating a deck of {request.count} flashcards for: {request.topic}")
+        result = await cached_generation(
+            "flashcards",
+            flashcard_agent,
+            lambda: flashcard_agent.generate_flashcards(request.topic, request.count),
+            topic=request.topic,
+            count=request.count
         )
+        # Generic placeholder cards are not worth studying
+        cards = [card for card in result["flashcards"] if not card.get("fallback")]
+        if not cards:
+            raise HTTPException(status_code=503, detail="Could not generate flashcards, try again later")
+
+        deck = await flashcard_store.create_deck(request.topic, cards)
+        return await deck_view(deck["id"])
+    except (AdmissionRejected, TokenBudgetExceeded, HTTPException):
+        raise
+    except Exception as e:
+        logger.error(f"Error creating deck: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/decks/{deck_id}", response_model=DeckResponse)
+async def get_deck(deck_id: str):
+    """Deck with all its cards and how many are due"""
+    return await deck_view(deck_id)
 
-        questions = [
+
+@app.get("/api/decks/{deck_id}/due", response_model=DueCardsResponse)
+async def due_cards(deck_id: str, limit: Optional[int] = None):
+    """
+    Cards due for review now, longest overdue first (new cards are due at once).
+    At most FLASHCARD_DUE_LIMIT cards; no model call.
+    """
+    cards = await flashcard_store.due(deck_id, limit)
+    if not cards and await flashcard_store.get_deck(deck_id) is None:
+        raise HTTPException(status_code=404, detail="Deck not found")
+    return DueCardsResponse(
+        deck_id=deck_id,
+        cards=[deck_card(card) for card in cards],
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@app.post("/api/decks/{deck_id}/cards/{card_id}/review", response_model=ReviewResponse)
+async def review_card(deck_id: str, card_id: int, request: ReviewRequest):
+    """Log a review rated 1 (again), 2 (hard), 3 (good) or 4 (easy) and reschedule the card"""
+    if request.rating not in (1, 2, 3, 4):
+        raise HTTPException(status_code=422, detail="rating must be 1 (again), 2 (hard), 3 (good) or 4 (easy)")
+    card = await flashcard_store.review(deck_id, card_id, request.rating)
+    if card is None:
+        raise HTTPException(status_code=404, detail="Card not found")
+    return ReviewResponse(
+        card=deck_card(card),
+        interval_days=round(card["interval_days"], 4),
+        timestamp=datetime.now().isoformat()
+    )
+
+
+@app.delete("/api/decks/{deck_id}")
+async def delete_deck(deck_id: str):
+    """Delete a deck, its cards and their review history"""
+    if not await flashcard_store.delete_deck(deck_id):
+        raise HTTPException(status_code=404, detail="Deck not found")
+    return {"deck_id": deck_id, "deleted": True}
+
+
+async def generated_quiz(request: QuizRequest) -> Dict:
+    """Cached generated quiz; freshly generated questions are banked for later samples"""
+    async def generate() -> Dict:
+        result = await quiz_agent.generate_quiz(request.topic, request.difficulty, request.count)
+        if not result.get("fallback"):
+            await question_bank.add(None, request.topic, request.difficulty, result["questions"])
+        return result
+
+    result = await cached_generation(
+        "quiz",
+        quiz_agent,
+        generate,
+        topic=request.topic,
+        difficulty=request.difficulty,
+        count=request.count
+    )
+    stock_question_bank(request.topic, request.difficulty)
+    return result
+
+
+def quiz_response(request: QuizRequest, result: Dict, timestamp: str) -> QuizResponse:
+    return QuizResponse(
+        topic=request.topic,
+        questions=[
             QuizQuestion(
                 question=q["question"],
                 options=q["options"],
@@ -192,18 +650,133 @@ async def generate_quiz(request: QuizRequest):
                 explanation=q["explanation"]
             )
             for q in result["questions"]
-        ]
+        ],
+        timestamp=timestamp
+    )
 
-        return QuizResponse(
-            topic=request.topic,
-            questions=questions,
-            timestamp=datetime.now().isoformat()
-        )
+
+@app.post("/api/quiz", response_model=QuizResponse)
+async def generate_quiz(request: QuizRequest):
+    """
+    Generate a quiz for a topic
+
+    Sampled from the question bank when it already holds enough questions
+    for the topic and difficulty; generated otherwise.
+    """
+    try:
+        logger.info(f"Generating {request.count} quiz questions for: {request.topic}")
+        banked = question_bank.sample(None, request.topic, request.difficulty, request.count)
+        if banked is not None:
+            result = {"questions": banked}
+            stock_question_bank(request.topic, request.difficulty)
+        else:
+            result = await generated_quiz(request)
+        return quiz_response(request, result, datetime.now().isoformat())
+    except (AdmissionRejected, TokenBudgetExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error generating quiz: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/quiz", response_model=QuizResponse)
+async def get_quiz(http_request: Request, request: QuizRequest = Depends()):
+    """
+    Cached quiz generated by POST /api/quiz (ETag and 304 Not Modified;
+    404 if not generated yet, no model call)
+
+    Always the cached generation for the request, never a question bank
+    sample, so the same URL keeps returning the same questions; it does
+    not touch the question bank.
+    """
+    result = await cached_result(
+        "quiz",
+        quiz_agent,
+        topic=request.topic,
+        difficulty=request.difficulty,
+        count=request.count
+    )
+    return conditional_response(
+        http_request,
+        result.get("etag"),
+        lambda: quiz_response(request, result, result.get("generated_at") or datetime.now().isoformat())
+    )
+
+
+def sse_event(event: str, data: dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
+
+@app.post("/api/quiz/stream")
+async def stream_quiz(request: QuizRequest, http_request: Request):
+    """
+    Generate a quiz, streaming each question as a Server-Sent Event
+    as soon as the model finishes it (banked or cached quizzes are replayed)
+    """
+    logger.info(f"Streaming {request.count} quiz questions for: {request.topic}")
+    banked = question_bank.sample(None, request.topic, request.difficulty, request.count)
+    if banked is None:
+        # Reject before the 200 status line is sent if the quiz is over budget or upstream is saturated
+        quiz_agent.check_budget(request.topic, request.difficulty, request.count)
+        upstream_limiter.check()
+    key = make_cache_key(
+        "quiz",
+        quiz_agent.model_name,
+        quiz_agent.PROMPT_VERSION,
+        topic=request.topic,
+        difficulty=request.difficulty,
+        count=request.count
+    )
+
+    async def questions(cached: Optional[Dict]):
+        if cached is not None:
+            for q in cached["questions"]:
+                yield dict(q)
+        else:
+            async for q in quiz_agent.stream_quiz(request.topic, request.difficulty, request.count):
+                yield q
+
+    async def event_stream():
+        try:
+            cached = {"questions": banked} if banked is not None else await response_cache.get(key)
+            collected = []
+            fallback = False
+            async for q in questions(cached):
+                if await http_request.is_disconnected():
+                    logger.info("Client disconnected, cancelling quiz stream")
+                    return
+                fallback = fallback or bool(q.pop("fallback", False))
+                question = QuizQuestion(
+                    question=q["question"],
+                    options=q["options"],
+                    correct_answer=q["correct_answer"],
+                    explanation=q["explanation"]
+                )
+                collected.append(question.model_dump())
+                yield sse_event("question", {"index": len(collected) - 1, **collected[-1]})
+
+            if cached is None and not fallback:
+                await response_cache.set(key, tag_generation(key, {"questions": collected, "fallback": False}))
+                await question_bank.add(None, request.topic, request.difficulty, collected)
+            stock_question_bank(request.topic, request.difficulty)
+
+            yield sse_event("done", {
+                "topic": request.topic,
+                "count": len(collected),
+                "timestamp": datetime.now().isoformat()
+            })
+        except Exception as e:
+            logger.error(f"Error streaming quiz: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @app.post("/api/schedule", response_model=ScheduleResponse)
 async def create_study_schedule(request: ScheduleRequest):
     """
@@ -211,10 +784,23 @@ async def create_study_schedule(request: ScheduleRequest):
     """
     try:
         logger.info(f"Creating schedule for topics: {request.topics}")
-        result = await schedule_agent.create_schedule(
+        # One model call per topic set, cached; the allocation itself is local
+        outline = await cached_generation(
+            "schedule_outline",
+            schedule_agent,
+            lambda: schedule_agent.generate_outline(request.topics),
+            topics=sorted(set(request.topics))
+        )
+        # Allocation is CPU-bound and grows with days; keep it off the event loop
+        result = await asyncio.to_thread(
+            schedule_agent.create_schedule,
             request.topics,
             request.hours_per_day,
-            request.days
+            request.days,
+            outline,
+            weights=request.weights,
+            difficulty=request.difficulty,
+            settings=PlanSettings(max_block_minutes=request.max_block_minutes)
         )
 
         blocks = [
@@ -222,7 +808,8 @@ async def create_study_schedule(request: ScheduleRequest):
                 day=block["day"],
                 topic=block["topic"],
                 duration=block["duration"],
-                focus_area=block["focus_area"]
+                focus_area=block["focus_area"],
+                kind=block["kind"]
             )
             for block in result["schedule"]
         ]
@@ -233,11 +820,176 @@ async def create_study_schedule(request: ScheduleRequest):
             tips=result["tips"],
             timestamp=datetime.now().isoformat()
         )
+    except (AdmissionRejected, TokenBudgetExceeded):
+        raise
     except Exception as e:
         logger.error(f"Error creating schedule: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Background jobs: run the same generation as the endpoint above, off the request path
+job_manager.register("quiz", lambda params: generate_quiz(QuizRequest(**params)))
+job_manager.register("schedule", lambda params: create_study_schedule(ScheduleRequest(**params)))
+
+
+# Batch generation: each item runs through the same endpoint function
+BATCH_HANDLERS = {
+    "explain": (TopicRequest, explain_topic),
+    "flashcards": (FlashcardRequest, generate_flashcards),
+    "quiz": (QuizRequest, generate_quiz),
+}
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "50"))
+BATCH_CONCURRENCY = max(1, int(os.getenv("BATCH_CONCURRENCY", "4")))
+
+
+def ndjson_line(data: dict) -> bytes:
+    """Format one newline-delimited JSON record"""
+    return dumps(data) + b"\n"
+
+
+def batch_outcome(result) -> Dict:
+    """Status and result (or error) of one batch item"""
+    if isinstance(result, AdmissionRejected):
+        return {"status": result.status_code, "error": result.detail, "retry_after": result.retry_after}
+    if isinstance(result, TokenBudgetExceeded):
+        return {"status": 422, "error": result.detail}
+    if isinstance(result, HTTPException):
+        return {"status": result.status_code, "error": result.detail}
+    if isinstance(result, Exception):
+        return {"status": 500, "error": str(result)}
+    return {"status": 200, "result": result}
+
+
+@app.post("/api/batch")
+async def batch_generate(request: BatchRequest, http_request: Request):
+    """
+    Generate explanations, flashcards and quizzes for many topics in one call
+
+    Items run concurrently (at most BATCH_CONCURRENCY per batch, and all of
+    them under the global upstream limit), reuse the response cache and
+    question bank, and are streamed back as NDJSON in completion order:
+    one line per item with its index and status, then a `done` line.
+    """
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_MAX_ITEMS} items per batch")
+    calls = []
+    for index, item in enumerate(request.items):
+        if item.kind not in BATCH_HANDLERS:
+            raise HTTPException(
+                status_code=422,
+                detail=f"items[{index}]: unknown kind {item.kind!r}, expected one of {sorted(BATCH_HANDLERS)}"
+            )
+        request_model, handler = BATCH_HANDLERS[item.kind]
+        try:
+            item_request = request_model(**{**item.params, "topic": item.topic})
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=[
+                {"loc": ["body", "items", index, "params", *error["loc"]], "msg": error["msg"], "type": error["type"]}
+                for error in e.errors()
+            ])
+        calls.append(lambda handler=handler, item_request=item_request: handler(item_request))
+    logger.info(f"Batch of {len(calls)} items")
+
+    async def line_stream():
+        results = as_completed_limited(calls, BATCH_CONCURRENCY)
+        failed = 0
+        try:
+            async for index, result in results:
+                if await http_request.is_disconnected():
+                    logger.info("Client disconnected, cancelling batch")
+                    return
+                item = request.items[index]
+                outcome = batch_outcome(result)
+                failed += outcome["status"] != 200
+                yield ndjson_line({"index": index, "kind": item.kind, "topic": item.topic, **outcome})
+            yield ndjson_line({
+                "done": True,
+                "count": len(calls),
+                "failed": failed,
+                "timestamp": datetime.now().isoformat()
+            })
+        finally:
+            await results.aclose()
+
+    return StreamingResponse(
+        line_stream(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+def job_accepted(job: Dict) -> JSONResponse:
+    """202 response for a submitted job, pointing at its status URL"""
+    status_url = f"/api/jobs/{job['id']}"
+    return JSONResponse(
+        status_code=202,
+        content={**job, "status_url": status_url, "events_url": f"{status_url}/events"},
+        headers={"Location": status_url}
+    )
+
+
+@app.post("/api/jobs/quiz", status_code=202)
+async def submit_quiz_job(request: QuizRequest):
+    """
+    Generate a quiz in the background; returns a job id at once
+    """
+    logger.info(f"Queueing quiz job: {request.count} questions for {request.topic}")
+    return job_accepted(await job_manager.submit("quiz", request.model_dump()))
+
+
+@app.post("/api/jobs/schedule", status_code=202)
+async def submit_schedule_job(request: ScheduleRequest):
+    """
+    Create a study schedule in the background; returns a job id at once
+    """
+    logger.info(f"Queueing schedule job for topics: {request.topics}")
+    return job_accepted(await job_manager.submit("schedule", request.model_dump()))
+
+
+@app.get("/api/jobs/{job_id}")
+async def get_job(job_id: str, wait: float = 0):
+    """
+    Job status, with the result once it has succeeded.
+    Pass wait=<seconds> (up to 60) to long-poll until the job finishes.
+    """
+    job = await job_manager.wait(job_id, min(max(wait, 0), 60))
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """
+    Subscribe to a job: a `status` Server-Sent Event on every status change,
+    the last one carrying the result or error
+    """
+    job = await job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+
+    async def event_stream():
+        status = None
+        while True:
+            job = await job_manager.wait_for_change(job_id, status, timeout=15)
+            if job is None:
+                return
+            if job["status"] == status:
+                # Keep proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+                continue
+            status = job["status"]
+            yield sse_event("status", job)
+            if status in TERMINAL_STATES:
+                return
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 if __name__ == "__main__":
     import uvicorn
     port = int(os.getenv("PORT", 8000))
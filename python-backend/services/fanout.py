@@ -0,0 +1,103 @@
+"""
+Fan-out - Split large generations into concurrent sub-batches, and run
+independent generations with bounded concurrency
+"""
+
+import asyncio
+import os
+import re
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Sequence, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def batch_size() -> int:
+    return max(1, int(os.getenv("FANOUT_BATCH_SIZE", "5")))
+
+
+def batch_concurrency() -> int:
+    return max(1, int(os.getenv("FANOUT_CONCURRENCY", "6")))
+
+
+async def gather_limited(
+    factories: Sequence[Callable[[], Awaitable[T]]],
+    concurrency: int,
+) -> List[Any]:
+    """
+    Run coroutine factories with at most `concurrency` in flight
+
+    Results are returned in order; a failed task yields its exception
+    instead of cancelling the others.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(factory: Callable[[], Awaitable[T]]):
+        async with semaphore:
+            return await factory()
+
+    return await asyncio.gather(*(run(f) for f in factories), return_exceptions=True)
+
+
+async def as_completed_limited(
+    factories: Sequence[Callable[[], Awaitable[T]]],
+    concurrency: int,
+) -> AsyncIterator[Tuple[int, Any]]:
+    """
+    Run coroutine factories with at most `concurrency` in flight, yielding
+    (index, result) as each one finishes
+
+    A failed task yields its exception as the result. Tasks still pending
+    when the caller stops iterating (or is cancelled) are cancelled.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(index: int, factory: Callable[[], Awaitable[T]]):
+        async with semaphore:
+            try:
+                return index, await factory()
+            except Exception as e:
+                return index, e
+
+    tasks = [asyncio.ensure_future(run(i, f)) for i, f in enumerate(factories)]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+def _tokens(text: str) -> Set[str]:
+    return set(_WORD.findall(text.lower()))
+
+
+def dedupe_near_duplicates(
+    items: List[T],
+    key: Callable[[T], str],
+    threshold: float = 0.8,
+) -> List[T]:
+    """
+    Drop items whose text is a near-duplicate of an earlier item
+
+    Args:
+        items: Items in priority order
+        key: Text to compare for each item
+        threshold: Jaccard word-set similarity at or above which items are duplicates
+
+    Returns:
+        Items with near-duplicates removed, order preserved
+    """
+    kept: List[T] = []
+    seen: List[Set[str]] = []
+    for item in items:
+        words = _tokens(key(item))
+        duplicate = any(
+            words == other or (words and len(words & other) / len(words | other) >= threshold)
+            for other in seen
+        )
+        if not duplicate:
+            kept.append(item)
+            seen.append(words)
+    return kept
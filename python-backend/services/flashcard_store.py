@@ -0,0 +1,231 @@
+"""
+Flashcard Store - Persistent decks with spaced-repetition review state
+
+A deck is generated once and kept; after that a student studies it by
+asking for the cards that are due and rating each review. Both are plain
+SQLite queries, so regular study traffic never calls the model.
+
+Tables (FLASHCARD_DB):
+- decks: one row per generated deck
+- cards: question, answer and FSRS memory state; the (deck_id, due) index
+  answers "cards due now" with an index range scan, oldest first
+- reviews: append-only review log (rating, elapsed days, resulting state),
+  indexed by card only, so logging stays a cheap append at millions of rows
+
+A review updates the card and appends to the log in one transaction.
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from .spaced_repetition import Scheduler
+
+
+def _fingerprint(question: str) -> str:
+    return hashlib.sha1(" ".join(question.lower().split()).encode("utf-8")).hexdigest()
+
+
+class _FlashcardDb:
+    """Blocking SQLite store; called through asyncio.to_thread"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS decks ("
+            " id TEXT PRIMARY KEY,"
+            " topic TEXT NOT NULL,"
+            " created_at REAL NOT NULL);"
+            "CREATE TABLE IF NOT EXISTS cards ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " deck_id TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " answer TEXT NOT NULL,"
+            " due REAL NOT NULL,"
+            " stability REAL,"
+            " difficulty REAL,"
+            " last_review REAL,"
+            " reps INTEGER NOT NULL DEFAULT 0,"
+            " lapses INTEGER NOT NULL DEFAULT 0,"
+            " UNIQUE (deck_id, fingerprint));"
+            "CREATE INDEX IF NOT EXISTS cards_deck_due ON cards (deck_id, due);"
+            "CREATE TABLE IF NOT EXISTS reviews ("
+            " id INTEGER PRIMARY KEY,"
+            " card_id INTEGER NOT NULL,"
+            " rating INTEGER NOT NULL,"
+            " reviewed_at REAL NOT NULL,"
+            " elapsed_days REAL NOT NULL,"
+            " interval_days REAL NOT NULL,"
+            " stability REAL NOT NULL,"
+            " difficulty REAL NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS reviews_card ON reviews (card_id);"
+        )
+        self._conn.commit()
+
+    def create_deck(self, deck_id: str, topic: str, cards: List[Dict[str, str]], now: float) -> None:
+        with self._lock:
+            with self._conn:
+                self._conn.execute("INSERT INTO decks (id, topic, created_at) VALUES (?, ?, ?)", (deck_id, topic, now))
+                # New cards are due at once, in the order they were generated
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO cards (deck_id, fingerprint, question, answer, due) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (deck_id, _fingerprint(card["question"]), card["question"], card["answer"],
+                         now - (len(cards) - i) * 1e-3)
+                        for i, card in enumerate(cards)
+                    ],
+                )
+
+    def get_deck(self, deck_id: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            deck = self._conn.execute("SELECT * FROM decks WHERE id = ?", (deck_id,)).fetchone()
+            if deck is None:
+                return None
+            counts = self._conn.execute(
+                "SELECT COUNT(*) AS cards,"
+                " COALESCE(SUM(due <= ?), 0) AS due,"
+                " COALESCE(SUM(reps = 0), 0) AS new,"
+                " MIN(due) AS next_due"
+                " FROM cards WHERE deck_id = ?",
+                (now, deck_id),
+            ).fetchone()
+        return {**dict(deck), **dict(counts)}
+
+    def cards(self, deck_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM cards WHERE deck_id = ? ORDER BY id", (deck_id,)).fetchall()
+        return [dict(row) for row in rows]
+
+    def due(self, deck_id: str, now: float, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM cards WHERE deck_id = ? AND due <= ? ORDER BY due LIMIT ?",
+                (deck_id, now, limit),
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def review(self, deck_id: str, card_id: int, rating: int, now: float, scheduler: Scheduler) -> Optional[Dict[str, Any]]:
+        """Apply a rating to a card and log it; None if the card is not in the deck"""
+        with self._lock:
+            card = self._conn.execute(
+                "SELECT * FROM cards WHERE id = ? AND deck_id = ?", (card_id, deck_id)
+            ).fetchone()
+            if card is None:
+                return None
+            state = scheduler.review(rating, now, card["stability"], card["difficulty"], card["last_review"])
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE cards SET due = ?, stability = ?, difficulty = ?, last_review = ?,"
+                    " reps = reps + 1, lapses = lapses + ? WHERE id = ?",
+                    (state["due"], state["stability"], state["difficulty"], now,
+                     1 if rating == 1 and card["reps"] else 0, card_id),
+                )
+                self._conn.execute(
+                    "INSERT INTO reviews (card_id, rating, reviewed_at, elapsed_days, interval_days, stability, difficulty)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (card_id, rating, now, state["elapsed_days"], state["interval_days"],
+                     state["stability"], state["difficulty"]),
+                )
+            updated = self._conn.execute("SELECT * FROM cards WHERE id = ?", (card_id,)).fetchone()
+        return {**dict(updated), "interval_days": state["interval_days"]}
+
+    def delete_deck(self, deck_id: str) -> bool:
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "DELETE FROM reviews WHERE card_id IN (SELECT id FROM cards WHERE deck_id = ?)", (deck_id,)
+                )
+                self._conn.execute("DELETE FROM cards WHERE deck_id = ?", (deck_id,))
+                cursor = self._conn.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+        return cursor.rowcount > 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class FlashcardStore:
+    """
+    Flashcard decks studied with spaced repetition.
+
+    - db_path: SQLite file (FLASHCARD_DB, default flashcards.db)
+    - scheduler: FSRS parameters (see services/spaced_repetition.py)
+    - due_limit: most cards returned per due-cards request (FLASHCARD_DUE_LIMIT, default 50)
+    """
+
+    def __init__(self, db_path: Optional[str] = None, scheduler: Optional[Scheduler] = None, due_limit: Optional[int] = None):
+        self.db_path = db_path or os.getenv("FLASHCARD_DB", "flashcards.db")
+        self.scheduler = scheduler or Scheduler()
+        self.due_limit = due_limit or int(os.getenv("FLASHCARD_DUE_LIMIT", "50"))
+        self._db: Optional[_FlashcardDb] = None
+
+        self.decks_created = 0
+        self.reviews = 0
+        self.lapses = 0
+        self.due_requests = 0
+        self.due_cards_served = 0
+
+    async def start(self) -> None:
+        self._db = await asyncio.to_thread(_FlashcardDb, self.db_path)
+
+    async def stop(self) -> None:
+        if self._db is not None:
+            await asyncio.to_thread(self._db.close)
+            self._db = None
+
+    async def create_deck(self, topic: str, cards: List[Dict[str, str]]) -> Dict[str, Any]:
+        """Store generated cards as a new deck; duplicate questions are kept once"""
+        deck_id = uuid.uuid4().hex
+        await asyncio.to_thread(self._db.create_deck, deck_id, topic, cards, time.time())
+        self.decks_created += 1
+        return await self.get_deck(deck_id)
+
+    async def get_deck(self, deck_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._db.get_deck, deck_id, time.time())
+
+    async def cards(self, deck_id: str) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self._db.cards, deck_id)
+
+    async def due(self, deck_id: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Cards due now, longest overdue first"""
+        limit = max(1, min(limit or self.due_limit, self.due_limit))
+        cards = await asyncio.to_thread(self._db.due, deck_id, time.time(), limit)
+        self.due_requests += 1
+        self.due_cards_served += len(cards)
+        return cards
+
+    async def review(self, deck_id: str, card_id: int, rating: int) -> Optional[Dict[str, Any]]:
+        """
+        Record a review rated 1 (again) to 4 (easy) and reschedule the card
+
+        Returns:
+            The updated card with its new interval_days, or None if the
+            card is not in the deck
+        """
+        card = await asyncio.to_thread(self._db.review, deck_id, card_id, rating, time.time(), self.scheduler)
+        if card is not None:
+            self.reviews += 1
+            self.lapses += rating == 1
+        return card
+
+    async def delete_deck(self, deck_id: str) -> bool:
+        return await asyncio.to_thread(self._db.delete_deck, deck_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "decks_created": self.decks_created,
+            "reviews": self.reviews,
+            "lapses": self.lapses,
+            "due_requests": self.due_requests,
+            "due_cards_served": self.due_cards_served,
+        }
@@ -0,0 +1,66 @@
+"""
+Lifecycle - Readiness, liveness and the graceful drain deadline
+
+A server process is live as long as its event loop answers, and ready once
+the lifespan has opened every store and until it starts shutting down.
+Shutdown begins when the server receives SIGTERM/SIGINT (serve.py reports
+it) or, at the latest, when the lifespan shutdown runs. From then on there
+is one drain deadline (SHUTDOWN_DRAIN_SECONDS): uvicorn lets in-flight
+requests finish within it, and the lifespan gives background jobs and
+top-ups whatever is left of it before cancelling them.
+"""
+
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+class Lifecycle:
+    """
+    Process state for the health endpoints and shutdown.
+
+    - drain_seconds: how long in-flight requests and background generations
+      may run after shutdown begins (SHUTDOWN_DRAIN_SECONDS, default 30)
+    """
+
+    def __init__(self, drain_seconds: Optional[float] = None):
+        self.drain_seconds = drain_seconds if drain_seconds is not None else float(
+            os.getenv("SHUTDOWN_DRAIN_SECONDS", "30")
+        )
+        self.started_at = time.monotonic()
+        self.ready = False
+        self._drain_started: Optional[float] = None
+
+    @property
+    def draining(self) -> bool:
+        return self._drain_started is not None
+
+    def mark_ready(self) -> None:
+        """Called at the end of the lifespan startup"""
+        self.ready = True
+
+    def begin_drain(self) -> None:
+        """Stop reporting ready and start the drain deadline (idempotent)"""
+        if self._drain_started is None:
+            self._drain_started = time.monotonic()
+
+    def drain_remaining(self) -> float:
+        """Seconds left before draining work is cancelled"""
+        if self._drain_started is None:
+            return self.drain_seconds
+        return max(0.0, self.drain_seconds - (time.monotonic() - self._drain_started))
+
+    def status(self) -> str:
+        if self.draining:
+            return "draining"
+        return "ready" if self.ready else "starting"
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "ready": int(self.ready and not self.draining),
+            "draining": int(self.draining),
+            "uptime_seconds": round(time.monotonic() - self.started_at, 1),
+        }
+
+
+lifecycle = Lifecycle()
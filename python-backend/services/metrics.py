@@ -0,0 +1,205 @@
+"""
+Metrics - Prometheus instrumentation for the API and upstream LLM calls
+
+Served at GET /metrics:
+  - http_request_duration_seconds{method,route,status}, http_requests_in_flight{route}
+  - llm_request_duration_seconds{agent,model,outcome}, one sample per upstream attempt
+  - llm_time_to_first_token_seconds{agent,model} for streamed calls
+  - llm_tokens_total{agent,model,type} from the usage the model reports
+  - llm_requests_in_flight{agent}
+  - fallback_responses_total{agent,reason}
+  - <component>_<counter> gauges read from the stats() of registered components
+    (response cache, request coalescing, limiter, circuit breakers)
+"""
+
+import re
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.routing import Match
+
+# Upstream LLM calls take seconds, not milliseconds
+LLM_BUCKETS = (0.25, 0.5, 1, 2, 3, 5, 8, 13, 20, 30, 45, 60, 90, 120)
+
+HTTP_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency until the last byte is sent",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120),
+)
+HTTP_IN_FLIGHT = Gauge("http_requests_in_flight", "HTTP requests being served", ["route"])
+
+LLM_LATENCY = Histogram(
+    "llm_request_duration_seconds",
+    "Upstream LLM call latency per attempt",
+    ["agent", "model", "outcome"],
+    buckets=LLM_BUCKETS,
+)
+LLM_TTFT = Histogram(
+    "llm_time_to_first_token_seconds",
+    "Time from starting a streamed LLM call to its first token",
+    ["agent", "model"],
+    buckets=LLM_BUCKETS,
+)
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens reported by the model", ["agent", "model", "type"])
+LLM_IN_FLIGHT = Gauge("llm_requests_in_flight", "Upstream LLM calls in flight", ["agent"])
+
+FALLBACKS = Counter(
+    "fallback_responses_total",
+    "Times an agent filled in placeholder content instead of model output",
+    ["agent", "reason"],
+)
+
+
+def _first_attr(obj: Any, *names: str) -> Optional[int]:
+    for name in names:
+        value = getattr(obj, name, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def record_usage(agent: str, model_name: str, result: Any) -> None:
+    """
+    Count prompt/completion tokens of a finished call
+
+    Accepts a pydantic-ai run result (usage() method) or an OpenAI
+    completion (usage attribute).
+    """
+    usage = getattr(result, "usage", None)
+    if callable(usage):
+        usage = usage()
+    if usage is None:
+        return
+    prompt = _first_attr(usage, "input_tokens", "request_tokens", "prompt_tokens")
+    completion = _first_attr(usage, "output_tokens", "response_tokens", "completion_tokens")
+    if prompt:
+        LLM_TOKENS.labels(agent, model_name, "prompt").inc(prompt)
+    if completion:
+        LLM_TOKENS.labels(agent, model_name, "completion").inc(completion)
+
+
+def record_fallback(agent: str, reason: str, count: int = 1) -> None:
+    FALLBACKS.labels(agent, reason).inc(count)
+
+
+@contextmanager
+def observe_llm_call(agent: str, model_name: str) -> Iterator[None]:
+    """Time one upstream attempt and track it as in flight"""
+    in_flight = LLM_IN_FLIGHT.labels(agent)
+    in_flight.inc()
+    start = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "success"
+    finally:
+        in_flight.dec()
+        LLM_LATENCY.labels(agent, model_name, outcome).observe(time.perf_counter() - start)
+
+
+class StreamObserver:
+    """Tracks time to first token and usage of one streamed call"""
+
+    def __init__(self, agent: str, model_name: str):
+        self.agent = agent
+        self.model_name = model_name
+        self.started = time.perf_counter()
+        self.first_token_at: Optional[float] = None
+
+    def first_token(self) -> None:
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+            LLM_TTFT.labels(self.agent, self.model_name).observe(self.first_token_at - self.started)
+
+    def finish(self, result: Any) -> None:
+        record_usage(self.agent, self.model_name, result)
+
+
+@contextmanager
+def observe_stream(agent: str, model_name: str) -> Iterator[StreamObserver]:
+    """observe_llm_call for a streamed call, adding time to first token and usage"""
+    with observe_llm_call(agent, model_name):
+        yield StreamObserver(agent, model_name)
+
+
+class StatsCollector:
+    """Exposes the numeric values of stats() dictionaries as gauges"""
+
+    def __init__(self):
+        self._sources: Dict[str, Tuple[Callable[[], Dict[str, Any]], str]] = {}
+
+    def register(self, component: str, stats: Callable[[], Dict[str, Any]], label: str = "name") -> None:
+        """Export stats(); nested per-item dictionaries get their key as `label`"""
+        self._sources[component] = (stats, label)
+
+    def collect(self):
+        for component, (stats, label) in self._sources.items():
+            families: Dict[str, GaugeMetricFamily] = {}
+            for key, value, labels in self._flatten(stats(), label):
+                name = re.sub(r"[^a-zA-Z0-9_]", "_", f"{component}_{key}")
+                if name not in families:
+                    families[name] = GaugeMetricFamily(name, f"{component} {key}", labels=list(labels))
+                families[name].add_metric(list(labels.values()), float(value))
+            yield from families.values()
+
+    @staticmethod
+    def _flatten(stats: Dict[str, Any], label: str):
+        for key, value in stats.items():
+            if isinstance(value, dict):
+                # Per-item stats, e.g. circuit breakers keyed by model
+                for inner_key, inner_value in value.items():
+                    if isinstance(inner_value, (int, float)):
+                        yield inner_key, inner_value, {label: key}
+            elif isinstance(value, (int, float)):
+                yield key, value, {}
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def route_template(scope) -> str:
+    """The matched route path (e.g. /api/quiz), so labels stay low-cardinality"""
+    for route in scope["app"].router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "unmatched")
+    return "unmatched"
+
+
+class MetricsMiddleware:
+    """ASGI middleware timing each request until its response is fully sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        route = route_template(scope)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(route)
+        in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight.dec()
+            HTTP_LATENCY.labels(scope["method"], route, str(status)).observe(time.perf_counter() - start)
+
+
+def render_metrics() -> bytes:
+    return generate_latest(REGISTRY)
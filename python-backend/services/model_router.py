@@ -0,0 +1,200 @@
+"""
+Model Router - Hedged requests and failover across an ordered model list
+
+The router tracks latency and errors per model and keeps the list ordered
+by observed health. A call goes to the best model first; if it has not
+finished within that model's p95 latency (or fails), the same call is sent
+to the next model and whichever succeeds first wins.
+"""
+
+import asyncio
+import os
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .limiter import AdmissionRejected
+from .resilience import CircuitOpenError, get_breaker
+
+# Minimum samples before a model's statistics are trusted for ordering/hedging
+MIN_SAMPLES = 20
+
+
+def models_for(agent_prefix: str, default: str) -> List[str]:
+    """
+    Ordered model list for an agent
+
+    Reads <PREFIX>_MODELS, then AI_MODELS (comma-separated), then falls
+    back to a single default model.
+    """
+    raw = os.getenv(f"{agent_prefix}_MODELS") or os.getenv("AI_MODELS") or default
+    models = [m.strip() for m in raw.split(",") if m.strip()]
+    return models or [default]
+
+
+class ModelStats:
+    """Rolling latency window and exponentially weighted error rate"""
+
+    def __init__(self, window: int = 200):
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.error_rate = 0.0
+        self.successes = 0
+        self.errors = 0
+        self.hedges_won = 0
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.successes += 1
+        self.error_rate *= 0.9
+
+    def record_error(self) -> None:
+        self.errors += 1
+        self.error_rate = self.error_rate * 0.9 + 0.1
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < MIN_SAMPLES:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[int(0.95 * (len(ordered) - 1))]
+
+    def to_dict(self) -> Dict[str, Any]:
+        p95 = self.p95()
+        return {
+            "successes": self.successes,
+            "errors": self.errors,
+            "error_rate": round(self.error_rate, 4),
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+            "hedges_won": self.hedges_won,
+        }
+
+
+class ModelRouter:
+    """
+    Routes one logical call across an ordered list of models.
+
+    - hedge_delay: seconds to wait before hedging when a model has too few
+      samples for a p95 (HEDGE_DELAY, default 10)
+    - the delay is clamped to [HEDGE_MIN_DELAY, HEDGE_MAX_DELAY]
+    """
+
+    def __init__(self, models: List[str]):
+        self.models = list(models)
+        self.stats: Dict[str, ModelStats] = {m: ModelStats() for m in self.models}
+        self.hedge_delay = float(os.getenv("HEDGE_DELAY", "10"))
+        self.min_delay = float(os.getenv("HEDGE_MIN_DELAY", "1"))
+        self.max_delay = float(os.getenv("HEDGE_MAX_DELAY", "30"))
+        self.hedged = 0
+
+    @property
+    def primary(self) -> str:
+        """The configured first-choice model"""
+        return self.models[0]
+
+    def ordered(self) -> List[str]:
+        """Models by current health: open circuits last, then error rate, then p95"""
+        def score(item):
+            index, name = item
+            stats = self.stats[name]
+            p95 = stats.p95()
+            return (
+                get_breaker(name).state == "open",
+                round(stats.error_rate, 1),
+                p95 if p95 is not None else float("inf"),
+                index,
+            )
+
+        # Until there is data, keep the configured order
+        if all(self.stats[m].p95() is None and self.stats[m].errors == 0 for m in self.models):
+            return list(self.models)
+        return [name for _, name in sorted(enumerate(self.models), key=score)]
+
+    def _delay_for(self, model: str) -> float:
+        p95 = self.stats[model].p95()
+        delay = p95 if p95 is not None else self.hedge_delay
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    async def _timed(self, model: str, fn: Callable[[str], Awaitable[Any]]) -> Any:
+        start = time.perf_counter()
+        try:
+            result = await fn(model)
+        except asyncio.CancelledError:
+            raise
+        except AdmissionRejected as exc:
+            # Local load shedding says nothing about the model; an open circuit does
+            if isinstance(exc, CircuitOpenError):
+                self.stats[model].record_error()
+            raise
+        except Exception:
+            self.stats[model].record_error()
+            raise
+        self.stats[model].record_success(time.perf_counter() - start)
+        return result
+
+    async def run(self, fn: Callable[[str], Awaitable[Any]]) -> Any:
+        """
+        Run fn(model_name) with hedging and failover
+
+        Args:
+            fn: Coroutine factory performing the call against a given model
+
+        Returns:
+            The first successful result; if every model fails, the first error
+        """
+        candidates = self.ordered()
+        if len(candidates) == 1:
+            return await self._timed(candidates[0], fn)
+
+        pending: Dict[asyncio.Task, Tuple[str, float]] = {}
+        errors: List[BaseException] = []
+        next_index = 0
+
+        def launch() -> None:
+            nonlocal next_index
+            model = candidates[next_index]
+            next_index += 1
+            pending[asyncio.ensure_future(self._timed(model, fn))] = (model, time.perf_counter())
+
+        launch()
+        try:
+            while pending:
+                current = candidates[next_index - 1]
+                can_hedge = next_index < len(candidates)
+                done, _ = await asyncio.wait(
+                    pending,
+                    timeout=self._delay_for(current) if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+
+                if not done:
+                    # Slow: hedge with the next model, keep the first one running
+                    self.hedged += 1
+                    launch()
+                    continue
+
+                for task in done:
+                    model, _ = pending.pop(task)
+                    if task.exception() is None:
+                        if model != candidates[0]:
+                            self.stats[model].hedges_won += 1
+                        # The losers took at least this long; keep that in their window
+                        now = time.perf_counter()
+                        for loser, started in pending.values():
+                            self.stats[loser].latencies.append(now - started)
+                        return task.result()
+                    errors.append(task.exception())
+
+                # A failure: fail over to the next model if nothing else is running
+                if not pending and next_index < len(candidates):
+                    launch()
+
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "models": self.ordered(),
+            "hedged": self.hedged,
+            "stats": {name: stats.to_dict() for name, stats in self.stats.items()},
+        }
@@ -0,0 +1,324 @@
+"""
+Question Bank - Persistent pool of validated quiz questions
+
+Generated questions are validated, deduplicated and filed under
+(subject, topic, difficulty). A request for a bucket that already holds
+enough questions is answered by sampling it, without an upstream call.
+Buckets that are requested repeatedly are topped up in the background
+once they drop below a low-water mark.
+
+The bank lives in SQLite (QUESTION_BANK_DB) and is loaded into memory on
+start, so sampling never touches the disk.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .limiter import AdmissionRejected
+
+logger = logging.getLogger(__name__)
+
+REQUIRED_FIELDS = ("question", "options", "correct_answer", "explanation")
+
+Bucket = Tuple[str, str, str]
+
+# Generates roughly `count` new questions for a bucket
+Refill = Callable[[int], Awaitable[List[Dict[str, Any]]]]
+
+
+def _normalize(text: str) -> str:
+    return " ".join(str(text).lower().split())
+
+
+def bucket_key(subject: Optional[str], topic: str, difficulty: str) -> Bucket:
+    """Normalized (subject, topic, difficulty) so trivially different requests share a bucket"""
+    return _normalize(subject or ""), _normalize(topic), _normalize(difficulty)
+
+
+def validate_question(q: Any) -> Optional[Dict[str, Any]]:
+    """
+    Check a generated question before it is banked
+
+    A question needs every field as non-empty text, exactly 4 distinct
+    options, and a correct_answer that is one of the options.
+
+    Returns:
+        A clean copy with only the required fields, or None if invalid
+    """
+    if not isinstance(q, dict) or not all(k in q for k in REQUIRED_FIELDS):
+        return None
+    options = q["options"]
+    if not isinstance(options, list) or len(options) != 4:
+        return None
+    if not all(isinstance(o, str) and o.strip() for o in options):
+        return None
+    if len({_normalize(o) for o in options}) != 4:
+        return None
+    text_fields = (q["question"], q["correct_answer"], q["explanation"])
+    if not all(isinstance(v, str) and v.strip() for v in text_fields):
+        return None
+    if q["correct_answer"] not in options:
+        return None
+    return {k: q[k] for k in REQUIRED_FIELDS}
+
+
+def _fingerprint(question: str) -> str:
+    return hashlib.sha1(_normalize(question).encode("utf-8")).hexdigest()
+
+
+def _words(q: Dict[str, Any]) -> FrozenSet[str]:
+    """Words of the question and its options; the same stem with different answers is a different question"""
+    return frozenset(_normalize(" ".join([q["question"], *q["options"]])).split())
+
+
+class _BankStore:
+    """Blocking SQLite store; called through asyncio.to_thread"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS questions ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " subject TEXT NOT NULL,"
+            " topic TEXT NOT NULL,"
+            " difficulty TEXT NOT NULL,"
+            " fingerprint TEXT NOT NULL,"
+            " question TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " UNIQUE (subject, topic, difficulty, fingerprint))"
+        )
+        self._conn.commit()
+
+    def load(self) -> List[Tuple[Bucket, Dict[str, Any]]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT subject, topic, difficulty, question FROM questions ORDER BY id"
+            ).fetchall()
+        return [((row[0], row[1], row[2]), json.loads(row[3])) for row in rows]
+
+    def insert(self, bucket: Bucket, questions: List[Tuple[str, Dict[str, Any]]]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO questions (subject, topic, difficulty, fingerprint, question, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                [(*bucket, fingerprint, json.dumps(q), now) for fingerprint, q in questions],
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class QuestionBank:
+    """
+    Validated, deduplicated quiz questions indexed by subject/topic/difficulty.
+
+    - low_water: a bucket below this many questions is topped up
+      (QUESTION_BANK_LOW_WATER, default 20)
+    - top_up_size: questions requested per top-up call (QUESTION_BANK_TOP_UP, default 10)
+    - top_up_after: requests a bucket must see before it is topped up, so
+      one-off topics do not trigger background generation
+      (QUESTION_BANK_TOP_UP_AFTER, default 2)
+    - max_per_bucket: questions kept per bucket (QUESTION_BANK_MAX_PER_BUCKET, default 200)
+    - top_up_concurrency: top-ups running at once (QUESTION_BANK_TOP_UP_CONCURRENCY, default 1)
+    - db_path: SQLite file (QUESTION_BANK_DB, default question_bank.db)
+
+    Questions whose wording (question and options) overlaps an existing
+    question of the bucket by at least duplicate_threshold (Jaccard
+    similarity of their word sets) are dropped as duplicates.
+    """
+
+    def __init__(
+        self,
+        low_water: Optional[int] = None,
+        top_up_size: Optional[int] = None,
+        top_up_after: Optional[int] = None,
+        max_per_bucket: Optional[int] = None,
+        top_up_concurrency: Optional[int] = None,
+        db_path: Optional[str] = None,
+        duplicate_threshold: float = 0.8,
+        max_top_up_rounds: int = 3,
+    ):
+        self.low_water = low_water or int(os.getenv("QUESTION_BANK_LOW_WATER", "20"))
+        self.top_up_size = top_up_size or int(os.getenv("QUESTION_BANK_TOP_UP", "10"))
+        self.top_up_after = top_up_after or int(os.getenv("QUESTION_BANK_TOP_UP_AFTER", "2"))
+        self.max_per_bucket = max_per_bucket or int(os.getenv("QUESTION_BANK_MAX_PER_BUCKET", "200"))
+        self.top_up_concurrency = top_up_concurrency or int(os.getenv("QUESTION_BANK_TOP_UP_CONCURRENCY", "1"))
+        self.db_path = db_path or os.getenv("QUESTION_BANK_DB", "question_bank.db")
+        self.duplicate_threshold = duplicate_threshold
+        self.max_top_up_rounds = max_top_up_rounds
+
+        self._store: Optional[_BankStore] = None
+        self._questions: Dict[Bucket, List[Dict[str, Any]]] = {}
+        self._words: Dict[Bucket, List[FrozenSet[str]]] = {}
+        self._fingerprints: Dict[Bucket, Set[str]] = {}
+        self._demand: Dict[Bucket, int] = {}
+        self._top_ups: Dict[Bucket, asyncio.Task] = {}
+        self._top_up_slots: Optional[asyncio.Semaphore] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.added = 0
+        self.rejected_invalid = 0
+        self.rejected_duplicate = 0
+        self.top_ups = 0
+        self.top_up_failures = 0
+
+    async def start(self) -> None:
+        """Open the store and load every banked question into memory"""
+        self._store = await asyncio.to_thread(_BankStore, self.db_path)
+        self._top_up_slots = asyncio.Semaphore(self.top_up_concurrency)
+        for bucket, q in await asyncio.to_thread(self._store.load):
+            self._remember(bucket, _fingerprint(q["question"]), q)
+        logger.info(f"Question bank loaded {self.size_total()} questions in {len(self._questions)} buckets")
+
+    async def stop(self, timeout: float = 0) -> None:
+        """Give running top-ups up to timeout seconds, cancel the rest and close the store"""
+        tasks = list(self._top_ups.values())
+        if tasks and timeout > 0:
+            await asyncio.wait(tasks, timeout=timeout)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._top_ups = {}
+        if self._store is not None:
+            await asyncio.to_thread(self._store.close)
+            self._store = None
+
+    def _remember(self, bucket: Bucket, fingerprint: str, q: Dict[str, Any]) -> None:
+        self._questions.setdefault(bucket, []).append(q)
+        self._words.setdefault(bucket, []).append(_words(q))
+        self._fingerprints.setdefault(bucket, set()).add(fingerprint)
+
+    def _is_duplicate(self, bucket: Bucket, fingerprint: str, words: FrozenSet[str]) -> bool:
+        if fingerprint in self._fingerprints.get(bucket, ()):
+            return True
+        for other in self._words.get(bucket, ()):
+            if words and len(words & other) / len(words | other) >= self.duplicate_threshold:
+                return True
+        return False
+
+    def size(self, subject: Optional[str], topic: str, difficulty: str) -> int:
+        return len(self._questions.get(bucket_key(subject, topic, difficulty), ()))
+
+    def size_total(self) -> int:
+        return sum(len(questions) for questions in self._questions.values())
+
+    def sample(self, subject: Optional[str], topic: str, difficulty: str, count: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Draw count distinct questions from a bucket
+
+        Returns:
+            Copies of the sampled questions, or None if the bucket holds
+            fewer than count questions (the caller generates live instead)
+        """
+        bucket = bucket_key(subject, topic, difficulty)
+        if len(self._demand) >= 10000 and bucket not in self._demand:
+            # Demand only steers top-ups; forget it rather than grow without bound
+            self._demand.clear()
+        self._demand[bucket] = self._demand.get(bucket, 0) + 1
+        questions = self._questions.get(bucket, [])
+        if self._store is None or count <= 0 or len(questions) < count:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [dict(q, options=list(q["options"])) for q in random.sample(questions, count)]
+
+    async def add(self, subject: Optional[str], topic: str, difficulty: str, questions: List[Dict[str, Any]]) -> int:
+        """
+        Bank generated questions; invalid and duplicate questions are skipped
+
+        Returns:
+            Number of questions added
+        """
+        if self._store is None:
+            return 0
+        bucket = bucket_key(subject, topic, difficulty)
+        fresh: List[Tuple[str, Dict[str, Any]]] = []
+        # Check and remember without awaiting, so concurrent adds see each other
+        for raw in questions:
+            if len(self._questions.get(bucket, ())) >= self.max_per_bucket:
+                break
+            q = validate_question(raw)
+            if q is None:
+                self.rejected_invalid += 1
+                continue
+            fingerprint = _fingerprint(q["question"])
+            if self._is_duplicate(bucket, fingerprint, _words(q)):
+                self.rejected_duplicate += 1
+                continue
+            self._remember(bucket, fingerprint, q)
+            fresh.append((fingerprint, q))
+
+        if fresh:
+            self.added += len(fresh)
+            try:
+                await asyncio.to_thread(self._store.insert, bucket, fresh)
+            except Exception as e:
+                # Still served from memory; only persistence is lost
+                logger.error(f"Could not persist {len(fresh)} banked questions: {str(e)}")
+        return len(fresh)
+
+    def ensure_stock(self, subject: Optional[str], topic: str, difficulty: str, refill: Refill) -> None:
+        """
+        Start a background top-up if the bucket is in demand and running low
+
+        Returns at once; at most one top-up runs per bucket.
+        """
+        bucket = bucket_key(subject, topic, difficulty)
+        if (
+            self._store is None
+            or bucket in self._top_ups
+            or self._demand.get(bucket, 0) < self.top_up_after
+            or len(self._questions.get(bucket, ())) >= self.low_water
+        ):
+            return
+        task = asyncio.create_task(self._top_up(bucket, subject, topic, difficulty, refill))
+        self._top_ups[bucket] = task
+        task.add_done_callback(lambda _: self._top_ups.pop(bucket, None))
+
+    async def _top_up(self, bucket: Bucket, subject: Optional[str], topic: str, difficulty: str, refill: Refill) -> None:
+        async with self._top_up_slots:
+            for _ in range(self.max_top_up_rounds):
+                if len(self._questions.get(bucket, ())) >= self.low_water:
+                    return
+                self.top_ups += 1
+                try:
+                    added = await self.add(subject, topic, difficulty, await refill(self.top_up_size))
+                except AdmissionRejected:
+                    # Upstream is saturated; live requests come first, the next one retries
+                    return
+                except Exception as e:
+                    self.top_up_failures += 1
+                    logger.error(f"Question bank top-up for {bucket} failed: {str(e)}")
+                    return
+                if added == 0:
+                    # The model keeps repeating itself for this bucket
+                    return
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "buckets": len(self._questions),
+            "questions": self.size_total(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "added": self.added,
+            "rejected_invalid": self.rejected_invalid,
+            "rejected_duplicate": self.rejected_duplicate,
+            "top_ups": self.top_ups,
+            "top_ups_running": len(self._top_ups),
+            "top_up_failures": self.top_up_failures,
+        }
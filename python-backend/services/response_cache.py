@@ -0,0 +1,198 @@
+"""
+Response Cache - Content-addressed cache for agent outputs
+
+Two tiers:
+- an in-memory LRU with TTL (always on)
+- an optional SQLite tier that survives restarts (RESPONSE_CACHE_DB)
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+def normalize_value(value: Any) -> Any:
+    """Normalize request values so trivially different requests share a key"""
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v) for v in value]
+    return value
+
+
+def make_cache_key(kind: str, model_name: str, prompt_version: str, **params: Any) -> str:
+    """
+    Build a content-addressed key for a request
+
+    Args:
+        kind: Request kind (quiz, flashcards, explain, ...)
+        model_name: Model that produces the response
+        prompt_version: Version of the agent prompt
+        **params: Request parameters (topic, difficulty, count, ...)
+
+    Returns:
+        Hex SHA-256 digest of the normalized request
+    """
+    payload = {
+        "kind": kind,
+        "model": model_name,
+        "prompt_version": prompt_version,
+        "params": {k: normalize_value(v) for k, v in params.items()},
+    }
+    raw = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _SQLiteTier:
+    """Blocking SQLite store; called through asyncio.to_thread"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS response_cache ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " cost_seconds REAL NOT NULL DEFAULT 0)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at, cost_seconds FROM response_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            if row[1] <= time.time():
+                self._conn.execute("DELETE FROM response_cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+        return json.loads(row[0]), row[1], row[2]
+
+    def set(self, key: str, value: Any, expires_at: float, cost_seconds: float) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO response_cache (key, value, expires_at, cost_seconds) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, cost_seconds),
+            )
+            self._conn.commit()
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache for generated responses, with an optional SQLite tier.
+
+    Entries remember how long the original generation took, so hits can be
+    reported as LLM seconds saved.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        db_path: Optional[str] = None,
+    ):
+        self.max_entries = max_entries or int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+        self.ttl_seconds = ttl_seconds or float(os.getenv("RESPONSE_CACHE_TTL", "86400"))
+        db_path = db_path or os.getenv("RESPONSE_CACHE_DB")
+
+        # key -> (value, expires_at, cost_seconds)
+        self._entries: "OrderedDict[str, Tuple[Any, float, float]]" = OrderedDict()
+        self._disk = _SQLiteTier(db_path) if db_path else None
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.saved_seconds = 0.0
+
+    def _remember(self, key: str, entry: Tuple[Any, float, float]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Look up a key in memory, then on disk; None on miss"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > time.time():
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                self.saved_seconds += entry[2]
+                return entry[0]
+            del self._entries[key]
+
+        if self._disk is not None:
+            entry = await asyncio.to_thread(self._disk.get, key)
+            if entry is not None:
+                self._remember(key, entry)
+                self.disk_hits += 1
+                self.saved_seconds += entry[2]
+                return entry[0]
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: Any, cost_seconds: float = 0.0) -> None:
+        """Store a value in both tiers"""
+        entry = (value, time.time() + self.ttl_seconds, cost_seconds)
+        self._remember(key, entry)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, *entry)
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Any]],
+        should_store: Callable[[Any], bool] = lambda value: True,
+    ) -> Any:
+        """
+        Return the cached value for key, or compute and store it
+
+        Args:
+            key: Cache key from make_cache_key
+            compute: Coroutine factory that produces the value on a miss
+            should_store: Predicate deciding whether a computed value is cacheable
+
+        Returns:
+            The cached or freshly computed value
+        """
+        cached = await self.get(key)
+        if cached is not None:
+            return cached
+
+        start = time.perf_counter()
+        value = await compute()
+        if should_store(value):
+            await self.set(key, value, time.perf_counter() - start)
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and estimated LLM time saved"""
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "disk_enabled": self._disk is not None,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "llm_seconds_saved": round(self.saved_seconds, 3),
+        }
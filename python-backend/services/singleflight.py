@@ -0,0 +1,53 @@
+"""
+Single-flight - Coalesce concurrent identical generations into one call
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict
+
+
+class SingleFlight:
+    """
+    Concurrent calls with the same key share one execution.
+
+    The first caller (the leader) starts the work as a task; callers that
+    arrive while it is running await the same task. The task is shielded,
+    so a disconnecting client does not cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.calls = 0
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run fn for key, or join the in-flight run for the same key
+
+        Args:
+            key: Identity of the request (e.g. a response cache key)
+            fn: Coroutine factory doing the actual work
+
+        Returns:
+            The shared result; exceptions propagate to every caller
+        """
+        self.calls += 1
+        task = self._inflight.get(key)
+        if task is None:
+            self.executions += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters for coalesced calls"""
+        return {
+            "calls": self.calls,
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+        }
@@ -0,0 +1,131 @@
+"""
+Spaced Repetition - FSRS scheduling of flashcard reviews
+
+Each card carries a memory state: stability (days until recall
+probability drops to 90%) and difficulty (1-10). A review rated
+1 (again), 2 (hard), 3 (good) or 4 (easy) updates both with the FSRS-4.5
+formulas and default parameters, and the next review is set for when the
+predicted recall probability reaches the desired retention. Forgotten
+cards (rated again) come back after a short relearning delay.
+
+Pure functions only; services/flashcard_store.py persists the state.
+"""
+
+import math
+import os
+from typing import Dict, Optional, Sequence
+
+AGAIN, HARD, GOOD, EASY = 1, 2, 3, 4
+RATINGS = (AGAIN, HARD, GOOD, EASY)
+
+# FSRS-4.5 default parameters
+DEFAULT_WEIGHTS = (
+    0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+    0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+)
+
+DECAY = -0.5
+FACTOR = 0.9 ** (1 / DECAY) - 1  # 19/81: retrievability is 0.9 after `stability` days
+
+DAY = 86400.0
+
+
+def _clamp_difficulty(value: float) -> float:
+    return min(10.0, max(1.0, value))
+
+
+def retrievability(elapsed_days: float, stability: float) -> float:
+    """Predicted probability of recalling a card elapsed_days after its last review"""
+    return (1 + FACTOR * max(0.0, elapsed_days) / stability) ** DECAY
+
+
+class Scheduler:
+    """
+    FSRS scheduler
+
+    - retention: recall probability at which a card is due (FLASHCARD_RETENTION, default 0.9)
+    - max_interval_days: longest interval between reviews (FLASHCARD_MAX_INTERVAL_DAYS, default 3650)
+    - relearn_minutes: delay before a forgotten card is shown again
+      (FLASHCARD_RELEARN_MINUTES, default 10)
+    """
+
+    def __init__(
+        self,
+        retention: Optional[float] = None,
+        max_interval_days: Optional[float] = None,
+        relearn_minutes: Optional[float] = None,
+        weights: Sequence[float] = DEFAULT_WEIGHTS,
+    ):
+        self.retention = retention or float(os.getenv("FLASHCARD_RETENTION", "0.9"))
+        self.max_interval_days = max_interval_days or float(os.getenv("FLASHCARD_MAX_INTERVAL_DAYS", "3650"))
+        self.relearn_minutes = relearn_minutes or float(os.getenv("FLASHCARD_RELEARN_MINUTES", "10"))
+        self.w = tuple(weights)
+
+    def initial_difficulty(self, rating: int) -> float:
+        return _clamp_difficulty(self.w[4] - (rating - 3) * self.w[5])
+
+    def interval_days(self, stability: float) -> float:
+        """Days until recall probability falls to the desired retention"""
+        interval = stability / FACTOR * (self.retention ** (1 / DECAY) - 1)
+        return min(self.max_interval_days, max(1.0, round(interval)))
+
+    def review(
+        self,
+        rating: int,
+        now: float,
+        stability: Optional[float] = None,
+        difficulty: Optional[float] = None,
+        last_review: Optional[float] = None,
+    ) -> Dict[str, float]:
+        """
+        Memory state after a review
+
+        Args:
+            rating: 1 (again) to 4 (easy)
+            now: Review time (unix seconds)
+            stability / difficulty / last_review: Current state; None for a new card
+
+        Returns:
+            {"stability", "difficulty", "elapsed_days", "interval_days", "due"}
+        """
+        if rating not in RATINGS:
+            raise ValueError(f"rating must be one of {RATINGS}")
+        w = self.w
+
+        if stability is None or difficulty is None or last_review is None:
+            elapsed = 0.0
+            new_stability = w[rating - 1]
+            new_difficulty = self.initial_difficulty(rating)
+        else:
+            elapsed = max(0.0, (now - last_review) / DAY)
+            r = retrievability(elapsed, stability)
+            new_difficulty = difficulty - w[6] * (rating - 3)
+            # Mean reversion towards the initial difficulty of a "good" rating, w[4] (FSRS-4.5)
+            new_difficulty = _clamp_difficulty(w[7] * w[4] + (1 - w[7]) * new_difficulty)
+            if rating == AGAIN:
+                new_stability = (
+                    w[11] * difficulty ** -w[12] * ((stability + 1) ** w[13] - 1) * math.exp(w[14] * (1 - r))
+                )
+                new_stability = min(new_stability, stability)
+            else:
+                growth = (
+                    math.exp(w[8]) * (11 - difficulty) * stability ** -w[9] * (math.exp(w[10] * (1 - r)) - 1)
+                )
+                if rating == HARD:
+                    growth *= w[15]
+                elif rating == EASY:
+                    growth *= w[16]
+                new_stability = stability * (1 + growth)
+
+        new_stability = max(0.01, new_stability)
+        if rating == AGAIN:
+            interval = self.relearn_minutes / 1440
+        else:
+            interval = self.interval_days(new_stability)
+        return {
+            "stability": new_stability,
+            "difficulty": new_difficulty,
+            "elapsed_days": elapsed,
+            "interval_days": interval,
+            "due": now + interval * DAY,
+        }
@@ -0,0 +1,206 @@
+"""
+Study Plan - Deterministic study schedule allocation
+
+Splitting hours across topics and days is a small constrained allocation
+problem, so it is solved locally in well under a millisecond instead of
+asking the model for the whole timetable:
+
+- Each topic's share of study time follows its weight, scaled by its
+  difficulty (hard topics get more time). The next block always goes to the
+  topic furthest behind its share, so topics stay proportional day by day.
+- Blocks are interleaved: the same topic does not run twice in a row when
+  another one is available, and no block is longer than the maximum length.
+- A topic studied on day d gets short review blocks on the days after it
+  (d + 1, d + 3, d + 7 by default) unless it is studied again that day.
+  Reviews open the day and take at most a set share of it.
+
+plan_schedule() returns blocks without focus_area text; the schedule agent
+fills that in from a cached, per-topic outline.
+"""
+
+import os
+from typing import Dict, List, Optional, Sequence, Set
+
+# Difficulty -> time multiplier
+DIFFICULTY_FACTORS = {"easy": 0.75, "medium": 1.0, "hard": 1.35}
+
+
+def _intervals(spec: str) -> List[int]:
+    return sorted({int(value) for value in spec.split(",") if value.strip() and int(value) > 0})
+
+
+class PlanSettings:
+    """
+    Scheduling constraints
+
+    - max_block_minutes: longest single block, rounded down to whole slots
+      (SCHEDULE_MAX_BLOCK_MINUTES, default 50)
+    - min_block_minutes: shorter leftovers are merged into the previous block
+      when it has room (SCHEDULE_MIN_BLOCK_MINUTES, default 15)
+    - slot_minutes: durations are multiples of this (SCHEDULE_SLOT_MINUTES, default 5)
+    - review_minutes: length of one review block (SCHEDULE_REVIEW_MINUTES, default 15)
+    - review_share: most of a day spent on reviews (SCHEDULE_REVIEW_SHARE, default 0.25)
+    - review_intervals: days after a study session that it is reviewed
+      (SCHEDULE_REVIEW_INTERVALS, default "1,3,7"; empty disables reviews)
+    """
+
+    def __init__(
+        self,
+        max_block_minutes: Optional[int] = None,
+        min_block_minutes: Optional[int] = None,
+        slot_minutes: Optional[int] = None,
+        review_minutes: Optional[int] = None,
+        review_share: Optional[float] = None,
+        review_intervals: Optional[Sequence[int]] = None,
+    ):
+        self.slot_minutes = max(1, slot_minutes or int(os.getenv("SCHEDULE_SLOT_MINUTES", "5")))
+        max_block_minutes = max_block_minutes or int(os.getenv("SCHEDULE_MAX_BLOCK_MINUTES", "50"))
+        self.max_block_minutes = max(self.slot_minutes, max_block_minutes // self.slot_minutes * self.slot_minutes)
+        self.min_block_minutes = min_block_minutes or int(os.getenv("SCHEDULE_MIN_BLOCK_MINUTES", "15"))
+        self.review_minutes = review_minutes or int(os.getenv("SCHEDULE_REVIEW_MINUTES", "15"))
+        self.review_share = review_share if review_share is not None else float(os.getenv("SCHEDULE_REVIEW_SHARE", "0.25"))
+        self.review_intervals = (
+            sorted(set(review_intervals)) if review_intervals is not None
+            else _intervals(os.getenv("SCHEDULE_REVIEW_INTERVALS", "1,3,7"))
+        )
+
+
+def topic_weights(
+    topics: List[str],
+    weights: Optional[Dict[str, float]] = None,
+    difficulty: Optional[Dict[str, str]] = None,
+) -> Dict[str, float]:
+    """Relative study time per topic: weight (default 1) times the difficulty factor"""
+    weights = weights or {}
+    difficulty = difficulty or {}
+    result = {}
+    for topic in topics:
+        factor = DIFFICULTY_FACTORS.get(str(difficulty.get(topic, "medium")).lower(), 1.0)
+        result[topic] = max(0.0, float(weights.get(topic, 1.0))) * factor
+    if not any(result.values()):
+        result = {topic: 1.0 for topic in topics}
+    return result
+
+
+def plan_schedule(
+    topics: List[str],
+    hours_per_day: float,
+    days: int,
+    weights: Optional[Dict[str, float]] = None,
+    difficulty: Optional[Dict[str, str]] = None,
+    settings: Optional[PlanSettings] = None,
+) -> List[Dict]:
+    """
+    Allocate study and review blocks across days
+
+    Args:
+        topics: Topics to study (duplicates are ignored)
+        hours_per_day: Hours available each day
+        days: Number of days
+        weights: Optional relative weight per topic (default 1)
+        difficulty: Optional "easy" / "medium" / "hard" per topic
+
+    Returns:
+        Blocks in order: {"day", "topic", "duration", "kind": "study" | "review",
+        "session": study session number of the topic (for reviews, the last one)}
+    """
+    settings = settings or PlanSettings()
+    topics = list(dict.fromkeys(t for t in topics if t))
+    slot = settings.slot_minutes
+    day_minutes = int(hours_per_day * 60) // slot * slot
+    if not topics or days <= 0 or day_minutes <= 0:
+        return []
+
+    shares = topic_weights(topics, weights, difficulty)
+    total_weight = sum(shares.values())
+    shares = {topic: weight / total_weight for topic, weight in shares.items()}
+    studied = {topic: 0 for topic in topics}       # study minutes so far
+    sessions = {topic: 0 for topic in topics}
+    reviews_due: Dict[int, Set[str]] = {}
+    review_cap = int(day_minutes * settings.review_share) // slot * slot
+    review_length = max(slot, min(settings.review_minutes, review_cap) // slot * slot)
+
+    last_studied: Dict[str, int] = {}
+    blocks: List[Dict] = []
+    for day in range(1, days + 1):
+        due_today = reviews_due.pop(day, set())
+        due = [topic for topic in topics if topic in due_today]
+        snapshot = dict(studied), dict(sessions)
+        study = _study_blocks(day, day_minutes, topics, shares, studied, sessions, settings)
+        # Topics studied today anyway need no review
+        due = [topic for topic in due if topic not in {block["topic"] for block in study}]
+        review_budget = min(review_cap, len(due) * review_length)
+        if review_budget:
+            # Make room for the reviews and plan the day's study time again
+            studied.update(snapshot[0])
+            sessions.update(snapshot[1])
+            study = _study_blocks(day, day_minutes - review_budget, topics, shares, studied, sessions, settings)
+            studied_today = {block["topic"] for block in study}
+            due = [topic for topic in due if topic not in studied_today]
+
+        reviews = []
+        # Longest since last studied first
+        for topic in sorted(due, key=lambda t: last_studied.get(t, 0)):
+            if review_budget < review_length:
+                break
+            reviews.append({
+                "day": day,
+                "topic": topic,
+                "duration": review_length,
+                "kind": "review",
+                "session": sessions[topic],
+            })
+            review_budget -= review_length
+        if review_budget > 0:
+            # Unused review time goes back to studying
+            study += _study_blocks(
+                day, review_budget, topics, shares, studied, sessions, settings,
+                previous=study[-1] if study else None
+            )
+
+        for topic in {block["topic"] for block in study}:
+            last_studied[topic] = day
+            for interval in settings.review_intervals:
+                if day + interval <= days:
+                    reviews_due.setdefault(day + interval, set()).add(topic)
+
+        blocks.extend(reviews)
+        blocks.extend(study)
+    return blocks
+
+
+def _study_blocks(
+    day: int,
+    minutes: int,
+    topics: List[str],
+    shares: Dict[str, float],
+    studied: Dict[str, int],
+    sessions: Dict[str, int],
+    settings: PlanSettings,
+    previous: Optional[Dict] = None,
+) -> List[Dict]:
+    """Fill minutes with blocks for the topics furthest behind their share"""
+    blocks: List[Dict] = []
+    slot = settings.slot_minutes
+    remaining = minutes // slot * slot
+    while remaining > 0:
+        last = blocks[-1] if blocks else previous
+        if remaining < settings.min_block_minutes and last is not None \
+                and last["duration"] + remaining <= settings.max_block_minutes:
+            # Too short for a block of its own: extend the previous one
+            last["duration"] += remaining
+            studied[last["topic"]] += remaining
+            break
+
+        total = sum(studied.values())
+        candidates = [t for t in topics if last is None or t != last["topic"]] or topics
+        topic = max(candidates, key=lambda t: shares[t] * total - studied[t])
+        # Even split of what is left into the fewest blocks that fit the maximum
+        count = -(-remaining // settings.max_block_minutes)
+        length = min(settings.max_block_minutes, -(-remaining // (count * slot)) * slot, remaining)
+
+        sessions[topic] += 1
+        studied[topic] += length
+        remaining -= length
+        blocks.append({"day": day, "topic": topic, "duration": length, "kind": "study", "session": sessions[topic]})
+    return blocks
@@ -0,0 +1,217 @@
+"""
+Tests for services/jobs.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+
+from services.jobs import JobManager, _JobStore
+
+
+class JobStoreTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.store = _JobStore(os.path.join(self._dir.name, "jobs.db"))
+        self.store.insert("job", "quiz", {"topic": "cells"}, 0.0)
+
+    def tearDown(self):
+        self.store.close()
+        self._dir.cleanup()
+
+    def test_queued_job_is_claimed_once(self):
+        self.assertTrue(self.store.claim("job", "a", 1, 100.0, 130.0))
+        self.assertFalse(self.store.claim("job", "b", 1, 101.0, 131.0))
+        self.assertFalse(self.store.claim("job", "b", 2, 101.0, 131.0))
+        job = self.store.get("job")
+        self.assertEqual((job["status"], job["owner"], job["attempts"]), ("running", "a", 1))
+
+    def test_owner_may_retry(self):
+        self.assertTrue(self.store.claim("job", "a", 1, 100.0, 130.0))
+        self.assertTrue(self.store.claim("job", "a", 2, 110.0, 140.0))
+        self.assertEqual(self.store.get("job")["attempts"], 2)
+
+    def test_expired_lease_can_be_claimed(self):
+        self.assertTrue(self.store.claim("job", "a", 1, 100.0, 130.0))
+        self.assertEqual(self.store.expired(120.0), [])
+        self.assertEqual(self.store.expired(131.0), ["job"])
+        self.assertTrue(self.store.claim("job", "b", 2, 131.0, 161.0))
+        self.assertFalse(self.store.renew("job", "a", 170.0))
+        self.assertTrue(self.store.renew("job", "b", 170.0))
+
+    def test_release_expires_leases(self):
+        self.assertTrue(self.store.claim("job", "a", 1, 100.0, 130.0))
+        self.assertEqual(self.store.release("a"), 1)
+        self.assertTrue(self.store.claim("job", "b", 2, 101.0, 131.0))
+
+    def test_only_the_owner_records_the_outcome(self):
+        self.assertTrue(self.store.claim("job", "a", 1, 100.0, 130.0))
+        self.assertTrue(self.store.claim("job", "b", 2, 131.0, 161.0))
+        self.assertFalse(self.store.finish("job", "a", status="succeeded", result={"by": "a"}, finished_at=140.0))
+        self.assertTrue(self.store.finish("job", "b", status="succeeded", result={"by": "b"}, finished_at=150.0))
+        self.assertFalse(self.store.finish("job", "b", status="failed", error="late", finished_at=160.0))
+        job = self.store.get("job")
+        self.assertEqual((job["status"], job["result"]), ("succeeded", {"by": "b"}))
+
+    def test_finished_job_cannot_be_claimed(self):
+        self.assertTrue(self.store.claim("job", "a", 1, 100.0, 130.0))
+        self.assertTrue(self.store.finish("job", "a", status="succeeded", result={"ok": True}, finished_at=100.0))
+        self.assertFalse(self.store.claim("job", "a", 1, 100.0, 130.0))
+        self.assertEqual(self.store.get("job")["result"], {"ok": True})
+
+
+class JobManagerTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self._dir.name, "jobs.db")
+        self.managers = []
+        self.calls = []
+        self.cancelled = []
+        self.release = asyncio.Event()
+
+    async def asyncTearDown(self):
+        self.release.set()
+        for manager in self.managers:
+            await manager.stop()
+        self._dir.cleanup()
+
+    async def manager(self, name: str, **kwargs) -> JobManager:
+        manager = JobManager(workers=2, db_path=self.db_path, poll_interval=0.05, **kwargs)
+
+        async def handler(params):
+            self.calls.append(name)
+            try:
+                await self.release.wait()
+            except asyncio.CancelledError:
+                self.cancelled.append(name)
+                raise
+            return {"topic": params["topic"], "by": name}
+
+        manager.register("quiz", handler)
+        await manager.start()
+        self.managers.append(manager)
+        return manager
+
+    async def until(self, predicate, timeout: float = 5):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not predicate():
+            self.assertLess(asyncio.get_running_loop().time(), deadline, "timed out")
+            await asyncio.sleep(0.01)
+
+    async def test_running_job_is_not_run_again_by_a_sibling(self):
+        a = await self.manager("a")
+        job = await a.submit("quiz", {"topic": "cells"})
+        await self.until(lambda: self.calls)
+
+        # A second process starting now resumes unfinished jobs, including this one
+        b = await self.manager("b")
+        self.assertEqual(b.resumed, 1)
+        await asyncio.sleep(0.2)
+        self.assertEqual(self.calls, ["a"])
+
+        self.release.set()
+        finished = await a.wait(job["id"], timeout=5)
+        self.assertEqual(finished["status"], "succeeded")
+        self.assertEqual(finished["result"], {"topic": "cells", "by": "a"})
+        self.assertEqual(self.calls, ["a"])
+
+    async def test_result_survives_a_restart(self):
+        a = await self.manager("a")
+        self.release.set()
+        job = await a.submit("quiz", {"topic": "cells"})
+        self.assertEqual((await a.wait(job["id"], timeout=5))["status"], "succeeded")
+        await a.stop()
+        self.managers.remove(a)
+
+        b = await self.manager("b")
+        self.assertEqual(b.resumed, 0)
+        self.assertEqual((await b.get(job["id"]))["result"], {"topic": "cells", "by": "a"})
+
+    async def test_job_cancelled_by_stop_resumes_on_the_next_start(self):
+        a = await self.manager("a")
+        job = await a.submit("quiz", {"topic": "cells"})
+        await self.until(lambda: self.calls)
+        await a.stop(timeout=0)
+        self.managers.remove(a)
+        self.assertEqual((await self.read(self.db_path, job["id"]))["status"], "running")
+
+        self.release.set()
+        b = await self.manager("b")
+        self.assertEqual(b.resumed, 1)
+        finished = await b.wait(job["id"], timeout=5)
+        self.assertEqual(finished["result"], {"topic": "cells", "by": "b"})
+        self.assertEqual(finished["attempts"], 2)
+        self.assertEqual(self.calls, ["a", "b"])
+
+    async def test_job_of_a_dead_process_is_reclaimed_after_its_lease(self):
+        a = await self.manager("a", lease_seconds=0.2)
+        b = await self.manager("b", lease_seconds=0.2)
+        job = await a.submit("quiz", {"topic": "cells"})
+        await self.until(lambda: self.calls)
+
+        # The process dies: its workers stop without releasing or renewing the lease
+        for task in a._tasks:
+            task.cancel()
+        await asyncio.gather(*a._tasks, return_exceptions=True)
+        self.release.set()
+
+        finished = await b.wait(job["id"], timeout=5)
+        self.assertEqual(finished["result"], {"topic": "cells", "by": "b"})
+        self.assertEqual(self.calls, ["a", "b"])
+        self.assertGreaterEqual(b.reclaimed, 1)
+
+    async def test_handler_is_cancelled_when_the_lease_is_lost(self):
+        a = await self.manager("a", lease_seconds=0.3)
+        job = await a.submit("quiz", {"topic": "cells"})
+        await self.until(lambda: self.calls)
+
+        # Another process reclaims the job, e.g. after this one stalled past its lease
+        store = await asyncio.to_thread(_JobStore, self.db_path)
+        try:
+            now = time.time()
+            self.assertTrue(store.release(a.owner))
+            self.assertTrue(store.claim(job["id"], "other", 2, now, now + 60))
+            await self.until(lambda: a.lost_leases)
+            self.assertEqual(self.cancelled, ["a"])
+            self.assertEqual(a.running, 0)
+
+            self.assertTrue(store.finish(job["id"], "other", status="succeeded", result={"by": "other"}, finished_at=now))
+        finally:
+            store.close()
+        self.assertEqual((await a.get(job["id"]))["result"], {"by": "other"})
+        self.assertEqual(a.succeeded, 0)
+
+    async def test_late_outcome_is_not_recorded(self):
+        a = await self.manager("a")
+        job = await a.submit("quiz", {"topic": "cells"})
+        await self.until(lambda: self.calls)
+
+        store = await asyncio.to_thread(_JobStore, self.db_path)
+        try:
+            now = time.time()
+            store.release(a.owner)
+            self.assertTrue(store.claim(job["id"], "other", 2, now, now + 60))
+        finally:
+            store.close()
+        # The handler here finishes before its next renewal notices
+        self.release.set()
+        await self.until(lambda: not a.running)
+        job = await a.get(job["id"])
+        self.assertEqual((job["status"], job["owner"], job["result"]), ("running", "other", None))
+        self.assertEqual(a.succeeded, 0)
+
+    @staticmethod
+    async def read(db_path: str, job_id: str):
+        store = await asyncio.to_thread(_JobStore, db_path)
+        try:
+            return await asyncio.to_thread(store.get, job_id)
+        finally:
+            await asyncio.to_thread(store.close)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Tests for services/json_extract.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import json
+import unittest
+
+from services.json_extract import ArrayItemStream, extract_json, repair_json
+
+# Valid JSON: typographic quotes inside a string opened by '"'
+QUOTED_TEXT = (
+    '{"questions": ['
+    '{"question": "Who said “God does not play dice”, and why?", "correct_answer": "Einstein"}, '
+    '{"question": "What is “entanglement”: a link or a force?", "correct_answer": "A link"}'
+    ']}'
+)
+
+
+def stream_items(text: str, chunk_size: int):
+    parser = ArrayItemStream()
+    items = []
+    for start in range(0, len(text), chunk_size):
+        items.extend(parser.feed(text[start:start + chunk_size]))
+    return items
+
+
+class ExtractJsonTest(unittest.TestCase):
+    def test_fenced_with_preamble(self):
+        text = 'Here you go:\n```json\n{"tips": ["a", "b"]}\n```\nGood luck!'
+        self.assertEqual(extract_json(text), {"tips": ["a", "b"]})
+
+    def test_trailing_comma_and_smart_delimiters(self):
+        self.assertEqual(extract_json("{“a”: “x”, “b”: [1, 2,],}"), {"a": "x", "b": [1, 2]})
+
+    def test_truncated_array_keeps_finished_items(self):
+        text = '{"flashcards": [{"question": "Q1", "answer": "A1"}, {"question": "Q2", "ans'
+        self.assertEqual(extract_json(text), {"flashcards": [{"question": "Q1", "answer": "A1"}]})
+
+    def test_smart_quotes_inside_plain_string(self):
+        self.assertEqual(extract_json(QUOTED_TEXT), json.loads(QUOTED_TEXT))
+
+    def test_repair_keeps_smart_quotes_inside_plain_string(self):
+        # A trailing comma forces the repair path
+        text = QUOTED_TEXT[:-2] + ",]}"
+        self.assertEqual(json.loads(repair_json(text)), json.loads(QUOTED_TEXT))
+
+    def test_no_object(self):
+        self.assertIsNone(extract_json("Sorry, I cannot help with that."))
+
+
+class ArrayItemStreamTest(unittest.TestCase):
+    def test_items_yielded_as_they_close(self):
+        parser = ArrayItemStream()
+        self.assertEqual(parser.feed('```json\n{"questions": [{"q": 1}, {"q"'), [{"q": 1}])
+        self.assertEqual(parser.feed(": 2}]}\n```"), [{"q": 2}])
+
+    def test_smart_quotes_inside_plain_string(self):
+        expected = json.loads(QUOTED_TEXT)["questions"]
+        for chunk_size in (1, 3, 7, len(QUOTED_TEXT)):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(stream_items(QUOTED_TEXT, chunk_size), expected)
+
+    def test_smart_quoted_strings(self):
+        text = "{“items”: [{“q”: “a “quoted” word”}, {“q”: “b”}]}"
+        self.assertEqual(stream_items(text, 2), [{"q": "a “quoted” word"}, {"q": "b"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests for services/model_router.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import asyncio
+import time
+import unittest
+import uuid
+
+from services.model_router import MIN_SAMPLES, ModelRouter
+from services.resilience import get_breaker
+
+
+class ModelRouterTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Circuit breakers are process-wide; fresh model names get fresh ones
+        suffix = uuid.uuid4().hex
+        self.first, self.second = f"first/{suffix}", f"second/{suffix}"
+        self.router = ModelRouter([self.first, self.second])
+        self.router.min_delay = 0.01
+        self.router.max_delay = 1
+        self.router.hedge_delay = 1
+        # The first model usually answers in 50 ms
+        for _ in range(MIN_SAMPLES):
+            self.router.stats[self.first].record_success(0.05)
+        self.called = []
+        self.cancelled = []
+
+    def call(self, delays, errors=()):
+        async def fn(model):
+            self.called.append(model)
+            try:
+                await asyncio.sleep(delays[model])
+            except asyncio.CancelledError:
+                self.cancelled.append(model)
+                raise
+            if model in errors:
+                raise RuntimeError(f"{model} failed")
+            return model
+        return fn
+
+    async def test_hedge_fires_after_the_p95(self):
+        start = time.monotonic()
+        result = await self.router.run(self.call({self.first: 1, self.second: 0.01}))
+        elapsed = time.monotonic() - start
+
+        self.assertEqual(result, self.second)
+        self.assertEqual(self.called, [self.first, self.second])
+        self.assertEqual(self.router.hedged, 1)
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(self.router.stats[self.second].hedges_won, 1)
+        # The slow call is abandoned
+        await asyncio.sleep(0)
+        self.assertEqual(self.cancelled, [self.first])
+
+    async def test_no_hedge_within_the_p95(self):
+        result = await self.router.run(self.call({self.first: 0.01, self.second: 0.01}))
+        self.assertEqual(result, self.first)
+        self.assertEqual(self.called, [self.first])
+        self.assertEqual(self.router.hedged, 0)
+
+    async def test_failure_fails_over_at_once(self):
+        self.router.hedge_delay = self.router.min_delay = self.router.max_delay = 10
+        start = time.monotonic()
+        result = await self.router.run(self.call({self.first: 0, self.second: 0}, errors={self.first}))
+        self.assertEqual(result, self.second)
+        self.assertLess(time.monotonic() - start, 1)
+        self.assertEqual(self.router.stats[self.first].errors, 1)
+
+    async def test_first_error_is_raised_when_every_model_fails(self):
+        with self.assertRaisesRegex(RuntimeError, "first"):
+            await self.router.run(self.call({self.first: 0, self.second: 0}, errors={self.first, self.second}))
+        self.assertEqual(self.called, [self.first, self.second])
+
+    async def test_open_circuit_is_tried_last(self):
+        breaker = get_breaker(self.first)
+        for _ in range(breaker.failure_threshold):
+            breaker.record_failure()
+        self.assertEqual(self.router.ordered(), [self.second, self.first])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Tests for services/response_cache.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+
+from services.response_cache import ResponseCache, make_cache_key
+
+
+class CacheKeyTest(unittest.TestCase):
+    def test_trivially_different_requests_share_a_key(self):
+        self.assertEqual(
+            make_cache_key("explain", "model", "v1", topic="Photosynthesis ", depth="basic"),
+            make_cache_key("explain", "model", "v1", depth="basic", topic="photosynthesis"),
+        )
+
+    def test_model_prompt_and_params_change_the_key(self):
+        key = make_cache_key("explain", "model", "v1", topic="cells")
+        self.assertNotEqual(key, make_cache_key("explain", "other", "v1", topic="cells"))
+        self.assertNotEqual(key, make_cache_key("explain", "model", "v2", topic="cells"))
+        self.assertNotEqual(key, make_cache_key("quiz", "model", "v1", topic="cells"))
+        self.assertNotEqual(key, make_cache_key("explain", "model", "v1", topic="atoms"))
+
+
+class ResponseCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_least_recently_used_entry_is_evicted(self):
+        cache = ResponseCache(max_entries=2, ttl_seconds=60)
+        await cache.set("a", 1)
+        await cache.set("b", 2)
+        self.assertEqual(await cache.get("a"), 1)
+        await cache.set("c", 3)
+        self.assertIsNone(await cache.get("b"))
+        self.assertEqual((await cache.get("a"), await cache.get("c")), (1, 3))
+        self.assertEqual(cache.evictions, 1)
+
+    async def test_entries_expire(self):
+        cache = ResponseCache(max_entries=10, ttl_seconds=0.05)
+        await cache.set("key", {"answer": 42})
+        self.assertEqual(await cache.get("key"), {"answer": 42})
+        await asyncio.sleep(0.06)
+        self.assertIsNone(await cache.get("key"))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    async def test_disk_tier_survives_a_restart_and_expires(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.db")
+            await ResponseCache(max_entries=10, ttl_seconds=60, db_path=path).set("kept", {"answer": 1})
+            await ResponseCache(max_entries=10, ttl_seconds=0.05, db_path=path).set("short", {"answer": 2})
+            await asyncio.sleep(0.06)
+
+            cache = ResponseCache(max_entries=10, ttl_seconds=60, db_path=path)
+            self.assertEqual(await cache.get("kept"), {"answer": 1})
+            self.assertIsNone(await cache.get("short"))
+            self.assertEqual((cache.disk_hits, cache.misses), (1, 1))
+            # Now in memory as well
+            self.assertEqual(await cache.get("kept"), {"answer": 1})
+            self.assertEqual(cache.memory_hits, 1)
+
+    async def test_get_or_compute(self):
+        cache = ResponseCache(max_entries=10, ttl_seconds=60)
+        computed = []
+
+        async def compute():
+            computed.append(1)
+            return {"fallback": len(computed) == 1}
+
+        def should_store(value):
+            return not value["fallback"]
+
+        # A placeholder is returned but not stored
+        self.assertEqual(await cache.get_or_compute("key", compute, should_store), {"fallback": True})
+        self.assertEqual(await cache.get_or_compute("key", compute, should_store), {"fallback": False})
+        self.assertEqual(await cache.get_or_compute("key", compute, should_store), {"fallback": False})
+        self.assertEqual(len(computed), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+"""
+Tests for services/singleflight.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import asyncio
+import unittest
+
+from services.singleflight import SingleFlight
+
+
+class SingleFlightTest(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.flight = SingleFlight()
+        self.release = asyncio.Event()
+        self.executions = 0
+
+    async def work(self, value="result", error=None):
+        self.executions += 1
+        await self.release.wait()
+        if error is not None:
+            raise error
+        return value
+
+    async def test_concurrent_calls_share_one_execution(self):
+        callers = [asyncio.create_task(self.flight.do("key", self.work)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await asyncio.gather(*callers), ["result"] * 5)
+        self.assertEqual(self.executions, 1)
+        self.assertEqual(self.flight.stats(), {"calls": 5, "executions": 1, "coalesced": 4, "in_flight": 0})
+
+    async def test_exception_reaches_every_waiter(self):
+        error = ValueError("generation failed")
+        callers = [asyncio.create_task(self.flight.do("key", lambda: self.work(error=error))) for _ in range(3)]
+        await asyncio.sleep(0)
+        self.release.set()
+        results = await asyncio.gather(*callers, return_exceptions=True)
+        self.assertEqual(results, [error] * 3)
+        self.assertEqual(self.executions, 1)
+
+        # A failed run is not remembered: the next call runs again
+        self.assertEqual(await self.flight.do("key", self.work), "result")
+        self.assertEqual(self.executions, 2)
+
+    async def test_different_keys_do_not_share(self):
+        self.release.set()
+        results = await asyncio.gather(
+            self.flight.do("a", lambda: self.work("a")),
+            self.flight.do("b", lambda: self.work("b")),
+        )
+        self.assertEqual(results, ["a", "b"])
+        self.assertEqual(self.executions, 2)
+
+    async def test_cancelled_caller_does_not_cancel_the_others(self):
+        first = asyncio.create_task(self.flight.do("key", self.work))
+        second = asyncio.create_task(self.flight.do("key", self.work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        self.release.set()
+        self.assertEqual(await second, "result")
+        self.assertTrue(first.cancelled())
+        self.assertEqual(self.executions, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+"""
+Tests for services/spaced_repetition.py
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import unittest
+
+from services.spaced_repetition import AGAIN, DAY, DEFAULT_WEIGHTS, EASY, GOOD, HARD, Scheduler, retrievability
+
+W = DEFAULT_WEIGHTS
+NOW = 1_700_000_000.0
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(retention=0.9, max_interval_days=3650, relearn_minutes=10)
+
+    def review_after(self, state, rating, days):
+        return self.scheduler.review(
+            rating, NOW + days * DAY,
+            stability=state["stability"], difficulty=state["difficulty"], last_review=NOW
+        )
+
+    def test_new_card(self):
+        state = self.scheduler.review(GOOD, NOW)
+        self.assertEqual(state["stability"], W[2])
+        self.assertAlmostEqual(state["difficulty"], W[4])
+        self.assertEqual(state["interval_days"], round(W[2]))
+
+    def test_difficulty_reverts_towards_w4(self):
+        # FSRS-4.5: D'' = w7 * D0(3) + (1 - w7) * D', with D0(3) = w4
+        for difficulty in (2.0, 8.0):
+            state = self.review_after({"stability": 10.0, "difficulty": difficulty}, GOOD, 10)
+            self.assertAlmostEqual(state["difficulty"], W[7] * W[4] + (1 - W[7]) * difficulty)
+        state = self.review_after({"stability": 10.0, "difficulty": W[4]}, GOOD, 10)
+        self.assertAlmostEqual(state["difficulty"], W[4])
+
+    def test_ratings_order_stability(self):
+        card = {"stability": 10.0, "difficulty": 5.0}
+        stabilities = [self.review_after(card, rating, 10)["stability"] for rating in (AGAIN, HARD, GOOD, EASY)]
+        self.assertEqual(stabilities, sorted(stabilities))
+        self.assertLessEqual(stabilities[0], 10.0)
+
+    def test_forgotten_card_relearns_soon(self):
+        state = self.review_after({"stability": 10.0, "difficulty": 5.0}, AGAIN, 30)
+        self.assertAlmostEqual(state["due"] - (NOW + 30 * DAY), 600)
+
+    def test_interval_matches_retention(self):
+        interval = self.scheduler.interval_days(20.0)
+        self.assertEqual(interval, 20)
+        self.assertAlmostEqual(retrievability(20.0, 20.0), 0.9)
+
+    def test_invalid_rating(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.review(5, NOW)
+
+
+if __name__ == "__main__":
+    unittest.main()
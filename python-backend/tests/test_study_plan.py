@@ -0,0 +1,48 @@
+"""
+Tests for services/study_plan.py and the schedule agent's use of it
+
+Run from the app directory:
+    python -m unittest discover tests
+"""
+import unittest
+
+from agents.schedule_agent import GENERIC_FOCUS_AREAS, ScheduleAgent
+from services.study_plan import PlanSettings, plan_schedule
+
+NO_REVIEWS = dict(review_intervals=[])
+
+
+class PlanScheduleTest(unittest.TestCase):
+    def test_blocks_fill_each_day(self):
+        blocks = plan_schedule(["algebra", "geometry"], 2, 3, settings=PlanSettings(**NO_REVIEWS))
+        for day in (1, 2, 3):
+            self.assertEqual(sum(b["duration"] for b in blocks if b["day"] == day), 120)
+
+    def test_max_block_is_rounded_down_to_whole_slots(self):
+        self.assertEqual(PlanSettings(max_block_minutes=7, slot_minutes=5).max_block_minutes, 5)
+        self.assertEqual(PlanSettings(max_block_minutes=48, slot_minutes=5).max_block_minutes, 45)
+        self.assertEqual(PlanSettings(max_block_minutes=3, slot_minutes=5).max_block_minutes, 5)
+
+        settings = PlanSettings(max_block_minutes=7, slot_minutes=5, **NO_REVIEWS)
+        blocks = plan_schedule(["algebra", "geometry"], 1, 2, settings=settings)
+        self.assertTrue(blocks)
+        self.assertTrue(all(b["duration"] % 5 == 0 and b["duration"] <= 5 for b in blocks))
+
+    def test_no_time_no_blocks(self):
+        self.assertEqual(plan_schedule(["algebra"], 0, 7), [])
+        self.assertEqual(plan_schedule([], 2, 7), [])
+
+
+class CreateScheduleTest(unittest.TestCase):
+    def test_outline_matches_topics_in_another_case_or_spacing(self):
+        outline = {"focus_areas": {"Linear  Algebra": ["Vectors", "Matrices"]}, "tips": ["Rest"]}
+        result = ScheduleAgent().create_schedule(
+            ["linear algebra"], 1, 2, outline, settings=PlanSettings(**NO_REVIEWS)
+        )
+        areas = {block["focus_area"] for block in result["schedule"]}
+        self.assertTrue(areas <= {"Vectors", "Matrices"})
+        self.assertFalse(areas & set(GENERIC_FOCUS_AREAS))
+
+
+if __name__ == "__main__":
+    unittest.main()